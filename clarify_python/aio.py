@@ -0,0 +1,795 @@
+"""
+.. module:: aio
+   : synopsis: 'An asyncio version of the Client. Every REST cover function of clarify.Client is available as a coroutine with the same arguments and return values. Requires Python 3.7+ and aiohttp.'
+"""
+
+import time
+import asyncio
+import inspect
+import contextvars
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+from clarify_python import helper
+from clarify_python.retry import DEFAULT_RETRY_POLICY, NO_RETRY_POLICY
+from clarify_python.encoding import ACCEPT_ENCODING, TransferStats, \
+    is_compressed, decode_content
+from clarify_python import cache
+from clarify_python.coalesce import make_flight_key
+from clarify_python.clarify import Result, APIException, \
+    APIConfigurationException, BUNDLES_PATH, SEARCH_PATH, \
+    DEFAULT_POOL_MAXSIZE, PYTHON_VERSION, _parse_content
+from clarify_python.transport import DEFAULT_BASE_URL
+from clarify_python.jsoncodec import get_codec
+from clarify_python.constants import __version__
+from clarify_python.constants import __api_version__
+from clarify_python.constants import __api_lib_name__
+
+
+class AsyncClient(object):
+    """Holds the environment for asyncio applications.
+
+    Connections are shared by every task using the client. Use it as an
+    async context manager, or call close() when done:
+
+        async with AsyncClient(key) as client:
+            bundle = await client.get_bundle(href)"""
+
+    def __init__(self, key, pool_maxsize=DEFAULT_POOL_MAXSIZE, session=None,
+                 retry_policy=DEFAULT_RETRY_POLICY, rate_limiter=None,
+                 validator_cache=None, response_cache=None, coalesce=False,
+                 base_url=DEFAULT_BASE_URL, json_codec=None):
+        """Initializer.
+
+        'key' the API key.
+        'pool_maxsize' the maximum number of simultaneous connections.
+        Requests beyond this wait for a free connection. Ignored if
+        'session' is given.
+        'session' an aiohttp.ClientSession to use. May be None, in which
+        case the client creates (and closes) its own.
+        'retry_policy' a retry.RetryPolicy, see clarify.Client.
+        'rate_limiter' a ratelimit.RateLimiter, see clarify.Client.
+        'validator_cache' a cache.ValidatorCache, see clarify.Client.
+        'response_cache' a cache.ResponseCache, see clarify.Client.
+        'coalesce' if True, tasks making the same model GET at the same
+        time share a single request, see clarify.Client.
+        'base_url' the URL of the API, see clarify.Client.
+        'json_codec' a jsoncodec.JSONCodec, see clarify.Client.
+
+        If aiohttp is not installed, throws an APIConfigurationException."""
+
+        if aiohttp is None:
+            raise APIConfigurationException(
+                'AsyncClient requires aiohttp. Install it with: '
+                'pip install aiohttp')
+
+        # Argument error checking.
+        assert pool_maxsize > 0
+
+        self.key = key
+        self.base_url = base_url.rstrip('/')
+        self.pool_maxsize = pool_maxsize
+        self._session = session
+        self._owns_session = session is None
+        self.retry_policy = retry_policy or NO_RETRY_POLICY
+        self.rate_limiter = rate_limiter
+        self.validator_cache = validator_cache
+        self.response_cache = response_cache
+        self.json_codec = json_codec or get_codec()
+        self._single_flight = AsyncSingleFlight() if coalesce else None
+        self._transfer_stats = TransferStats()
+        self._last_status = contextvars.ContextVar('last_status',
+                                                   default=None)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close the connections held by the client."""
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self):
+        """Returns the aiohttp session, creating it on first use."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.pool_maxsize)
+            # Bodies are decompressed by _request() so that the transfer
+            # stats can count the compressed size.
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  auto_decompress=False)
+            self._owns_session = True
+        return self._session
+
+    async def get_bundle_list(self, href=None, limit=None, embed_items=None,
+                              embed_tracks=None, embed_metadata=None,
+                              embed_insights=None):
+        """Get a list of available bundles.
+
+        See clarify.Client.get_bundle_list()."""
+
+        # Argument error checking.
+        assert limit is None or limit > 0
+
+        if href is None:
+            path = '/' + __api_version__ + '/' + BUNDLES_PATH
+            data = {}
+            if limit is not None:
+                data['limit'] = limit
+            embed = helper.process_embed(embed_items=embed_items,
+                                         embed_tracks=embed_tracks,
+                                         embed_metadata=embed_metadata,
+                                         embed_insights=embed_insights)
+            if embed is not None:
+                data['embed'] = embed
+        else:
+            path, data = helper.process_page_href(href, limit,
+                                                  embed_items,
+                                                  embed_tracks,
+                                                  embed_metadata,
+                                                  embed_insights)
+
+        return await self._get_collection(path, data)
+
+    async def iter_bundle_pages(self, href=None, limit=None, embed_items=None,
+                                embed_tracks=None, embed_metadata=None,
+                                embed_insights=None):
+        """Async generator over the pages of the bundle list, following
+        the 'next' links.
+
+        The arguments are the same as get_bundle_list() and apply to
+        every page."""
+
+        while True:
+            page = await self.get_bundle_list(href, limit, embed_items,
+                                              embed_tracks, embed_metadata,
+                                              embed_insights)
+            yield page
+            href = helper.get_link_href(page, 'next')
+            if href is None:
+                break
+
+    async def bundle_list_map(self, func, bundle_collection=None, limit=None,
+                              embed_items=None, embed_tracks=None,
+                              embed_metadata=None, embed_insights=None):
+        """
+        Execute func on every bundle in a collection.
+
+        See clarify.Client.bundle_list_map(). Func may be a plain
+        function or a coroutine function.
+        """
+
+        if bundle_collection is not None:
+            pages = _pages_from(self, bundle_collection)
+        else:
+            pages = self.iter_bundle_pages(limit=limit,
+                                           embed_items=embed_items,
+                                           embed_tracks=embed_tracks,
+                                           embed_metadata=embed_metadata,
+                                           embed_insights=embed_insights)
+
+        async for page in pages:
+            if embed_items:
+                items = helper.get_embedded_items(page)
+            else:
+                items = helper.get_item_hrefs(page)
+            for item in items:
+                result = func(self, item)
+                if inspect.isawaitable(result):
+                    result = await result
+                if result is False:
+                    return
+
+    async def create_bundle(self, name=None, media_url=None,
+                            audio_channel=None, metadata=None,
+                            notify_url=None, external_id=None):
+        """Create a new bundle.
+
+        See clarify.Client.create_bundle()."""
+
+        path = '/' + __api_version__ + '/' + BUNDLES_PATH
+
+        fields = {}
+        if name is not None:
+            fields['name'] = name
+        if media_url is not None:
+            fields['media_url'] = media_url
+        if audio_channel is not None:
+            fields['audio_channel'] = audio_channel
+        if metadata is not None:
+            fields['metadata'] = self.json_codec.dumps(metadata)
+        if notify_url is not None:
+            fields['notify_url'] = notify_url
+        if external_id is not None:
+            fields['external_id'] = external_id
+
+        raw_result = await self.post(path, fields)
+
+        if raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+
+        return self._parse_json(raw_result.content)
+
+    async def delete_bundle(self, href=None):
+        """Delete a bundle.
+
+        See clarify.Client.delete_bundle()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        await self._delete_model(href)
+
+    async def get_bundle(self, href=None, embed_tracks=False,
+                         embed_metadata=False, embed_insights=False):
+        """Get a bundle.
+
+        See clarify.Client.get_bundle()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        data = {}
+        embed = helper.process_embed(embed_items=False,
+                                     embed_tracks=embed_tracks,
+                                     embed_metadata=embed_metadata,
+                                     embed_insights=embed_insights)
+        if embed is not None:
+            data['embed'] = embed
+
+        return await self._get_model(href, data)
+
+    async def update_bundle(self, href=None, name=None,
+                            notify_url=None, version=None,
+                            external_id=None):
+        """Update a bundle.
+
+        See clarify.Client.update_bundle()."""
+
+        # Argument error checking.
+        assert href is not None
+        assert version is None or isinstance(version, int)
+
+        fields = {}
+        if name is not None:
+            fields['name'] = name
+        if notify_url is not None:
+            fields['notify_url'] = notify_url
+        if version is not None:
+            fields['version'] = version
+        if external_id is not None:
+            fields['external_id'] = external_id
+
+        return await self._put_model(href, fields)
+
+    async def get_metadata(self, href=None):
+        """Get metadata.
+
+        See clarify.Client.get_metadata()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        return await self._get_model(href)
+
+    async def update_metadata(self, href=None, metadata=None, version=None):
+        """Update the metadata in a bundle.
+
+        See clarify.Client.update_metadata()."""
+
+        # Argument error checking.
+        assert href is not None
+        assert metadata is not None
+        assert version is None or isinstance(version, int)
+
+        fields = {}
+        if version is not None:
+            fields['version'] = version
+        fields['data'] = self.json_codec.dumps(metadata)
+
+        return await self._put_model(href, fields)
+
+    async def delete_metadata(self, href=None):
+        """Delete metadata.
+
+        See clarify.Client.delete_metadata()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        await self._delete_model(href)
+
+    async def create_track(self, href=None, media_url=None, label=None,
+                           audio_channel=None):
+        """Add a new track to a bundle.
+
+        See clarify.Client.create_track()."""
+
+        # Argument error checking.
+        assert href is not None
+        assert media_url is not None
+
+        fields = {}
+        fields['media_url'] = media_url
+        if label is not None:
+            fields['label'] = label
+        if audio_channel is not None:
+            fields['audio_channel'] = audio_channel
+
+        raw_result = await self.post(href, fields)
+        self._invalidate(href)
+
+        if raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+
+        return self._parse_json(raw_result.content)
+
+    async def get_track_list(self, href=None):
+        """Get track list.
+
+        See clarify.Client.get_track_list()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        return await self._get_model(href)
+
+    async def get_track(self, href=None):
+        """Get a track.
+
+        See clarify.Client.get_track()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        return await self._get_model(href)
+
+    async def delete_track_at_index(self, href=None, index=None):
+        """Delete a track, or all the tracks.
+
+        See clarify.Client.delete_track_at_index()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        fields = {}
+        if index is not None:
+            fields['track'] = index
+
+        await self._delete_model(href, fields)
+
+    async def delete_track(self, href=None):
+        """Delete a track.
+
+        See clarify.Client.delete_track()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        await self._delete_model(href)
+
+    async def get_insights(self, href=None):
+        """Get the insights for a bundle.
+
+        See clarify.Client.get_insights()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        return await self._get_model(href)
+
+    async def get_insight(self, href):
+        """Get an insight for a bundle.
+
+        See clarify.Client.get_insight()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        return await self._get_model(href)
+
+    async def request_insight(self, href, insight):
+        """Requests an insight to be run.
+
+        See clarify.Client.request_insight()."""
+
+        assert href is not None
+        assert insight is not None
+
+        raw_result = await self.post(href, {'insight': insight})
+        self._invalidate(href)
+
+        if raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+
+        return self._parse_json(raw_result.content)
+
+    async def get_data(self, href=None):
+        """Gets data from an insight with data links such as captions.
+
+        See clarify.Client.get_data()."""
+
+        # Argument error checking.
+        assert href is not None
+
+        raw_result = await self.get(href)
+
+        if raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+
+        return raw_result.json
+
+    async def search(self, href=None,
+                     query=None, query_fields=None, query_filter=None,
+                     limit=None, embed_items=None, embed_tracks=None,
+                     embed_metadata=None, embed_insights=None, language=None):
+        """Search a media collection.
+
+        See clarify.Client.search()."""
+
+        # Argument error checking.
+        assert query is not None
+        assert limit is None or limit > 0
+
+        if href is None:
+            path = '/' + __api_version__ + '/' + SEARCH_PATH
+            data = {}
+            data['query'] = query
+            if query_fields is not None:
+                data['query_fields'] = query_fields
+            if query_filter is not None:
+                data['filter'] = query_filter
+            if limit is not None:
+                data['limit'] = limit
+            if language is not None:
+                data['language'] = language
+            embed = helper.process_embed(embed_items=embed_items,
+                                         embed_tracks=embed_tracks,
+                                         embed_metadata=embed_metadata,
+                                         embed_insights=embed_insights)
+            if embed is not None:
+                data['embed'] = embed
+        else:
+            path, data = helper.process_page_href(href, limit,
+                                                  embed_items,
+                                                  embed_tracks,
+                                                  embed_metadata,
+                                                  embed_insights)
+
+        return await self._get_collection(path, data)
+
+    async def iter_search_pages(self, query=None, query_fields=None,
+                                query_filter=None, limit=None,
+                                embed_items=None, embed_tracks=None,
+                                embed_metadata=None, embed_insights=None,
+                                language=None):
+        """Async generator over the pages of a search result, following
+        the 'next' links.
+
+        The arguments are the same as search()."""
+
+        href = None
+        while True:
+            page = await self.search(href, query, query_fields, query_filter,
+                                     limit, embed_items, embed_tracks,
+                                     embed_metadata, embed_insights, language)
+            yield page
+            href = helper.get_link_href(page, 'next')
+            if href is None:
+                break
+
+    def get_last_status(self):
+        """Returns the HTTP status code of the most recent request made
+        by the client in the calling task."""
+        return self._last_status.get()
+
+    def get_transfer_stats(self):
+        """Returns the transfer counters, see
+        clarify.Client.get_transfer_stats(). When the client uses a
+        session that decompresses bodies itself, the compressed size is
+        not known and 'wire_bytes' counts decompressed bytes."""
+        return self._transfer_stats.get_stats()
+
+    def reset_transfer_stats(self):
+        """Set the transfer counters back to zero."""
+        self._transfer_stats.reset()
+
+    async def _get_model(self, href, data=None, use_cache=True):
+        """GET a model and return it as a Python data structure, using
+        the response and validator caches if there are any. If
+        'use_cache' is False the caches are bypassed, but the model is
+        still stored in them.
+
+        See clarify.Client._get_model()."""
+
+        key = cache.make_key(href, data.get('embed') if data else None)
+
+        response_cache = self.response_cache
+        if response_cache is not None and use_cache:
+            result = response_cache.get(key)
+            if result is not None:
+                return result
+
+        if self._single_flight is not None:
+            return await self._single_flight.do(
+                make_flight_key('GET', href, data),
+                self._fetch_model, href, data, key, use_cache)
+
+        return await self._fetch_model(href, data, key, use_cache)
+
+    async def _fetch_model(self, href, data, key, use_cache):
+        """GET a model for _get_model(), revalidating it with the
+        validator cache if there is one, and store it in the caches.
+
+        'key' the cache key of the model."""
+
+        response_cache = self.response_cache
+        validator_cache = self.validator_cache
+        entry = None
+        headers = None
+        if validator_cache is not None and use_cache:
+            entry = validator_cache.get(key)
+            if entry is not None:
+                headers = cache.get_conditional_headers(entry)
+
+        raw_result = await self.get(href, data, headers)
+
+        if raw_result.status == 304 and entry is not None:
+            result = entry.model
+        elif raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+        else:
+            result = self._parse_json(raw_result.content)
+
+            if validator_cache is not None:
+                etag = raw_result.headers.get('ETag')
+                last_modified = raw_result.headers.get('Last-Modified')
+                if etag or last_modified:
+                    validator_cache.set(key, etag, last_modified, result)
+                else:
+                    validator_cache.remove(key)
+
+        if response_cache is not None:
+            response_cache.set(key, result)
+
+        return result
+
+    async def _get_collection(self, path, data):
+        """GET a page of a collection (bundle list or search result).
+        Collections change all the time, so they are never cached.
+
+        If the response status is not 2xx, throws an APIException.
+        If the JSON to python data struct conversion fails, throws an
+        APIDataException."""
+
+        raw_result = await self.get(path, data)
+
+        if raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+
+        return self._parse_json(raw_result.content)
+
+    def _invalidate(self, href):
+        """Drop the cached models affected by a change to href."""
+        if self.response_cache is not None:
+            self.response_cache.invalidate(href)
+
+    async def _put_model(self, href, fields):
+        """PUT fields to a model and return the updated model.
+
+        If the response status is not 2xx, throws an APIException.
+        If the JSON to python data struct conversion fails, throws an
+        APIDataException."""
+
+        raw_result = await self.put(href, fields)
+        self._invalidate(href)
+
+        if raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+
+        return self._parse_json(raw_result.content)
+
+    async def _delete_model(self, href, fields=None):
+        """DELETE a model.
+
+        If the response status is not 204, throws an APIException."""
+
+        raw_result = await self.delete(href, fields)
+        self._invalidate(href)
+
+        if raw_result.status != 204:
+            raise APIException(raw_result.status, raw_result.content)
+
+    def _get_headers(self):
+        """Get all the headers we're going to need.
+
+        See clarify.Client._get_headers()."""
+
+        user_agent = __api_lib_name__ + '/' + __version__ + '/' + \
+            PYTHON_VERSION
+
+        headers = {'User-Agent': user_agent,
+                   'Content-Type': 'application/x-www-form-urlencoded',
+                   'Accept-Encoding': ACCEPT_ENCODING}
+        if self.key:
+            headers['Authorization'] = 'Bearer ' + self.key
+        return headers
+
+    async def get(self, path, data=None, headers=None):
+        """Executes a GET.
+
+        See clarify.Client.get()."""
+
+        # Argument error checking.
+        assert path is not None
+
+        return await self._request('GET', path, params=data, headers=headers)
+
+    async def post(self, path, data):
+        """Executes a POST.
+
+        See clarify.Client.post()."""
+
+        # Argument error checking.
+        assert path is not None
+        assert data is None or isinstance(data, dict)
+
+        return await self._request('POST', path, body=data)
+
+    async def delete(self, path, data=None):
+        """Executes a DELETE.
+
+        See clarify.Client.delete()."""
+
+        # Argument error checking.
+        assert path is not None
+        assert data is None or isinstance(data, dict)
+
+        return await self._request('DELETE', path, params=data)
+
+    async def put(self, path, data):
+        """Executes a PUT.
+
+        See clarify.Client.put()."""
+
+        # Argument error checking.
+        assert path is not None
+        assert data is None or isinstance(data, dict)
+
+        return await self._request('PUT', path, body=data)
+
+    async def _request(self, method, path, params=None, body=None,
+                       headers=None):
+        """Executes a request, paced by the rate limiter and retried as
+        allowed by the retry policy, and returns a Result.
+
+        'params' are appended to the URL, 'body' is form encoded.
+        'headers' extra request headers, may be None."""
+
+        request_headers = self._get_headers()
+        if headers:
+            request_headers.update(headers)
+
+        session = self._get_session()
+        policy = self.retry_policy
+        retryable = policy.is_retryable_method(method)
+        started = time.time()
+        retry_number = 0
+
+        while True:
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.reserve(path)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            try:
+                async with session.request(
+                        method, self.base_url + path,
+                        params=_stringify(params), data=_stringify(body),
+                        headers=request_headers) as response:
+                    content = await response.read()
+            except aiohttp.ClientError:
+                delay = None
+                if retryable:
+                    delay = policy.get_delay(retry_number, started)
+                if delay is None:
+                    raise
+            else:
+                delay = None
+                if retryable and policy.is_retryable_status(response.status):
+                    delay = policy.get_delay(retry_number, started,
+                                             response.headers)
+                if delay is None:
+                    break
+
+            await asyncio.sleep(delay)
+            retry_number += 1
+
+        self._last_status.set(response.status)
+
+        wire_bytes = len(content)
+        compressed = is_compressed(response.headers) and \
+            not getattr(session, 'auto_decompress', True)
+        if compressed:
+            content = decode_content(content,
+                                     response.headers.get('Content-Encoding'))
+        self._transfer_stats.record(wire_bytes, len(content), compressed)
+
+        return Result(status=response.status, headers=response.headers,
+                      content=content, json_codec=self.json_codec)
+
+    def _parse_json(self, content):
+        """Parse content, JSON as bytes or as a string, and return a
+        Python data structure.
+
+        If content couldn't be parsed, raises an APIDataException."""
+
+        # Argument error checking.
+        assert content is not None
+
+        return _parse_content(self.json_codec, content)
+
+
+class AsyncSingleFlight(object):
+    """Coalesces concurrent calls made by several tasks, like
+    coalesce.SingleFlight does for threads."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func, *args, **kwargs):
+        """Returns await func(*args, **kwargs), sharing the call with
+        any other task doing the same 'key' at the same time."""
+
+        future = self._calls.get(key)
+        if future is not None:
+            # Shielded, so that a cancelled follower doesn't cancel the
+            # call for everyone else.
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exception:
+            future.set_exception(exception)
+            # Mark the exception as retrieved in case nobody waits.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def __len__(self):
+        """The number of calls in flight."""
+        return len(self._calls)
+
+
+async def _pages_from(client, bundle_collection):
+    """Async generator over bundle_collection and the pages that
+    follow it."""
+
+    page = bundle_collection
+    while page is not None:
+        yield page
+        href = helper.get_link_href(page, 'next')
+        page = None
+        if href is not None:
+            page = await client.get_bundle_list(href)
+
+
+def _stringify(fields):
+    """Convert field values to strings, as aiohttp only encodes
+    strings."""
+    if not fields:
+        return None
+    return dict((key, str(value)) for key, value in fields.items())
+
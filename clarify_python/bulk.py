@@ -0,0 +1,139 @@
+"""
+Running a function over many items on a thread pool, collecting a
+per-item report instead of stopping at the first exception.
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Number of worker threads used by default.
+DEFAULT_MAX_WORKERS = 8
+
+# The outcome for one item: its position in the input, the item, the
+# value returned for it and the exception raised for it (or None).
+BulkItemResult = collections.namedtuple(
+    'BulkItemResult', ['index', 'item', 'result', 'exception'])
+
+
+class BulkReport(object):
+    """The outcome of a bulk run.
+
+    'results' the BulkItemResult of every item that was run, in the
+    order they completed or in input order (see run_concurrently()).
+    'stopped' True if the run was stopped before all the items were
+    run."""
+
+    def __init__(self, results=None, stopped=False):
+        self.results = results if results is not None else []
+        self.stopped = stopped
+
+    @property
+    def succeeded(self):
+        """The results of the items that did not raise."""
+        return [result for result in self.results
+                if result.exception is None]
+
+    @property
+    def failed(self):
+        """The results of the items that raised an exception."""
+        return [result for result in self.results
+                if result.exception is not None]
+
+    def get_summary(self):
+        """Returns a dictionary with the number of items 'run',
+        'succeeded' and 'failed', and whether the run was 'stopped'."""
+        failed = len(self.failed)
+        return {'run': len(self.results), 'succeeded': len(self.results) -
+                failed, 'failed': failed, 'stopped': self.stopped}
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __repr__(self):
+        return 'BulkReport(%r)' % (self.get_summary(),)
+
+
+def run_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS,
+                     preserve_order=False, stop_on_false=True):
+    """Call func(item) for every item on a pool of 'max_workers' threads
+    and return a BulkReport.
+
+    'items' an iterable, consumed as the workers need more items so
+    that it may be a (lazy) generator of any length.
+    'preserve_order' if True, the report lists the results in input
+    order instead of completion order.
+    'stop_on_false' if True, the first call returning False stops the
+    run: no new items are started and the queued ones are cancelled.
+    Calls already running complete and are reported.
+
+    An exception raised by func is recorded in the report for its item
+    and the run goes on. An exception raised by 'items' itself stops the
+    run and is raised once the running calls are done."""
+
+    report = BulkReport()
+    for result in iter_concurrently(func, items, max_workers,
+                                    stop_on_false):
+        report.results.append(result)
+        if stop_on_false and result.result is False:
+            report.stopped = True
+
+    if preserve_order:
+        report.results.sort(key=lambda result: result.index)
+    return report
+
+
+def iter_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS,
+                      stop_on_false=True):
+    """Generator calling func(item) for every item on a pool of
+    'max_workers' threads, and yielding the BulkItemResult of each item
+    as soon as it completes. See run_concurrently().
+
+    Closing the generator cancels the queued items; calls already
+    running complete but are not reported. 'items' is left open: the
+    caller may go on reading it, and closes it if needed."""
+
+    # Argument error checking.
+    assert func is not None
+    assert max_workers > 0
+
+    # Enough queued work to keep every worker busy, without reading the
+    # whole input.
+    max_pending = max_workers * 2
+    item_iter = iter(enumerate(items))
+    exhausted = False
+    stopped = False
+    pending = {}
+    executor = ThreadPoolExecutor(max_workers)
+    try:
+        while True:
+            while not exhausted and not stopped and \
+                    len(pending) < max_pending:
+                try:
+                    index, item = next(item_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, item)] = (index, item)
+
+            if not pending:
+                break
+
+            done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item = pending.pop(future)
+                if future.cancelled():
+                    continue
+                exception = future.exception()
+                result = None if exception is not None else future.result()
+                if stop_on_false and result is False and not stopped:
+                    stopped = True
+                    for other in pending:
+                        other.cancel()
+                yield BulkItemResult(index, item, result, exception)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
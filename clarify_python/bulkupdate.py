@@ -0,0 +1,131 @@
+"""
+Bulk metadata updates with optimistic concurrency: each update is sent
+with the version of the metadata it was computed from, and on a 409
+conflict the metadata is fetched again, transformed again and the update
+retried, up to a retry budget.
+
+    def add_tag(user_data):
+        user_data.setdefault('tags', []).append('reviewed')
+        return user_data
+
+    report = client.update_metadata_bulk(add_tag, bundle_hrefs)
+    report.get_summary()  # {..., 'conflicts': 3}
+"""
+
+import copy
+import threading
+from clarify_python import helper
+from clarify_python.bulk import BulkReport
+
+# Number of times an update is retried after a 409 conflict by default.
+DEFAULT_MAX_CONFLICT_RETRIES = 5
+
+HTTP_CONFLICT = 409
+
+
+class UpdateReport(BulkReport):
+    """The outcome of update_metadata_bulk(): a BulkReport with a
+    BulkItemResult per bundle, whose 'result' is the updated metadata,
+    or None if the transform left it unchanged.
+
+    'conflicts' the number of 409 conflicts met, including those that
+    were retried successfully."""
+
+    def __init__(self, results=None, stopped=False, conflicts=0):
+        BulkReport.__init__(self, results, stopped)
+        self.conflicts = conflicts
+
+    @property
+    def skipped(self):
+        """The results of the bundles the transform left unchanged."""
+        return [result for result in self.results
+                if result.exception is None and result.result is None]
+
+    def get_summary(self):
+        """Returns the BulkReport summary, with the number of bundles
+        'skipped' and of 'conflicts'."""
+        summary = BulkReport.get_summary(self)
+        summary.update({'skipped': len(self.skipped),
+                        'conflicts': self.conflicts})
+        return summary
+
+    def __repr__(self):
+        return 'UpdateReport(%r)' % (self.get_summary(),)
+
+
+class MetadataUpdater(object):
+    """Applies a transform to the metadata of a bundle, retrying on
+    conflicts. Called by the worker threads of update_metadata_bulk(),
+    and counts the conflicts in 'report'."""
+
+    def __init__(self, client, transform, report,
+                 max_retries=DEFAULT_MAX_CONFLICT_RETRIES):
+        """Initializer.
+
+        'client' the clarify.Client.
+        'transform' a function called as transform(user_data) with a
+        copy of the user metadata of a bundle, returning the new user
+        metadata, or None to leave it unchanged.
+        'report' the UpdateReport counting the conflicts.
+        'max_retries' the number of retries after conflicts, per
+        bundle."""
+
+        # Argument error checking.
+        assert client is not None
+        assert transform is not None
+        assert max_retries >= 0
+
+        self.client = client
+        self.transform = transform
+        self.report = report
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+
+    def __call__(self, bundle):
+        """Update the metadata of 'bundle', a bundle href or a bundle
+        data structure (with its metadata embedded or not). Returns the
+        updated metadata, or None.
+
+        If the update fails, or still conflicts after max_retries
+        retries, throws an APIException."""
+
+        # Deferred, clarify imports this module.
+        from clarify_python.clarify import APIException
+
+        if not hasattr(bundle, 'keys'):
+            bundle = self.client.get_bundle(bundle, embed_metadata=True)
+        href = helper.get_link_href(bundle, 'clarify:metadata')
+        # helper.get_embedded() requires an '_embedded' object.
+        metadata = (bundle.get('_embedded') or {}).get('clarify:metadata')
+        if metadata is None:
+            metadata = self.client._get_model(href, use_cache=False)
+
+        retries = 0
+        while True:
+            user_data = self.transform(_copy_user_data(metadata))
+            if user_data is None:
+                return None
+            version = metadata.get('version')
+            try:
+                return self.client.update_metadata(
+                    href, user_data,
+                    int(version) if version is not None else None)
+            except APIException as e:
+                if e.get_http_response() != HTTP_CONFLICT:
+                    raise
+                with self._lock:
+                    self.report.conflicts += 1
+                if retries >= self.max_retries:
+                    raise
+                retries += 1
+            metadata = self.client._get_model(href, use_cache=False)
+
+
+def _copy_user_data(metadata):
+    """Returns a deep copy of the user metadata of 'metadata', as plain
+    dictionaries."""
+    user_data = metadata.get('data')
+    to_dict = getattr(user_data, 'to_dict', None)
+    if to_dict is not None:
+        user_data = to_dict()
+    return copy.deepcopy(user_data) if user_data is not None else {}
@@ -0,0 +1,188 @@
+"""
+Caches for models read by the clients.
+"""
+
+import time
+import threading
+import collections
+
+# An entry of the ValidatorCache: the validators returned with a model
+# and the model itself.
+ValidatorEntry = collections.namedtuple('ValidatorEntry',
+                                        ['etag', 'last_modified', 'model'])
+
+
+def make_key(href, embed=None, method='GET'):
+    """Returns the cache key for the model at 'href' requested with
+    'method' and 'embed' (a value returned by helper.process_embed())."""
+    return (method, href, embed)
+
+
+class ValidatorCache(object):
+    """Remembers the ETag and Last-Modified validators of models, along
+    with the parsed models, so that they can be revalidated with a
+    conditional GET. A 304 Not Modified response is answered with the
+    cached model, saving the download and the JSON parsing.
+
+    The cache is thread-safe and holds at most 'maxsize' models, the
+    least recently used ones being dropped first.
+
+    Cached models are shared by every caller that gets them from the
+    cache and must not be modified."""
+
+    def __init__(self, maxsize=1024):
+        """Initializer.
+
+        'maxsize' the maximum number of models to keep."""
+
+        # Argument error checking.
+        assert maxsize > 0
+
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, key):
+        """Returns the ValidatorEntry for 'key', or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+            return entry
+
+    def set(self, key, etag, last_modified, model):
+        """Store the validators and model for 'key'."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = ValidatorEntry(etag, last_modified, model)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def remove(self, key):
+        """Forget 'key'."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Forget everything."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def get_conditional_headers(entry):
+    """Returns the headers of a conditional GET revalidating 'entry', a
+    ValidatorEntry."""
+
+    headers = {}
+    if entry.etag:
+        headers['If-None-Match'] = entry.etag
+    if entry.last_modified:
+        headers['If-Modified-Since'] = entry.last_modified
+    return headers
+
+
+class ResponseCache(object):
+    """An in-memory cache of models, bounded in size (least recently
+    used models are dropped first) and in time (models expire 'ttl'
+    seconds after they were fetched).
+
+    Keys are made by make_key(). A client using the cache invalidates
+    the models related to an href whenever it changes it (see
+    invalidate()); changes made by anyone else go unnoticed until the
+    models expire.
+
+    Any object with the same get(), set(), invalidate() and clear()
+    methods can be used instead, for example to share a cache between
+    processes.
+
+    The cache is thread-safe. Cached models are shared by every caller
+    that gets them from the cache and must not be modified."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        """Initializer.
+
+        'maxsize' the maximum number of models to keep.
+        'ttl' the number of seconds a model is kept. May be None, in
+        which case models only leave the cache when they are evicted or
+        invalidated."""
+
+        # Argument error checking.
+        assert maxsize > 0
+        assert ttl is None or ttl > 0
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key):
+        """Returns the model cached for 'key', or None."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                expires, model = entry
+                if expires is None or expires > time.time():
+                    self._entries[key] = entry
+                    self._hits += 1
+                    return model
+            self._misses += 1
+            return None
+
+    def set(self, key, model):
+        """Cache 'model' for 'key'."""
+        expires = None
+        if self.ttl is not None:
+            expires = time.time() + self.ttl
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, model)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, href):
+        """Drop every model affected by a change to 'href': the model
+        at 'href' (with any embed), the models below it, and the models
+        above it, which may embed it. For example changing a bundle's
+        metadata drops the metadata and the bundle."""
+
+        # Argument error checking.
+        assert href is not None
+
+        href = href.split('?', 1)[0].rstrip('/')
+        with self._lock:
+            for key in list(self._entries):
+                if is_related_href(key[1], href):
+                    del self._entries[key]
+
+    def clear(self):
+        """Forget everything."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Returns a dictionary with the number of 'hits', 'misses' and
+        cached 'models'."""
+        with self._lock:
+            return {'hits': self._hits, 'misses': self._misses,
+                    'models': len(self._entries)}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def is_related_href(cached_href, changed_href):
+    """Returns True if a change to 'changed_href' may change the model
+    at 'cached_href', that is if one of the hrefs is the other or is
+    below it."""
+
+    cached_href = cached_href.split('?', 1)[0].rstrip('/')
+    return cached_href == changed_href or \
+        cached_href.startswith(changed_href + '/') or \
+        changed_href.startswith(cached_href + '/')
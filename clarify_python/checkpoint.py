@@ -0,0 +1,195 @@
+"""
+Checkpoints for resumable crawls. The pagination hrefs returned by the
+API carry an opaque cursor; a checkpoint store keeps the href of the
+next page of a crawl, with its limit and embed overrides, under a key
+chosen by the caller:
+
+    store = FileCheckpointStore('crawl.json')
+    for bundle_href in client.iter_bundles(checkpoint_store=store,
+                                           checkpoint_key='export'):
+        ...
+
+If the crawl is interrupted, the same call resumes at the first page
+that wasn't completely processed. The checkpoint is removed once the
+crawl completes.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+
+
+class CheckpointStore(object):
+    """Base class of the checkpoint stores. A state is a dictionary of
+    JSON serializable values."""
+
+    def load(self, key):
+        """Returns the state saved under 'key', or None."""
+        raise NotImplementedError
+
+    def save(self, key, state):
+        """Durably save 'state' under 'key', replacing any previous
+        state."""
+        raise NotImplementedError
+
+    def clear(self, key):
+        """Remove the state saved under 'key', if any."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the resources held by the store."""
+        pass
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Keeps the checkpoints in a JSON file. Every save rewrites the file
+    atomically, so a crash leaves either the previous or the new
+    checkpoints."""
+
+    def __init__(self, path):
+        """Initializer.
+
+        'path' the file of the checkpoints. It is created by the first
+        save."""
+
+        # Argument error checking.
+        assert path is not None
+
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError):
+            if os.path.exists(self.path):
+                raise
+            return {}
+
+    def _write(self, checkpoints):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoints, f)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp_path, self.path)
+
+    def load(self, key):
+        with self._lock:
+            return self._read().get(key)
+
+    def save(self, key, state):
+        with self._lock:
+            checkpoints = self._read()
+            checkpoints[key] = state
+            self._write(checkpoints)
+
+    def clear(self, key):
+        with self._lock:
+            checkpoints = self._read()
+            if key in checkpoints:
+                del checkpoints[key]
+                self._write(checkpoints)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Keeps the checkpoints in a table of an SQLite database, which may
+    hold other tables."""
+
+    def __init__(self, path, table='clarify_checkpoints'):
+        """Initializer.
+
+        'path' the database file, or ':memory:'.
+        'table' the name of the table of the checkpoints, created if
+        needed."""
+
+        # Argument error checking.
+        assert path is not None
+        assert table is not None and table.replace('_', '').isalnum()
+
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute('CREATE TABLE IF NOT EXISTS ' + table +
+                               ' (key TEXT PRIMARY KEY, state TEXT NOT NULL)')
+            self._conn.commit()
+
+    def load(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT state FROM ' + self.table +
+                                     ' WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def save(self, key, state):
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO ' + self.table +
+                               ' (key, state) VALUES (?, ?)',
+                               (key, json.dumps(state)))
+            self._conn.commit()
+
+    def clear(self, key):
+        with self._lock:
+            self._conn.execute('DELETE FROM ' + self.table +
+                               ' WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def load_state(store, key, href=None, limit=None, embed_items=None,
+               embed_tracks=None, embed_metadata=None, embed_insights=None):
+    """Returns the checkpoint state saved in 'store' under 'key', or if
+    there is none (or 'store' is None) the state of a crawl starting at
+    'href' with the given limit and embed overrides."""
+
+    if store is not None:
+        # Argument error checking.
+        assert key is not None
+
+        state = store.load(key)
+        if state is not None:
+            return state
+    return {'href': href, 'limit': limit, 'embed_items': embed_items,
+            'embed_tracks': embed_tracks, 'embed_metadata': embed_metadata,
+            'embed_insights': embed_insights}
+
+
+def get_overrides(state):
+    """Returns the limit, embed_items, embed_tracks, embed_metadata and
+    embed_insights overrides of a checkpoint state."""
+    return (state.get('limit'), state.get('embed_items'),
+            state.get('embed_tracks'), state.get('embed_metadata'),
+            state.get('embed_insights'))
+
+
+def save_next_page(store, key, page, state):
+    """Save the checkpoint following 'page', a completely processed page
+    of a crawl with checkpoint 'state', or clear it if 'page' is the last
+    one. Does nothing if 'store' is None."""
+
+    if store is None:
+        return
+    link = page['_links'].get('next')
+    href = link.get('href') if link else None
+    if href is None:
+        store.clear(key)
+    else:
+        state = dict(state)
+        state['href'] = href
+        store.save(key, state)
+
+
+def _replace(src, dst):
+    """os.replace(), which Python 2 lacks."""
+    replace = getattr(os, 'replace', None)
+    if replace is not None:
+        replace(src, dst)
+        return
+    if os.name == 'nt' and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
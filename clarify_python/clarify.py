@@ -4,37 +4,128 @@
 """
 
 import sys
-import collections
-import urllib3
-import certifi
-try:
-    from urllib.parse import urlparse, parse_qs
-except ImportError:
-    from urlparse import urlparse, parse_qs
+import time
+import threading
 import json
 from clarify_python import helper
+from clarify_python.retry import DEFAULT_RETRY_POLICY, NO_RETRY_POLICY
+from clarify_python.encoding import ACCEPT_ENCODING, TransferStats
+from clarify_python.jsoncodec import get_codec
+from clarify_python.transport import Urllib3Transport, DEFAULT_BASE_URL, \
+    DEFAULT_POOL_MAXSIZE
+from clarify_python import cache
+from clarify_python import resource
+from clarify_python import jsonstream
+from clarify_python.pager import PagePrefetcher, DEFAULT_PREFETCH, \
+    get_next_href
+from clarify_python.bulk import run_concurrently, iter_concurrently, \
+    DEFAULT_MAX_WORKERS
+from clarify_python.multisearch import MultiSearch
+from clarify_python.purge import PurgeReport
+from clarify_python.waiter import InsightWaiter, DEFAULT_MAX_POLL_RATE, \
+    DEFAULT_INITIAL_DELAY, DEFAULT_MAX_DELAY
+from clarify_python.bulkupdate import UpdateReport, MetadataUpdater, \
+    DEFAULT_MAX_CONFLICT_RETRIES
+from clarify_python.checkpoint import load_state, get_overrides, \
+    save_next_page
+from clarify_python.coalesce import SingleFlight, make_flight_key
 from clarify_python.constants import __version__
 from clarify_python.constants import __api_version__
 from clarify_python.constants import __api_lib_name__
-from clarify_python.constants import __host__
 
 BUNDLES_PATH = 'bundles'
 SEARCH_PATH = 'search'
 PYTHON_VERSION = '.'.join(str(i) for i in sys.version_info[:3])
 
+# Size of the chunks read when streaming data.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
 #
 # Client.
 #
 
 class Client(object):
-    """Holds the environment."""
+    """Holds the environment.
+
+    A Client may be shared by several threads. Connections are kept
+    alive and reused through a pool, and the status returned by
+    get_last_status() is tracked per thread."""
+
+    def __init__(self, key, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False, pool_idle_timeout=None,
+                 retry_policy=DEFAULT_RETRY_POLICY, rate_limiter=None,
+                 validator_cache=None, response_cache=None, coalesce=False,
+                 base_url=DEFAULT_BASE_URL, transport=None, json_codec=None,
+                 resources=False):
+        """Initializer.
+
+        'key' the API key.
+        'pool_maxsize' the number of connections to keep alive for
+        reuse. Should be at least the number of threads sharing this
+        client.
+        'pool_block' if True, no more than 'pool_maxsize' connections
+        are ever opened and threads wait for a free one. If False, extra
+        connections are opened when needed but are not kept alive.
+        'pool_idle_timeout' the number of seconds a pooled connection
+        may sit unused before it is closed and reopened on next use.
+        May be None, in which case idle connections are never evicted.
+        'retry_policy' a retry.RetryPolicy deciding how 429, 5xx
+        responses and connection errors are retried. The default
+        retries idempotent requests a few times. May be None to never
+        retry.
+        'rate_limiter' a ratelimit.RateLimiter pacing every request,
+        including retries. May be None for no client side limit.
+        'validator_cache' a cache.ValidatorCache. If given, get_bundle(),
+        get_metadata(), get_track_list(), get_track(), get_insights()
+        and get_insight() revalidate models they got before with a
+        conditional GET, and return the cached model if it has not
+        changed. May be None.
+        'response_cache' a cache.ResponseCache (or an object with the
+        same methods). If given, the same getters answer from the cache
+        while their models are fresh, and the models related to an href
+        are invalidated when this client updates or deletes it. May be
+        None.
+        'coalesce' if True, threads making the same model GET (same
+        href and query) at the same time share a single request and its
+        parsed result, which must then not be modified.
+        'base_url' the URL of the API, for example to use a local stand
+        in. Hrefs returned by the API are relative to it.
+        'transport' a transport.Transport sending the requests. May be
+        None, in which case a transport.Urllib3Transport is created
+        from 'base_url' and the 'pool_*' arguments, which are otherwise
+        ignored.
+        'json_codec' a jsoncodec.JSONCodec parsing the responses and
+        serializing metadata. May be None, in which case the fastest
+        installed codec is used (see jsoncodec.get_codec()).
+        'resources' if True, the cover functions return resource.Resource
+        objects instead of dictionaries. They support the same read
+        access, plus attribute access and link following."""
 
-    def __init__(self, key):
         self.key = key
-        self.conn = urllib3.HTTPSConnectionPool(__host__, maxsize=1,
-                                                cert_reqs='CERT_REQUIRED',
-                                                ca_certs=certifi.where())
-        self._last_status = None
+        if transport is None:
+            transport = Urllib3Transport(base_url, pool_maxsize, pool_block,
+                                         pool_idle_timeout)
+        self.transport = transport
+        # The urllib3 connection pool, kept for backwards compatibility.
+        self.conn = getattr(transport, 'pool', None)
+        self.retry_policy = retry_policy or NO_RETRY_POLICY
+        self.rate_limiter = rate_limiter
+        self.validator_cache = validator_cache
+        self.response_cache = response_cache
+        self.json_codec = json_codec or get_codec()
+        self.resources = resources
+        self._single_flight = SingleFlight() if coalesce else None
+        self._transfer_stats = TransferStats()
+        self._local = threading.local()
+
+    @property
+    def _last_status(self):
+        """The HTTP status of the last request made by this thread."""
+        return getattr(self._local, 'last_status', None)
+
+    @_last_status.setter
+    def _last_status(self, value):
+        self._local.last_status = value
 
 
     def get_bundle_list(self, href=None, limit=None, embed_items=None,
@@ -66,25 +157,57 @@ class Client(object):
         # Argument error checking.
         assert limit is None or limit > 0
 
-        j = None
-        if href is None:
-            j = self._get_first_bundle_list(limit,
-                                            embed_items,
-                                            embed_tracks,
-                                            embed_metadata,
-                                            embed_insights)
-        else:
-            j = self._get_additional_bundle_list(href, limit,
-                                                 embed_items,
-                                                 embed_tracks,
-                                                 embed_metadata,
-                                                 embed_insights)
+        j = self._get_bundle_list_content(href, limit, embed_items,
+                                          embed_tracks, embed_metadata,
+                                          embed_insights)
 
         # Convert the JSON to a python data struct.
 
         return self._parse_json(j)
 
 
+    def _get_bundle_list_content(self, href=None, limit=None,
+                                 embed_items=None, embed_tracks=None,
+                                 embed_metadata=None, embed_insights=None):
+        """Get the raw JSON of a bundle list page, the first one if href
+        is None.
+
+        If the response status is not 2xx, throws an APIException."""
+
+        if href is None:
+            return self._get_first_bundle_list(limit,
+                                               embed_items,
+                                               embed_tracks,
+                                               embed_metadata,
+                                               embed_insights)
+        return self._get_additional_bundle_list(href, limit,
+                                                embed_items,
+                                                embed_tracks,
+                                                embed_metadata,
+                                                embed_insights)
+
+
+    def _get_bundle_page(self, href=None, limit=None, embed_items=None,
+                         embed_tracks=None, embed_metadata=None,
+                         embed_insights=None, page_sizer=None):
+        """get_bundle_list(), with the limit chosen by page_sizer if it
+        is not None."""
+
+        if page_sizer is None:
+            return self.get_bundle_list(href, limit, embed_items,
+                                        embed_tracks, embed_metadata,
+                                        embed_insights)
+
+        limit = page_sizer.get_limit()
+        started = time.time()
+        j = self._get_bundle_list_content(href, limit, embed_items,
+                                          embed_tracks, embed_metadata,
+                                          embed_insights)
+        page = self._parse_json(j)
+        _record_page(page_sizer, limit, page, time.time() - started, j)
+        return page
+
+
     def _get_first_bundle_list(self, limit=None,
                                embed_items=None,
                                embed_tracks=None,
@@ -102,7 +225,7 @@ class Client(object):
         Note that including tracks and metadata without including items
         is meaningless.
 
-        Returns the raw JSON returned by the API.
+        Returns the raw JSON returned by the API, as bytes.
 
         If the response status is not 2xx, throws an APIException."""
 
@@ -126,9 +249,9 @@ class Client(object):
         raw_result = self.get(path, data)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
         else:
-            result = raw_result.json
+            result = raw_result.content
 
         return result
 
@@ -144,46 +267,31 @@ class Client(object):
 
         All other arguments override arguments in the href.
 
-        Returns the raw JSON returned by the API.
+        Returns the raw JSON returned by the API, as bytes.
 
         If the response status is not 2xx, throws an APIException."""
 
-        url_components = urlparse(href)
-        path = url_components.path
-        data = parse_qs(url_components.query)
-
-        # Change all lists into discrete values.
-        for key in data.keys():
-            data[key] = data[key][0]
-
-        # Deal with limit overriding.
-        if limit is not None:
-            data['limit'] = limit
-
-        # Deal with embeds overriding.
-        final_embed = helper.process_embed_override(data.get('embed'),
-                                                    embed_items,
-                                                    embed_tracks,
-                                                    embed_metadata,
-                                                    embed_insights)
-        if final_embed is not None:
-            data['embed'] = final_embed
+        path, data = helper.process_page_href(href, limit,
+                                              embed_items,
+                                              embed_tracks,
+                                              embed_metadata,
+                                              embed_insights)
 
         raw_result = self.get(path, data)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            print('*****')
-            print(raw_result.status)
-            print(raw_result.json)
-            print('*****')
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
         else:
-            result = raw_result.json
+            result = raw_result.content
 
         return result
 
 
-    def bundle_list_map(self, func, bundle_collection=None):
+    def bundle_list_map(self, func, bundle_collection=None, limit=None,
+                        embed_items=None, embed_tracks=None,
+                        embed_metadata=None, embed_insights=None,
+                        page_sizer=None, checkpoint_store=None,
+                        checkpoint_key=None):
         """
         Execute func on every bundle in a collection.
         Func will be called as func(client, bundle_href).
@@ -191,22 +299,55 @@ class Client(object):
         Otherwise, bundle_collection can be the model returned from
         a call to get_bundle_list() or search().
         If func returns False, the iteration is stopped.
+
+        If 'embed_items' is True, the pages are requested with the
+        bundles embedded and func is called as func(client, bundle)
+        with the embedded bundle instead of its href, saving a
+        get_bundle() per bundle. 'embed_tracks', 'embed_metadata' and
+        'embed_insights' also embed those in each bundle. A
+        bundle_collection must then have been requested with the same
+        embeds. 'limit' sets the page size.
+
+        'page_sizer' a pager.AdaptivePageSizer choosing the size of each
+        page from the throughput of the previous ones, instead of
+        'limit'. May be None.
+
+        'checkpoint_store' a checkpoint.CheckpointStore where the href of
+        the next page, with the limit and embed overrides, is saved under
+        'checkpoint_key' once func has been called for every bundle of a
+        page. If a checkpoint is saved under that key, the iteration
+        resumes from it with its overrides, and bundle_collection is
+        ignored. The checkpoint is cleared when the iteration completes.
         """
+        state = load_state(checkpoint_store, checkpoint_key, None, limit,
+                           embed_items, embed_tracks, embed_metadata,
+                           embed_insights)
+        if state['href'] is not None:
+            bundle_collection = None
+        limit, embed_items, embed_tracks, embed_metadata, embed_insights = \
+            get_overrides(state)
+
         has_next = True
-        next_href = None  # if None, retrieves first page
+        next_href = state['href']  # if None, retrieves first page
         stopped = False
 
         while has_next and not stopped:
             # Get a page and perform the requested function.
             if bundle_collection is None:
-                bundle_collection = self.get_bundle_list(next_href)
-            for i in bundle_collection['_links']['items']:
-                href = i['href']
-                if func(self, href) is False:
+                bundle_collection = self._get_bundle_page(next_href, limit,
+                                                          embed_items,
+                                                          embed_tracks,
+                                                          embed_metadata,
+                                                          embed_insights,
+                                                          page_sizer)
+            for item in _get_page_items(bundle_collection, embed_items):
+                if func(self, item) is False:
                     stopped = True
                     break
             # Check for following page.
             if not stopped:
+                save_next_page(checkpoint_store, checkpoint_key,
+                               bundle_collection, state)
                 next_href = None
                 if 'next' in bundle_collection['_links']:
                     next_href = bundle_collection['_links']['next']['href']
@@ -215,6 +356,148 @@ class Client(object):
                     has_next = False
 
 
+    def bundle_list_map_concurrent(self, func, bundle_collection=None,
+                                   max_workers=DEFAULT_MAX_WORKERS,
+                                   preserve_order=False,
+                                   prefetch=DEFAULT_PREFETCH, limit=None,
+                                   embed_items=None, embed_tracks=None,
+                                   embed_metadata=None, embed_insights=None,
+                                   page_sizer=None):
+        """
+        Execute func on every bundle in a collection, like
+        bundle_list_map(), on a pool of 'max_workers' threads.
+        Func will be called as func(client, bundle_href), or
+        func(client, bundle) if 'embed_items' is True, and must be
+        thread-safe.
+
+        If func returns False, no further bundles are started and the
+        queued ones are cancelled; calls already running complete.
+        An exception raised by func is recorded for its bundle instead
+        of stopping the iteration.
+
+        'preserve_order' if True, the results are reported in page
+        order, otherwise in completion order.
+        'prefetch' see iter_bundle_pages().
+        'limit', 'embed_*' and 'page_sizer' see bundle_list_map().
+
+        Returns a bulk.BulkReport with a BulkItemResult per bundle run,
+        whose 'item' is the bundle href (or the bundle).
+
+        If a page can't be retrieved, throws an APIException once the
+        running calls are done.
+        """
+
+        items = self._iter_collection_items(bundle_collection, prefetch,
+                                            limit, embed_items, embed_tracks,
+                                            embed_metadata, embed_insights,
+                                            page_sizer)
+        try:
+            return run_concurrently(lambda item: func(self, item), items,
+                                    max_workers, preserve_order)
+        finally:
+            # Stops the prefetching of pages if the run was stopped.
+            items.close()
+
+
+    def _iter_collection_items(self, bundle_collection, prefetch, limit=None,
+                               embed_items=None, embed_tracks=None,
+                               embed_metadata=None, embed_insights=None,
+                               page_sizer=None):
+        """Generator yielding the item hrefs (or embedded items) of
+        bundle_collection and of the pages following it, or of every
+        bundle if None."""
+
+        if bundle_collection is not None:
+            for item in _get_page_items(bundle_collection, embed_items):
+                yield item
+            next_href = get_next_href(bundle_collection)
+            if next_href is None:
+                return
+        else:
+            next_href = None
+
+        for page in self.iter_bundle_pages(next_href, limit, embed_items,
+                                           embed_tracks, embed_metadata,
+                                           embed_insights, prefetch,
+                                           page_sizer):
+            for item in _get_page_items(page, embed_items):
+                yield item
+
+
+    def iter_bundle_pages(self, href=None, limit=None, embed_items=None,
+                          embed_tracks=None, embed_metadata=None,
+                          embed_insights=None, prefetch=DEFAULT_PREFETCH,
+                          page_sizer=None, checkpoint_store=None,
+                          checkpoint_key=None):
+        """Generator yielding the pages of the bundle list, as returned
+        by get_bundle_list(), starting with 'href' (or the first page if
+        None).
+
+        While the caller works on a page, a background thread fetches up
+        to 'prefetch' following pages. If 0, each page is fetched when
+        needed.
+
+        'page_sizer' a pager.AdaptivePageSizer choosing the size of each
+        page from the throughput of the previous ones, instead of
+        'limit'. Its get_stats() reports the sizes chosen. May be None.
+
+        'checkpoint_store' a checkpoint.CheckpointStore where the href of
+        the next page, with the limit and embed overrides, is saved under
+        'checkpoint_key' when the caller asks for the page after a
+        completed one. If a checkpoint is saved under that key, the
+        iteration resumes from it with its overrides instead of 'href'.
+        At most one page is processed again after a failure. The
+        checkpoint is cleared when the iteration completes.
+
+        The other arguments are those of get_bundle_list().
+
+        If the response status is not 2xx, throws an APIException.
+        If the JSON to python data struct conversion fails, throws an
+        APIDataException."""
+
+        # Argument error checking.
+        assert limit is None or limit > 0
+
+        state = load_state(checkpoint_store, checkpoint_key, href, limit,
+                           embed_items, embed_tracks, embed_metadata,
+                           embed_insights)
+        href = state['href']
+        limit, embed_items, embed_tracks, embed_metadata, embed_insights = \
+            get_overrides(state)
+
+        def fetch_page(page_href):
+            return self._get_bundle_page(page_href, limit, embed_items,
+                                         embed_tracks, embed_metadata,
+                                         embed_insights, page_sizer)
+
+        with PagePrefetcher(fetch_page, href, prefetch) as pages:
+            for page in pages:
+                yield page
+                save_next_page(checkpoint_store, checkpoint_key, page, state)
+
+
+    def iter_bundles(self, limit=None, embed_items=None, embed_tracks=None,
+                     embed_metadata=None, embed_insights=None,
+                     prefetch=DEFAULT_PREFETCH, page_sizer=None,
+                     checkpoint_store=None, checkpoint_key=None):
+        """Generator yielding every bundle: its href, or the embedded
+        bundle if 'embed_items' is True. Pages are prefetched, sized by
+        'page_sizer' and checkpointed in 'checkpoint_store' if not None,
+        see iter_bundle_pages().
+
+        If the response status is not 2xx, throws an APIException.
+        If the JSON to python data struct conversion fails, throws an
+        APIDataException."""
+
+        for page in self.iter_bundle_pages(None, limit, embed_items,
+                                           embed_tracks, embed_metadata,
+                                           embed_insights, prefetch,
+                                           page_sizer, checkpoint_store,
+                                           checkpoint_key):
+            for item in _get_page_items(page, embed_items):
+                yield item
+
+
     def create_bundle(self, name=None, media_url=None,
                       audio_channel=None, metadata=None, notify_url=None,
                       external_id=None):
@@ -246,7 +529,7 @@ class Client(object):
         if audio_channel is not None:
             fields['audio_channel'] = audio_channel
         if metadata is not None:
-            fields['metadata'] = json.dumps(metadata)
+            fields['metadata'] = self.json_codec.dumps(metadata)
         if notify_url is not None:
             fields['notify_url'] = notify_url
         if external_id is not None:
@@ -258,11 +541,54 @@ class Client(object):
         raw_result = self.post(path, data)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
         # Convert the JSON to a python data struct.
 
-        return self._parse_json(raw_result.json)
+        return self._parse_json(raw_result.content)
+
+
+    def create_bundles(self, bundle_specs, max_workers=DEFAULT_MAX_WORKERS,
+                       preserve_order=False):
+        """Create many bundles concurrently, on a pool of 'max_workers'
+        threads.
+
+        'bundle_specs' an iterable of dictionaries of create_bundle()
+        arguments ('name', 'media_url', 'audio_channel', 'metadata',
+        'notify_url', 'external_id'). It is consumed as bundles are
+        created, so it may be a generator of any length.
+        'preserve_order' if True, the results are reported in input
+        order, otherwise in completion order.
+
+        Returns a bulk.BulkReport with a BulkItemResult per spec, whose
+        'result' is the created bundle, or whose 'exception' is the
+        APIException (or other exception) that its creation raised.
+
+        Creations are only retried if the client's retry policy retries
+        POST; setting 'external_id' makes failed creations easy to find
+        and resubmit."""
+
+        return run_concurrently(self._create_bundle_from_spec, bundle_specs,
+                                max_workers, preserve_order,
+                                stop_on_false=False)
+
+
+    def iter_create_bundles(self, bundle_specs,
+                            max_workers=DEFAULT_MAX_WORKERS):
+        """Generator creating bundles like create_bundles(), and yielding
+        the BulkItemResult of each spec as soon as its creation
+        completes.
+
+        Closing the generator stops submitting specs; the creations
+        already running complete but are not reported."""
+
+        return iter_concurrently(self._create_bundle_from_spec, bundle_specs,
+                                 max_workers, stop_on_false=False)
+
+
+    def _create_bundle_from_spec(self, spec):
+        """create_bundle() with the arguments in the dictionary 'spec'."""
+        return self.create_bundle(**spec)
 
 
     def delete_bundle(self, href=None):
@@ -279,9 +605,64 @@ class Client(object):
         assert href is not None
 
         raw_result = self.delete(href)
+        self._invalidate(href)
 
         if raw_result.status != 204:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
+
+
+    def purge_bundles(self, predicate, dry_run=False,
+                      max_workers=DEFAULT_MAX_WORKERS, limit=None,
+                      embed_metadata=None, prefetch=DEFAULT_PREFETCH):
+        """Delete every bundle matching a predicate, concurrently.
+
+        'predicate' a function called as predicate(bundle) with each
+        embedded bundle of the bundle list, returning True to delete it,
+        such as a purge.BundleFilter.
+        'dry_run' if True, nothing is deleted and the report lists the
+        bundles that would be.
+        'max_workers' the number of deletes run at once.
+        'limit' the page size of the bundle list.
+        'embed_metadata' whether to embed the metadata in the listed
+        bundles. If None, it is embedded if the predicate has a true
+        'needs_metadata' attribute.
+        'prefetch' see iter_bundle_pages().
+
+        Deletes go through the client's rate limiter and retry policy,
+        so a ratelimit.RateLimiter paces them and 429 responses are
+        retried.
+
+        Returns a purge.PurgeReport with a BulkItemResult per matching
+        bundle href. Its get_summary() counts the bundles scanned,
+        matched and deleted.
+
+        If a page can't be retrieved, throws an APIException once the
+        running deletes are done."""
+
+        # Argument error checking.
+        assert predicate is not None
+
+        if embed_metadata is None:
+            embed_metadata = bool(getattr(predicate, 'needs_metadata', False))
+        report = PurgeReport(dry_run=dry_run)
+
+        def iter_matches():
+            for bundle in self.iter_bundles(limit, embed_items=True,
+                                            embed_metadata=embed_metadata,
+                                            prefetch=prefetch):
+                report.scanned += 1
+                if predicate(bundle):
+                    yield helper.get_link_href(bundle, 'self')
+
+        delete = (lambda href: None) if dry_run else self.delete_bundle
+        matches = iter_matches()
+        try:
+            result = run_concurrently(delete, matches, max_workers,
+                                      stop_on_false=False)
+        finally:
+            matches.close()
+        report.results = result.results
+        return report
 
 
     def get_bundle(self, href=None, embed_tracks=False,
@@ -317,14 +698,7 @@ class Client(object):
         if len(fields) > 0:
             data = fields
 
-        raw_result = self.get(href, data)
-
-        if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
-
-        # Convert the JSON to a python data struct.
-
-        return self._parse_json(raw_result.json)
+        return self._get_model(href, data)
 
     def update_bundle(self, href=None, name=None,
                       notify_url=None, version=None,
@@ -369,13 +743,14 @@ class Client(object):
             data = fields
 
         raw_result = self.put(href, data)
+        self._invalidate(href)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
         # Convert the JSON to a python data struct.
 
-        return self._parse_json(raw_result.json)
+        return self._parse_json(raw_result.content)
 
 
     def get_metadata(self, href=None):
@@ -421,18 +796,62 @@ class Client(object):
         fields = {}
         if version is not None:
             fields['version'] = version
-        fields['data'] = json.dumps(metadata)
+        fields['data'] = self.json_codec.dumps(metadata)
 
         data = fields
 
         raw_result = self.put(href, data)
+        self._invalidate(href)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
         # Convert the JSON to a python data struct.
 
-        return self._parse_json(raw_result.json)
+        return self._parse_json(raw_result.content)
+
+
+    def update_metadata_bulk(self, transform, bundles=None,
+                             max_workers=DEFAULT_MAX_WORKERS,
+                             max_retries=DEFAULT_MAX_CONFLICT_RETRIES,
+                             preserve_order=False):
+        """Update the metadata of many bundles concurrently, on a pool of
+        'max_workers' threads.
+
+        'transform' a function called as transform(user_data) with a
+        copy of the user metadata of a bundle, returning the new user
+        metadata, or None to leave it unchanged. It must be thread-safe.
+        'bundles' an iterable of bundle hrefs or bundle data structures,
+        ideally with their metadata embedded. If None, every bundle is
+        updated, listed with its metadata embedded.
+        'max_retries' the number of times an update is retried after a
+        409 conflict: the metadata is fetched again, transformed again
+        and sent with its new version.
+        'preserve_order' if True, the results are reported in input
+        order, otherwise in completion order.
+
+        Returns a bulkupdate.UpdateReport with a BulkItemResult per
+        bundle, whose 'result' is the updated metadata (or None). Its
+        'conflicts' counts the conflicts met, retried or not; a high
+        count suggests lowering max_workers or the number of concurrent
+        writers."""
+
+        report = UpdateReport()
+        updater = MetadataUpdater(self, transform, report, max_retries)
+        if bundles is not None:
+            result = run_concurrently(updater, bundles, max_workers,
+                                      preserve_order, stop_on_false=False)
+        else:
+            bundles = self.iter_bundles(embed_items=True,
+                                        embed_metadata=True)
+            try:
+                result = run_concurrently(updater, bundles, max_workers,
+                                          preserve_order,
+                                          stop_on_false=False)
+            finally:
+                bundles.close()
+        report.results = result.results
+        return report
 
 
     def delete_metadata(self, href=None):
@@ -448,9 +867,10 @@ class Client(object):
         assert href is not None
 
         raw_result = self.delete(href)
+        self._invalidate(href)
 
         if raw_result.status != 204:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
 
     def create_track(self, href=None, media_url=None, label=None,
@@ -491,13 +911,14 @@ class Client(object):
             data = fields
 
         raw_result = self.post(href, data)
+        self._invalidate(href)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
         # Convert the JSON to a python data struct.
 
-        return self._parse_json(raw_result.json)
+        return self._parse_json(raw_result.content)
 
 
     def get_track_list(self, href=None):
@@ -555,9 +976,10 @@ class Client(object):
             data = fields
 
         raw_result = self.delete(href, data)
+        self._invalidate(href)
 
         if raw_result.status != 204:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
 
     def delete_track(self, href=None):
@@ -573,9 +995,10 @@ class Client(object):
         assert href is not None
 
         raw_result = self.delete(href)
+        self._invalidate(href)
 
         if raw_result.status != 204:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
 
     def get_insights(self, href=None):
@@ -610,6 +1033,63 @@ class Client(object):
         return self._get_simple_model(href)
 
 
+    def wait_for_insights(self, targets, max_workers=DEFAULT_MAX_WORKERS,
+                          max_rate=DEFAULT_MAX_POLL_RATE,
+                          initial_delay=DEFAULT_INITIAL_DELAY,
+                          max_delay=DEFAULT_MAX_DELAY, timeout=None):
+        """Wait until the insights of many bundles are ready.
+
+        'targets' an iterable of (bundle, insight_rel) pairs: a bundle
+        href or data structure, and an insight name such as
+        'spoken_keywords' or 'insight:spoken_keywords'.
+        'max_workers' the maximum number of polls in flight.
+        'max_rate' the maximum number of requests per second, all
+        targets together.
+        'initial_delay' and 'max_delay' the bounds, in seconds, of the
+        exponentially growing, jittered delay between two polls of a
+        target.
+        'timeout' the number of seconds after which a target that isn't
+        ready is given up, after a last poll at the deadline. May be None
+        to wait forever.
+
+        Returns a waiter.InsightWaiter, yielding a waiter.WaitResult per
+        target as soon as its insight is ready (or failed, timed out or
+        raised an APIException other than 429/5xx)."""
+
+        return InsightWaiter(self, targets, max_workers, max_rate,
+                             initial_delay, max_delay, timeout)
+
+
+    def iter_insight_items(self, href, path='track_data.item.words',
+                           chunk_size=DEFAULT_CHUNK_SIZE):
+        """Generator yielding the items of a large insight one at a time
+        while it downloads, instead of parsing the whole insight first.
+        Memory use stays flat whatever the size of the insight.
+
+        'href' the relative href to the insight. May not be None.
+        'path' the path of the items in the insight, in the ijson
+        prefix syntax: keys separated by dots, 'item' standing for the
+        elements of an array. The default yields every word of a
+        spoken_words insight. See jsonstream.iter_items().
+        'chunk_size' the size of the chunks read from the connection.
+
+        If the response status is not 2xx, throws an APIException.
+        If the insight isn't valid JSON, throws an APIDataException.
+        Closing the generator before the end closes the connection."""
+
+        # Argument error checking.
+        assert href is not None
+        assert path is not None
+
+        with self._get_content(href, chunk_size) as chunks:
+            try:
+                for item in jsonstream.iter_items(chunks, path):
+                    yield item
+            except ValueError as exception:
+                msg = 'Unable to parse the insight incrementally.'
+                raise APIDataException(exception, None, msg)
+
+
     def request_insight(self, href, insight):
         """Requests an insight to be run.
 
@@ -638,20 +1118,28 @@ class Client(object):
         }
 
         raw_result = self.post(href, fields)
+        self._invalidate(href)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
         # Convert the JSON to a python data struct.
-        return self._parse_json(raw_result.json)
+        return self._parse_json(raw_result.content)
 
 
-    def get_data(self, href=None):
+    def get_data(self, href=None, stream=False,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
         """Gets data from an insight with data links such as captions.
 
         'href' the relative href to the data. May not be None.
+        'stream' if True, the data is not read into memory up front.
+        Instead an iterator over chunks of (undecoded) bytes is
+        returned. The iterator must be exhausted or closed to release
+        the connection.
+        'chunk_size' the maximum size of the chunks when streaming.
 
-        Returns the content of the data as a string.
+        Returns the content of the data as a string, or an iterator over
+        its bytes if 'stream' is True.
 
         If the response status is not 2xx, throws an APIException.
         """
@@ -659,14 +1147,59 @@ class Client(object):
         # Argument error checking.
         assert href is not None
 
+        if stream:
+            return self._get_content(href, chunk_size)
+
         raw_result = self.get(href)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
 
         return raw_result.json
 
 
+    def get_data_to_file(self, href, fileobj,
+                         chunk_size=DEFAULT_CHUNK_SIZE):
+        """Writes data from an insight with data links such as captions
+        to a file, using constant memory.
+
+        'href' the relative href to the data. May not be None.
+        'fileobj' a file-like object opened in binary mode. May not be
+        None.
+        'chunk_size' the size of the chunks written.
+
+        Returns the number of bytes written.
+
+        If the response status is not 2xx, throws an APIException.
+        """
+
+        # Argument error checking.
+        assert href is not None
+        assert fileobj is not None
+
+        size = 0
+        with self._get_content(href, chunk_size) as chunks:
+            for chunk in chunks:
+                fileobj.write(chunk)
+                size += len(chunk)
+
+        return size
+
+
+    def _get_content(self, href, chunk_size):
+        """GET href without loading the body and return an iterator over
+        its chunks.
+
+        If the response status is not 2xx, throws an APIException."""
+
+        response = self._send('GET', href, stream=True)
+
+        if response.status < 200 or response.status > 202:
+            raise APIException(response.status, response.read())
+
+        return _ContentIterator(response, chunk_size, self._transfer_stats)
+
+
     def _get_simple_model(self, href=None):
         """Get a model
 
@@ -682,14 +1215,84 @@ class Client(object):
         # Argument error checking.
         assert href is not None
 
-        raw_result = self.get(href)
+        return self._get_model(href)
 
-        if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
 
-        # Convert the JSON to a python data struct.
+    def _get_model(self, href, data=None, use_cache=True):
+        """GET a model, from the response cache if there is one, or
+        revalidating it with the validator cache if there is one.
+
+        'href' the relative href to the model. May not be None.
+        'data' may be None or a dictionary of query fields.
+        'use_cache' if False, the caches are bypassed; the model is
+        still stored in them.
+
+        Returns a data structure equivalent to the JSON returned by the
+        API.
+
+        If the response status is not 2xx, throws an APIException.
+        If the JSON to python data struct conversion fails, throws an
+        APIDataException."""
 
-        return self._parse_json(raw_result.json)
+        key = cache.make_key(href, data.get('embed') if data else None)
+
+        response_cache = self.response_cache
+        if response_cache is not None and use_cache:
+            result = response_cache.get(key)
+            if result is not None:
+                return result
+
+        if self._single_flight is not None:
+            return self._single_flight.do(make_flight_key('GET', href, data),
+                                          self._fetch_model, href, data,
+                                          key, use_cache)
+
+        return self._fetch_model(href, data, key, use_cache)
+
+
+    def _fetch_model(self, href, data, key, use_cache):
+        """GET a model for _get_model(), revalidating it with the
+        validator cache if there is one, and store it in the caches.
+
+        'key' the cache key of the model."""
+
+        response_cache = self.response_cache
+        validator_cache = self.validator_cache
+        entry = None
+        headers = None
+        if validator_cache is not None and use_cache:
+            entry = validator_cache.get(key)
+            if entry is not None:
+                headers = cache.get_conditional_headers(entry)
+
+        raw_result = self.get(href, data, headers)
+
+        if raw_result.status == 304 and entry is not None:
+            result = entry.model
+        elif raw_result.status < 200 or raw_result.status > 202:
+            raise APIException(raw_result.status, raw_result.content)
+        else:
+            # Convert the JSON to a python data struct.
+            result = self._parse_json(raw_result.content)
+
+            if validator_cache is not None:
+                etag = raw_result.headers.get('ETag')
+                last_modified = raw_result.headers.get('Last-Modified')
+                if etag or last_modified:
+                    validator_cache.set(key, etag, last_modified, result)
+                else:
+                    validator_cache.remove(key)
+
+        if response_cache is not None:
+            response_cache.set(key, result)
+
+        return result
+
+
+    def _invalidate(self, href):
+        """Drop the cached models affected by a change to href."""
+        if self.response_cache is not None:
+            self.response_cache.invalidate(href)
 
 
     def search(self, href=None,
@@ -733,26 +1336,166 @@ class Client(object):
         assert query is not None
         assert limit is None or limit > 0
 
-        if href is None:
-            j = self._search_p1(query, query_fields, query_filter, limit,
-                                embed_items, embed_tracks, embed_metadata,
-                                embed_insights, language)
-
-        else:
-            j = self._search_pn(href, limit, embed_items, embed_tracks,
-                                embed_insights, embed_metadata)
+        j = self._search_content(href, query, query_fields, query_filter,
+                                 limit, embed_items, embed_tracks,
+                                 embed_metadata, embed_insights, language)
 
         # Convert the JSON to a python data struct.
 
         return self._parse_json(j)
 
 
+    def _search_content(self, href=None, query=None, query_fields=None,
+                        query_filter=None, limit=None, embed_items=None,
+                        embed_tracks=None, embed_metadata=None,
+                        embed_insights=None, language=None):
+        """Get the raw JSON of a page of search results, the first one
+        if href is None.
+
+        If the response status is not 2xx, throws an APIException."""
+
+        if href is None:
+            return self._search_p1(query, query_fields, query_filter, limit,
+                                   embed_items, embed_tracks, embed_metadata,
+                                   embed_insights, language)
+        return self._search_pn(href, limit, embed_items, embed_tracks,
+                               embed_metadata, embed_insights)
+
+
+    def _get_search_page(self, href=None, query=None, query_fields=None,
+                         query_filter=None, limit=None, embed_items=None,
+                         embed_tracks=None, embed_metadata=None,
+                         embed_insights=None, language=None,
+                         page_sizer=None):
+        """search(), with the limit chosen by page_sizer if it is not
+        None."""
+
+        if page_sizer is None:
+            return self.search(href, query, query_fields, query_filter,
+                               limit, embed_items, embed_tracks,
+                               embed_metadata, embed_insights, language)
+
+        limit = page_sizer.get_limit()
+        started = time.time()
+        j = self._search_content(href, query, query_fields, query_filter,
+                                 limit, embed_items, embed_tracks,
+                                 embed_metadata, embed_insights, language)
+        page = self._parse_json(j)
+        _record_page(page_sizer, limit, page, time.time() - started, j)
+        return page
+
+
+    def iter_search_pages(self, query=None, query_fields=None,
+                          query_filter=None, limit=None, embed_items=None,
+                          embed_tracks=None, embed_metadata=None,
+                          embed_insights=None, language=None, href=None,
+                          prefetch=DEFAULT_PREFETCH, page_sizer=None,
+                          checkpoint_store=None, checkpoint_key=None):
+        """Generator yielding the pages of the results of a search, as
+        returned by search(). The arguments are those of search(); pages
+        are prefetched, sized by 'page_sizer' and checkpointed in
+        'checkpoint_store' if not None, as in iter_bundle_pages().
+
+        If the response status is not 2xx, throws an APIException.
+        If the JSON to python data struct conversion fails, throws an
+        APIDataException."""
+
+        # Argument error checking.
+        assert query is not None
+        assert limit is None or limit > 0
+
+        state = load_state(checkpoint_store, checkpoint_key, href, limit,
+                           embed_items, embed_tracks, embed_metadata,
+                           embed_insights)
+        href = state['href']
+        limit, embed_items, embed_tracks, embed_metadata, embed_insights = \
+            get_overrides(state)
+
+        def fetch_page(page_href):
+            return self._get_search_page(page_href, query, query_fields,
+                                         query_filter, limit, embed_items,
+                                         embed_tracks, embed_metadata,
+                                         embed_insights, language,
+                                         page_sizer)
+
+        with PagePrefetcher(fetch_page, href, prefetch) as pages:
+            for page in pages:
+                yield page
+                save_next_page(checkpoint_store, checkpoint_key, page, state)
+
+
+    def iter_search(self, query=None, query_fields=None, query_filter=None,
+                    limit=None, embed_items=None, embed_tracks=None,
+                    embed_metadata=None, embed_insights=None, language=None,
+                    prefetch=DEFAULT_PREFETCH, page_sizer=None,
+                    checkpoint_store=None, checkpoint_key=None):
+        """Generator yielding every bundle matching a search: its href,
+        or the embedded bundle if 'embed_items' is True. Pages are
+        prefetched, sized by 'page_sizer' and checkpointed in
+        'checkpoint_store' if not None, see iter_bundle_pages().
+
+        If the response status is not 2xx, throws an APIException.
+        If the JSON to python data struct conversion fails, throws an
+        APIDataException."""
+
+        for page in self.iter_search_pages(query, query_fields,
+                                           query_filter, limit, embed_items,
+                                           embed_tracks, embed_metadata,
+                                           embed_insights, language,
+                                           prefetch=prefetch,
+                                           page_sizer=page_sizer,
+                                           checkpoint_store=checkpoint_store,
+                                           checkpoint_key=checkpoint_key):
+            for item in _get_page_items(page, embed_items):
+                yield item
+
+
+    def multi_search(self, queries, max_workers=DEFAULT_MAX_WORKERS,
+                     limit=None, embed_items=None, embed_tracks=None,
+                     embed_metadata=None, embed_insights=None):
+        """Run several searches concurrently and iterate over their
+        merged results, each bundle once.
+
+        'queries' the queries: strings, or dictionaries of search()
+        arguments ('query', 'query_fields', 'query_filter',
+        'language').
+        'max_workers' the maximum number of queries run at once.
+        'limit' and 'embed_*' the search() arguments common to all
+        queries.
+
+        Returns a multisearch.MultiSearch, yielding the bundle hrefs (or
+        the embedded bundles if 'embed_items' is True) as they arrive.
+        Its get_queries(href) returns the queries matching a bundle.
+
+        Unless it is iterated to the end, the MultiSearch must be closed
+        with close(), or used as a context manager, to stop its threads;
+        otherwise they only stop once it is garbage collected.
+
+        If a response status is not 2xx, the iterator throws an
+        APIException."""
+
+        return MultiSearch(self, queries, max_workers, limit, embed_items,
+                           embed_tracks, embed_metadata, embed_insights)
+
+
     def get_last_status(self):
         """Returns the HTTP status code of the most recent request made
-        by the client."""
+        by the client in the calling thread."""
         return self._last_status
 
 
+    def get_transfer_stats(self):
+        """Returns a dictionary counting the response bodies received by
+        the client and their size before ('wire_bytes') and after
+        ('content_bytes') decompression. See encoding.TransferStats."""
+        return self._transfer_stats.get_stats()
+
+
+    def reset_transfer_stats(self):
+        """Set the transfer counters back to zero."""
+        self._transfer_stats.reset()
+
+
     def _search_p1(self, query=None, query_fields=None, query_filter=None,
                    limit=None, embed_items=None, embed_tracks=None,
                    embed_metadata=None, embed_insights=None, language=None):
@@ -770,6 +1513,8 @@ class Client(object):
             fields['filter'] = query_filter
         if limit is not None:
             fields['limit'] = limit
+        if language is not None:
+            fields['language'] = language
         embed = helper.process_embed(embed_items=embed_items,
                                      embed_tracks=embed_tracks,
                                      embed_metadata=embed_metadata,
@@ -783,9 +1528,9 @@ class Client(object):
         raw_result = self.get(path, data)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
         else:
-            result = raw_result.json
+            result = raw_result.content
 
         return result
 
@@ -795,33 +1540,18 @@ class Client(object):
                    embed_insights=None):
         """Function called to retrieve pages 2-n."""
 
-        url_components = urlparse(href)
-        path = url_components.path
-        data = parse_qs(url_components.query)
-
-        # Change all lists into discrete values.
-        for key in data.keys():
-            data[key] = data[key][0]
-
-        # Deal with limit overriding.
-        if limit is not None:
-            data['limit'] = limit
-
-        # Deal with embeds overriding.
-        final_embed = helper.process_embed_override(data.get('embed'),
-                                                    embed_items,
-                                                    embed_tracks,
-                                                    embed_metadata,
-                                                    embed_insights)
-        if final_embed is not None:
-            data['embed'] = final_embed
+        path, data = helper.process_page_href(href, limit,
+                                              embed_items,
+                                              embed_tracks,
+                                              embed_metadata,
+                                              embed_insights)
 
         raw_result = self.get(path, data)
 
         if raw_result.status < 200 or raw_result.status > 202:
-            raise APIException(raw_result.status, raw_result.json)
+            raise APIException(raw_result.status, raw_result.content)
         else:
-            result = raw_result.json
+            result = raw_result.content
 
         return result
 
@@ -832,6 +1562,8 @@ class Client(object):
         1. Authorization
         2. Content-Type
         3. User-agent
+        4. Accept-Encoding, so that responses may be compressed. They
+           are decompressed transparently.
 
         Note that the User-agent string contains the library name, the
         libary version, and the python version. This will help us track
@@ -842,38 +1574,35 @@ class Client(object):
             PYTHON_VERSION
 
         headers = {'User-Agent': user_agent,
-                   'Content-Type': 'application/x-www-form-urlencoded'}
+                   'Content-Type': 'application/x-www-form-urlencoded',
+                   'Accept-Encoding': ACCEPT_ENCODING}
         if self.key:
             headers['Authorization'] = 'Bearer ' + self.key
         return headers
 
 
-    def get(self, path, data=None):
+    def get(self, path, data=None, headers=None):
         """Executes a GET.
 
         'path' may not be None. Should include the full path to the
         resource.
         'data' may be None or a dictionary. These values will be
         appended to the path as key/value pairs.
+        'headers' may be None or a dictionary of extra request headers.
 
-        Returns a named tuple that includes:
+        Returns a Result that includes:
 
         status: the HTTP status code
-        json: the returned JSON-HAL
+        json: the returned JSON-HAL, decoded on first access
+        headers: the response headers
+        content: the returned body as bytes
 
         If the key was not set, throws an APIConfigurationException."""
 
         # Argument error checking.
         assert path is not None
 
-        # Execute the request.
-        response = self.conn.request('GET', path, data, self._get_headers())
-
-        # Extract the result.
-        self._last_status = response_status = response.status
-        response_content = response.data.decode()
-
-        return Result(status=response_status, json=response_content)
+        return self._request('GET', path, data, headers=headers)
 
 
     def post(self, path, data):
@@ -883,10 +1612,12 @@ class Client(object):
         should not include a leading '/'
         'data' may be None or a dictionary.
 
-        Returns a named tuple that includes:
+        Returns a Result that includes:
 
         status: the HTTP status code
-        json: the returned JSON-HAL
+        json: the returned JSON-HAL, decoded on first access
+        headers: the response headers
+        content: the returned body as bytes
 
         If the key was not set, throws an APIConfigurationException."""
 
@@ -894,17 +1625,9 @@ class Client(object):
         assert path is not None
         assert data is None or isinstance(data, dict)
 
-        # Execute the request.
         if data is None:
             data = {}
-        response = self.conn.request_encode_body('POST', path, data,
-                                                 self._get_headers(), False)
-
-        # Extract the result.
-        self._last_status = response_status = response.status
-        response_content = response.data.decode()
-
-        return Result(status=response_status, json=response_content)
+        return self._request('POST', path, data, encode_body=True)
 
 
     def delete(self, path, data=None):
@@ -914,10 +1637,12 @@ class Client(object):
         resoure.
         'data' may be None or a dictionary.
 
-        Returns a named tuple that includes:
+        Returns a Result that includes:
 
         status: the HTTP status code
-        json: the returned JSON-HAL
+        json: the returned JSON-HAL, decoded on first access
+        headers: the response headers
+        content: the returned body as bytes
 
         If the key was not set, throws an APIConfigurationException."""
 
@@ -925,16 +1650,7 @@ class Client(object):
         assert path is not None
         assert data is None or isinstance(data, dict)
 
-        # Execute the request.
-        response = self.conn.request('DELETE', path, data,
-                                     self._get_headers())
-
-        # Extract the result.
-        self._last_status = response_status = response.status
-        response_content = response.data.decode()
-
-        # return (status, json)
-        return Result(status=response_status, json=response_content)
+        return self._request('DELETE', path, data)
 
 
     def put(self, path, data):
@@ -944,10 +1660,12 @@ class Client(object):
         resoure.
         'data' may be None or a dictionary.
 
-        Returns a named tuple that includes:
+        Returns a Result that includes:
 
         status: the HTTP status code
-        json: the returned JSON-HAL
+        json: the returned JSON-HAL, decoded on first access
+        headers: the response headers
+        content: the returned body as bytes
 
         If the key was not set, throws an APIConfigurationException."""
 
@@ -955,47 +1673,265 @@ class Client(object):
         assert path is not None
         assert data is None or isinstance(data, dict)
 
-        # Execute the request.
         if data is None:
             data = {}
-        response = self.conn.request_encode_body('PUT', path, data,
-                                                 self._get_headers(), False)
+        return self._request('PUT', path, data, encode_body=True)
+
+    def _request(self, method, path, data=None, encode_body=False,
+                 headers=None):
+        """Executes a request, paced by the rate limiter and retried as
+        allowed by the retry policy.
+
+        'data' is form encoded into the body if 'encode_body' is True,
+        otherwise it is appended to the path.
+        'headers' extra request headers, may be None.
+
+        Returns a Result. Connection errors that can't be retried are
+        raised as-is."""
+
+        response = self._send(method, path, data, encode_body, headers)
+
+        # Extract the result. The body is decoded lazily by Result.
+        content = response.data
+        self._transfer_stats.record(response.wire_bytes, len(content),
+                                    response.compressed)
+
+        return Result(status=response.status, headers=response.headers,
+                      content=content, json_codec=self.json_codec)
+
+    def _send(self, method, path, data=None, encode_body=False,
+              headers=None, stream=False):
+        """Executes a request, paced by the rate limiter and retried as
+        allowed by the retry policy, and returns the transport.Response.
+
+        If 'stream' is True, the body of the final response is left
+        unread and the caller must read or close it (see
+        _ContentIterator)."""
+
+        request_headers = self._get_headers()
+        if headers:
+            request_headers.update(headers)
+
+        transport = self.transport
+        policy = self.retry_policy
+        retryable = policy.is_retryable_method(method)
+        started = time.time()
+        retry_number = 0
+
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(path)
+            try:
+                response = transport.request(method, path, data,
+                                             request_headers, encode_body,
+                                             stream)
+            except transport.connection_errors:
+                delay = None
+                if retryable:
+                    delay = policy.get_delay(retry_number, started)
+                if delay is None:
+                    raise
+            else:
+                delay = None
+                if retryable and policy.is_retryable_status(response.status):
+                    delay = policy.get_delay(retry_number, started,
+                                             response.headers)
+                if delay is None:
+                    break
+                # Read the body so the connection can be reused.
+                response.read()
+
+            time.sleep(delay)
+            retry_number += 1
 
-        # Extract the result.
-        self._last_status = response_status = response.status
-        response_content = response.data.decode()
+        self._last_status = response.status
 
-        return Result(status=response_status, json=response_content)
+        return response
 
     ### Utility functions.
 
     def _parse_json(self, jstring=None):
         """Parse jstring and return a Python data structure.
 
-        'jstring' a string of JSON. May not be None.
+        'jstring' JSON as bytes or as a string. May not be None.
 
-        Returns a Python data structure.
+        Returns a Python data structure, or a resource.Resource if the
+        client was created with resources=True.
 
         If jstring couldn't be parsed, raises an APIDataException."""
 
         # Argument error checking.
         assert jstring is not None
 
-        result = None
+        result = _parse_content(self.json_codec, jstring)
+        if self.resources:
+            result = resource.wrap(result, self)
+        return result
+
+
+def _get_page_items(page, embedded):
+    """Returns the embedded items of a collection page if 'embedded',
+    else their hrefs."""
+    if embedded:
+        return helper.get_embedded_items(page)
+    return helper.get_item_hrefs(page)
 
+
+def _record_page(page_sizer, limit, page, elapsed, content):
+    """Record a page fetched in 'elapsed' seconds from 'content', its
+    raw JSON, in page_sizer."""
+    page_sizer.record(limit, len(helper.get_item_hrefs(page)), elapsed,
+                      len(content or b''))
+
+
+class _ContentIterator(object):
+    """Iterates over the decompressed body of a streamed
+    transport.Response in chunks. The connection goes back to the pool
+    once the body is exhausted or the iterator is closed. Can be used as
+    a context manager.
+
+    The bytes read are added to 'transfer_stats' at the end."""
+
+    def __init__(self, response, chunk_size, transfer_stats):
+        self._response = response
+        self._chunks = response.stream(chunk_size)
+        self._transfer_stats = transfer_stats
+        self._content_bytes = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._response is None:
+            raise StopIteration
         try:
-            result = json.loads(jstring)
-        except (ValueError) as exception:
-            msg = 'Unable to convert JSON string to Python data structure.'
-            raise APIDataException(exception, jstring, msg)
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._finish()
+            raise
+        self._content_bytes += len(chunk)
+        return chunk
+
+    next = __next__
+
+    def close(self):
+        """Stop reading. The rest of the body is discarded along with
+        the connection, which is reopened on next use."""
+        if self._response is not None:
+            self._response.close()
+            self._finish()
+
+    def _finish(self):
+        """Count what was read."""
+        self._transfer_stats.record(self._response.wire_bytes,
+                                    self._content_bytes,
+                                    self._response.compressed)
+        self._response = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-        return result
 
+class Result(object):
+    """The response to a request, returned by get(), put(), post() and
+    delete() and consumed by the REST cover functions.
 
-# This named tuple is returned by get(), put(), post(), delete()
-# functions and consumed by the REST cover functions.
+    'status' the HTTP status code.
+    'headers' the response headers.
+    'content' the body as bytes, as received.
+
+    The body is only decoded when asked for: 'json' is the body as a
+    string and 'data' the Python data structure it holds. Both are
+    computed on first access and kept. Callers that only need the
+    status, such as the delete functions, never pay for decoding.
+
+    For backwards compatibility a Result also unpacks and indexes like
+    the (status, json) named tuple it replaces; 'headers' is only an
+    attribute."""
+
+    __slots__ = ('status', 'headers', 'content', '_json', '_data',
+                 '_json_codec')
+
+    _fields = ('status', 'json')
+
+    def __init__(self, status, json=None, headers=None, content=None,
+                 json_codec=None):
+        """Initializer.
+
+        'json' the body as a string. May be None if 'content' is given.
+        'content' the body as bytes. May be None if 'json' is given.
+        'json_codec' the jsoncodec.JSONCodec for 'data'. May be None to
+        use the default codec."""
+
+        if content is None and json is not None:
+            content = json.encode('utf-8')
+        self.status = status
+        self.headers = headers if headers is not None else {}
+        self.content = content if content is not None else b''
+        self._json = json
+        self._data = _UNPARSED
+        self._json_codec = json_codec
+
+    @property
+    def json(self):
+        """The body decoded to a string."""
+        if self._json is None:
+            self._json = self.content.decode('utf-8')
+        return self._json
+
+    @property
+    def data(self):
+        """The body parsed as JSON. If it couldn't be parsed, raises an
+        APIDataException."""
+        if self._data is _UNPARSED:
+            self._data = _parse_content(self._json_codec or get_codec(),
+                                        self.content)
+        return self._data
+
+    def __iter__(self):
+        return iter((self.status, self.json))
+
+    def __getitem__(self, index):
+        return tuple(self)[index]
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __eq__(self, other):
+        if isinstance(other, Result):
+            return (self.status, self.content, self.headers) == \
+                (other.status, other.content, other.headers)
+        return tuple(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Result(status=%r, content=<%d bytes>)' % (self.status,
+                                                         len(self.content))
+
+
+# Marks a Result whose data has not been parsed yet.
+_UNPARSED = object()
+
+
+def _parse_content(json_codec, content):
+    """Parse content, JSON as bytes or as a string, with json_codec
+    and return a Python data structure.
+
+    If content couldn't be parsed, raises an APIDataException."""
+
+    try:
+        return json_codec.loads(content)
+    except ValueError as exception:
+        msg = 'Unable to convert JSON string to Python data structure.'
+        raise APIDataException(exception, content, msg)
 
-Result = collections.namedtuple('Result', ['status', 'json'])
 
 #
 # Exceptions.
@@ -1010,22 +1946,45 @@ class APIException(Exception):
     """Thown when we don't receive the expected sucess response from an
     API call."""
 
-    _data_struct = None
     http_response = None
-    json_response = None
 
     def __init__(self, http_response, json_response):
+        """Initializer.
+
+        'http_response' the HTTP status code.
+        'json_response' the response body, as bytes or as a string. It is
+        only decoded and parsed if asked for."""
+
         Exception.__init__(self)
 
         self.http_response = http_response
-        self.json_response = json_response
-
-        #  Try to turn the JSON and turn it into something we can use.
-        #  Could be garbage, in which case we should just ignore it.
-        try:
-            self._data_struct = json.loads(json_response)
-        except ValueError:
-            pass
+        self._body = json_response
+        self._json_response = None
+        self._parsed = False
+        self._parsed_data = None
+
+    @property
+    def json_response(self):
+        """The response body as a string."""
+        if self._json_response is None and self._body is not None:
+            body = self._body
+            if isinstance(body, (bytes, bytearray)):
+                body = bytes(body).decode('utf-8', 'replace')
+            self._json_response = body
+        return self._json_response
+
+    @property
+    def _data_struct(self):
+        """The parsed response body, or None if it isn't JSON."""
+        if not self._parsed:
+            self._parsed = True
+            #  Try to turn the JSON and turn it into something we can use.
+            #  Could be garbage, in which case we should just ignore it.
+            try:
+                self._parsed_data = json.loads(self.json_response)
+            except (TypeError, ValueError):
+                pass
+        return self._parsed_data
 
     def get_http_response(self):
         """Return the HTTP response that caused this exception to be
@@ -24,10 +24,9 @@ def fetch_captions(client, basename, insight_data):
             href = link[0].get('href')
 
         if href:
-            data = client.get_data(href)
             filename = basename + '-captions.' + cap_type[9:]
-            with open(os.path.join(OUTPUT_PATH, filename), 'w') as out:
-                out.write(data)
+            with open(os.path.join(OUTPUT_PATH, filename), 'wb') as out:
+                client.get_data_to_file(href, out)
 
 
 def fetch_insight(client, basename, insights, insight_rel):
@@ -40,9 +39,8 @@ def fetch_insight(client, basename, insights, insight_rel):
             write_json(basename, insight_rel[8:], data)
 
 
-def process_bundle(client, href):
-    print("Bundle " + href)
-    bundle = client.get_bundle(href, embed_tracks=True, embed_metadata=True, embed_insights=True)
+def process_bundle(client, bundle):
+    print("Bundle " + get_link_href(bundle, 'self'))
     name = bundle.get('external_id')
     if not name:
         name = bundle.get('name')
@@ -83,7 +81,9 @@ def main():
 
     try:
         client = clarify.Client(CLARIFY_API_KEY)
-        client.bundle_list_map(process_bundle)
+        client.bundle_list_map(process_bundle, embed_items=True,
+                               embed_tracks=True, embed_metadata=True,
+                               embed_insights=True)
     except clarify.APIException as e:
         print("{0}: {1}".format(e.get_status(), e.get_http_response()))
         raise
@@ -0,0 +1,84 @@
+"""
+Request coalescing ("single flight"): concurrent identical requests
+share one call instead of each making their own.
+"""
+
+import sys
+import threading
+
+
+class _Call(object):
+    """A call in flight and, once done, its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls made by several threads.
+
+    While a call for a key is running, other threads calling do() with
+    the same key wait for it and get its result (or its exception)
+    instead of making the call again. Once the call returns, the next
+    do() for the key makes a new call: nothing is cached."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """Returns func(*args, **kwargs), sharing the call with any
+        other thread doing the same 'key' at the same time.
+
+        'key' must be hashable, and identify calls which are
+        interchangeable."""
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.exc_info is not None:
+                _reraise(call.exc_info)
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def __len__(self):
+        """The number of calls in flight."""
+        with self._lock:
+            return len(self._calls)
+
+
+def make_flight_key(method, path, data=None):
+    """Returns the key identifying a request: its method, path and
+    query fields."""
+    fields = ()
+    if data:
+        fields = tuple(sorted((key, str(value))
+                              for key, value in data.items()))
+    return (method, path, fields)
+
+
+def _reraise(exc_info):
+    """Raise the exception described by exc_info in the calling
+    thread."""
+    exception = exc_info[1]
+    if sys.version_info[0] >= 3:
+        raise exception.with_traceback(exc_info[2])
+    raise exception
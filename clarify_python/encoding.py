@@ -0,0 +1,111 @@
+"""
+Response compression: the Accept-Encoding the clients send, an
+incremental decoder for compressed bodies, and counters measuring how
+much compression saves.
+"""
+
+import zlib
+import threading
+
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class ContentDecoder(object):
+    """Incrementally decodes a body sent with a Content-Encoding of
+    gzip, deflate or identity. Feed it the body in chunks with
+    decode() and call flush() at the end."""
+
+    def __init__(self, content_encoding=None):
+        """Initializer.
+
+        'content_encoding' the value of the Content-Encoding header.
+        May be None for an uncompressed body."""
+
+        encoding = (content_encoding or '').strip().lower()
+        self._first_chunk = True
+        if encoding in ('gzip', 'x-gzip'):
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == 'deflate':
+            self._decompressor = zlib.decompressobj()
+        else:
+            self._decompressor = None
+        self._deflate = encoding == 'deflate'
+
+    def decode(self, chunk):
+        """Returns the decoded bytes of the next chunk of the body."""
+
+        if self._decompressor is None or not chunk:
+            return chunk
+        if self._deflate and self._first_chunk:
+            self._first_chunk = False
+            try:
+                return self._decompressor.decompress(chunk)
+            except zlib.error:
+                # Some servers send a raw deflate stream without the
+                # zlib header.
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decompressor.decompress(chunk)
+
+    def flush(self):
+        """Returns any decoded bytes still held by the decoder."""
+
+        if self._decompressor is None:
+            return b''
+        return self._decompressor.flush()
+
+
+def decode_content(data, content_encoding=None):
+    """Returns 'data', a complete body, decoded according to
+    'content_encoding'."""
+
+    decoder = ContentDecoder(content_encoding)
+    return decoder.decode(data) + decoder.flush()
+
+
+class TransferStats(object):
+    """Thread-safe counters of the bytes received by a client.
+
+    'wire_bytes' counts the bytes as sent by the server, 'content_bytes'
+    the bytes after decompression. For uncompressed responses the two
+    are the same."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Set all the counters to zero."""
+        with self._lock:
+            self._responses = 0
+            self._compressed_responses = 0
+            self._wire_bytes = 0
+            self._content_bytes = 0
+
+    def record(self, wire_bytes, content_bytes, compressed=False):
+        """Count a response body."""
+        with self._lock:
+            self._responses += 1
+            if compressed:
+                self._compressed_responses += 1
+            self._wire_bytes += wire_bytes
+            self._content_bytes += content_bytes
+
+    def get_stats(self):
+        """Returns a dictionary with the 'responses',
+        'compressed_responses', 'wire_bytes' and 'content_bytes'
+        counters, and the 'saved_bytes' by compression."""
+        with self._lock:
+            return {
+                'responses': self._responses,
+                'compressed_responses': self._compressed_responses,
+                'wire_bytes': self._wire_bytes,
+                'content_bytes': self._content_bytes,
+                'saved_bytes': self._content_bytes - self._wire_bytes
+            }
+
+
+def is_compressed(headers):
+    """Returns True if a response with 'headers' has a compressed
+    body."""
+    encoding = (headers.get('Content-Encoding') or '').strip().lower()
+    return encoding not in ('', 'identity')
@@ -2,6 +2,11 @@
 Helper functions.
 """
 
+try:
+    from urllib.parse import urlparse, parse_qs
+except ImportError:
+    from urlparse import urlparse, parse_qs
+
 
 def process_embed(embed_items=None,
                   embed_tracks=None,
@@ -88,6 +93,46 @@ def process_embed_override(href_embed=None,
                          embed_insights=final_insights)
 
 
+def process_page_href(href, limit=None,
+                      embed_items=None,
+                      embed_tracks=None,
+                      embed_metadata=None,
+                      embed_insights=None):
+    """
+    Given the href of a collection page (for example the 'next' link of
+    a previous get_bundle_list() or search() result), return the path
+    and query fields needed to request it.
+
+    'limit' and 'embed_*' override the values in the href, see
+    process_embed_override().
+
+    Returns a (path, fields) tuple.
+    """
+
+    url_components = urlparse(href)
+    path = url_components.path
+    data = parse_qs(url_components.query)
+
+    # Change all lists into discrete values.
+    for key in data.keys():
+        data[key] = data[key][0]
+
+    # Deal with limit overriding.
+    if limit is not None:
+        data['limit'] = limit
+
+    # Deal with embeds overriding.
+    final_embed = process_embed_override(data.get('embed'),
+                                         embed_items,
+                                         embed_tracks,
+                                         embed_metadata,
+                                         embed_insights)
+    if final_embed is not None:
+        data['embed'] = final_embed
+
+    return path, data
+
+
 def get_embedded_items(result_collection):
     """
     Given a result_collection (returned by a previous API call that
@@ -0,0 +1,122 @@
+"""
+JSON codecs used by the clients to parse responses and serialize
+metadata. The fastest available codec is used by default: orjson, then
+ujson, then the standard library's json.
+
+Codecs parse the response bytes directly, without decoding them to a
+string first.
+"""
+
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JSONCodec(object):
+    """Base class of the codecs.
+
+    Any object with the same 'name', loads() and dumps() can be given to
+    a client instead."""
+
+    name = None
+
+    def loads(self, data):
+        """Returns the Python data structure for 'data', a JSON document
+        as UTF-8 bytes or as a string. Throws a ValueError if 'data'
+        isn't valid JSON."""
+        raise NotImplementedError()
+
+    def dumps(self, obj):
+        """Returns 'obj' serialized as a JSON string."""
+        raise NotImplementedError()
+
+
+class StdlibCodec(JSONCodec):
+    """The standard library's json module."""
+
+    name = 'json'
+
+    def loads(self, data):
+        # json.loads() only takes bytes from Python 3.6 on.
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson (pip install orjson).
+
+    Serializes whatever json.dumps() accepts: non-string dictionary keys
+    are allowed, and objects orjson rejects (such as integers beyond 64
+    bits) are serialized by the json module instead."""
+
+    name = 'orjson'
+
+    def __init__(self):
+        assert orjson is not None
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps(self, obj):
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            return json.dumps(obj)
+
+
+class UjsonCodec(JSONCodec):
+    """ujson (pip install ujson). Objects ujson rejects are serialized by
+    the json module instead."""
+
+    name = 'ujson'
+
+    def __init__(self):
+        assert ujson is not None
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+    def dumps(self, obj):
+        try:
+            return ujson.dumps(obj, escape_forward_slashes=False)
+        except (TypeError, OverflowError):
+            return json.dumps(obj)
+
+
+_CODECS = (('orjson', OrjsonCodec, orjson), ('ujson', UjsonCodec, ujson),
+           ('json', StdlibCodec, json))
+
+
+def get_available_codecs():
+    """Returns the names of the codecs that can be used here, fastest
+    first."""
+    return [name for name, _, module in _CODECS if module is not None]
+
+
+def get_codec(name=None):
+    """Returns a codec.
+
+    'name' 'orjson', 'ujson' or 'json'. May be None, in which case the
+    fastest available codec is returned.
+
+    If the named codec isn't installed, throws an
+    APIConfigurationException."""
+
+    for codec_name, codec_class, module in _CODECS:
+        if name in (None, codec_name) and module is not None:
+            return codec_class()
+
+    from clarify_python.clarify import APIConfigurationException
+    raise APIConfigurationException(
+        'JSON codec ' + repr(name) + ' is not available.')
@@ -0,0 +1,239 @@
+"""
+Incremental JSON reading: yield the items found at a path of a JSON
+document while it is being downloaded, without building the whole
+document in memory.
+
+Paths use the ijson prefix syntax: object keys separated by dots, with
+'item' standing for every element of an array. For example
+'track_data.item.words' selects the 'words' array of every element of
+'track_data', and iter_items() yields the words one at a time.
+"""
+
+import re
+import json
+import codecs
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_SCALAR = re.compile(r'[^,\]}\s]*')
+
+
+def iter_items(chunks, path):
+    """Yields the items at 'path' in a JSON document, parsing it
+    incrementally.
+
+    'chunks' an iterable of bytes making up the document, as UTF-8.
+    'path' the path of the items, see the module documentation. If the
+    value at the path is an array, its elements are yielded one at a
+    time, otherwise the value itself is yielded. May be empty to select
+    the document itself.
+
+    Only the item being parsed and one chunk are held in memory.
+
+    If the document isn't valid JSON, throws a ValueError."""
+
+    # Argument error checking.
+    assert path is not None
+
+    parts = [part for part in path.split('.') if part]
+    reader = _Reader(chunks)
+    for item in _walk(reader, parts):
+        yield item
+
+
+def _walk(reader, parts):
+    """Yields the items at 'parts' below the value at the reader's
+    position, consuming that value."""
+
+    char = reader.peek()
+
+    if not parts:
+        if char == '[':
+            for _ in reader.iter_array():
+                yield reader.read_value()
+        else:
+            yield reader.read_value()
+        return
+
+    if char == '{':
+        for key in reader.iter_object():
+            if key == parts[0]:
+                for item in _walk(reader, parts[1:]):
+                    yield item
+            else:
+                reader.skip_value()
+    elif char == '[' and parts[0] == 'item':
+        for _ in reader.iter_array():
+            for item in _walk(reader, parts[1:]):
+                yield item
+    else:
+        reader.skip_value()
+
+
+class _Reader(object):
+    """A JSON tokenizer over a stream of bytes. Consumed text is dropped
+    as more is read."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Read more text into the buffer. Returns False at the end of
+        the document."""
+
+        while not self._eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                text = self._decoder.decode(b'', True)
+            else:
+                text = self._decoder.decode(chunk)
+            if text:
+                self._buffer = self._buffer[self._pos:] + text
+                self._pos = 0
+                return True
+        return False
+
+    def _error(self, msg):
+        return ValueError(msg + ' at offset ' + str(self._pos) +
+                          ' of the buffer')
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at the
+        end of the document."""
+
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        """Consume the next character, which must be one of 'chars', and
+        return it."""
+
+        char = self.peek()
+        if not char or char not in chars:
+            raise self._error('Expected one of ' + repr(chars))
+        self._pos += 1
+        return char
+
+    def iter_object(self):
+        """Consume an object, yielding each of its keys with the reader
+        positioned on the value, which the caller must consume."""
+
+        self._expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            if self.peek() != '"':
+                raise self._error('Expected a key')
+            key = self._read_string()
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+
+    def iter_array(self):
+        """Consume an array, yielding once per element with the reader
+        positioned on the element, which the caller must consume."""
+
+        self._expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            self.peek()
+            yield
+            if self._expect(',]') == ']':
+                return
+
+    def _read_string(self):
+        """Consume a string and return its value."""
+
+        while True:
+            match = _STRING.match(self._buffer, self._pos)
+            if match is not None:
+                self._pos = match.end()
+                return json.loads(match.group())
+            if not self._fill():
+                raise self._error('Unterminated string')
+
+    def read_value(self):
+        """Consume a value and return it."""
+
+        char = self.peek()
+        if char and char not in '{["':
+            # Numbers and literals are only complete once followed by a
+            # delimiter, which may be in the next chunk.
+            return json.loads(self._skip_scalar())
+
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer,
+                                                           self._pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            self._pos = end
+            return value
+
+    def _skip_scalar(self):
+        """Consume a number or literal and return its text."""
+
+        while True:
+            end = _SCALAR.match(self._buffer, self._pos).end()
+            if end < len(self._buffer) or not self._fill():
+                break
+        if end == self._pos:
+            raise self._error('Expected a value')
+        text = self._buffer[self._pos:end]
+        self._pos = end
+        return text
+
+    def skip_value(self):
+        """Consume a value without building it."""
+
+        char = self.peek()
+        if char == '"':
+            self._read_string()
+        elif char in ('{', '['):
+            self._skip_container()
+        elif char:
+            self._skip_scalar()
+        else:
+            raise self._error('Unexpected end of document')
+
+    def _skip_container(self):
+        """Consume an object or array, from its opening bracket."""
+
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self._buffer, self._pos)
+            if match is None:
+                self._pos = len(self._buffer)
+                if not self._fill():
+                    raise self._error('Unexpected end of document')
+                continue
+            char = match.group()
+            if char == '"':
+                self._pos = match.start()
+                self._read_string()
+                continue
+            self._pos = match.end()
+            if char in '[{':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
@@ -0,0 +1,367 @@
+"""
+Typed models built from the data structures returned by the client:
+
+    bundle = Bundle(client.get_bundle(href))
+    tracks = Tracks(client.get_track_list(tracks_href))
+    insight = make_insight(client.get_insight(insight_href))
+
+Timestamps ('created', 'updated') are datetime objects, parsed on first
+access and kept, so sorting or filtering many models by date parses
+each string once. Numeric fields are typed ('version', 'media_size' are
+ints, 'duration' is a float). Models are read-only; the data they were
+built from is available as 'data' and must not be modified.
+"""
+
+import re
+import datetime
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+KEY_LINKS = '_links'
+KEY_EMBEDDED = '_embedded'
+
+_ISO_DATETIME = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:\.(\d+))?'
+    r'(Z|[+-]\d\d:?\d\d)?$')
+
+
+class _UTC(datetime.tzinfo):
+    """UTC, for Python 2 which has no datetime.timezone."""
+
+    def utcoffset(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return 'UTC'
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+try:
+    UTC = datetime.timezone.utc
+except AttributeError:
+    UTC = _UTC()
+
+
+def parse_datetime(value):
+    """Returns the timezone aware datetime for an ISO 8601 timestamp as
+    returned by the API, such as '2015-09-04T21:27:29.738Z'. Returns None
+    if 'value' is None or empty.
+
+    If 'value' isn't a timestamp, throws a ValueError."""
+
+    if not value:
+        return None
+    match = _ISO_DATETIME.match(value)
+    if match is None:
+        raise ValueError('Invalid timestamp: ' + repr(value))
+
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    microsecond = int((fraction or '0')[:6].ljust(6, '0'))
+    result = datetime.datetime(int(year), int(month), int(day), int(hour),
+                               int(minute), int(second), microsecond, UTC)
+    if zone and zone != 'Z':
+        sign = -1 if zone[0] == '-' else 1
+        zone = zone[1:].replace(':', '')
+        offset = datetime.timedelta(hours=int(zone[:2]),
+                                    minutes=int(zone[2:]))
+        result -= sign * offset
+    return result
+
+
+# Marks a memoized field that has not been computed yet.
+_UNSET = object()
+
+
+class _DatetimeField(object):
+    """A timestamp field, parsed on first access and memoized in the
+    slot named '_' + key."""
+
+    def __init__(self, key):
+        self.key = key
+        self.slot = '_' + key
+
+    def __get__(self, model, owner=None):
+        if model is None:
+            return self
+        value = getattr(model, self.slot)
+        if value is _UNSET:
+            value = parse_datetime(model.data.get(self.key))
+            setattr(model, self.slot, value)
+        return value
+
+
+class _Field(object):
+    """A field converted to 'kind' when present, None otherwise."""
+
+    def __init__(self, key, kind=None):
+        self.key = key
+        self.kind = kind
+
+    def __get__(self, model, owner=None):
+        if model is None:
+            return self
+        value = model.data.get(self.key)
+        if value is None or self.kind is None:
+            return value
+        return self.kind(value)
+
+
+class Model(object):
+    """Base class of the models.
+
+    'data' the dictionary (or resource.Resource) returned by the
+    client."""
+
+    __slots__ = ('data', '_created', '_updated')
+
+    created = _DatetimeField('created')
+    updated = _DatetimeField('updated')
+
+    def __init__(self, data):
+        # Argument error checking.
+        assert data is not None
+
+        self.data = data
+        self._created = _UNSET
+        self._updated = _UNSET
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        """Returns the raw value of a field, like dict.get()."""
+        return self.data.get(key, default)
+
+    @property
+    def href(self):
+        """The href of the model."""
+        return self.get_link_href('self')
+
+    def get_link_href(self, link_relation):
+        """Returns the href for 'link_relation', or None."""
+        link = (self.data.get(KEY_LINKS) or {}).get(link_relation)
+        # Mapping, not dict: the data may be a resource.Resource.
+        if link and isinstance(link, Mapping):
+            return link.get('href')
+        return None
+
+    def _get_embedded(self, link_relation):
+        """Returns the raw embedded object for 'link_relation', or
+        None."""
+        return (self.data.get(KEY_EMBEDDED) or {}).get(link_relation)
+
+    def __repr__(self):
+        return '<' + self.__class__.__name__ + ' ' + str(self.href) + '>'
+
+
+class Bundle(Model):
+    """A bundle. 'metadata', 'tracks' and 'insights' are set if they were
+    embedded, None otherwise."""
+
+    __slots__ = ('_embedded_models',)
+
+    id = _Field('id')
+    name = _Field('name')
+    version = _Field('version', int)
+    external_id = _Field('external_id')
+    notify_url = _Field('notify_url')
+
+    def __init__(self, data):
+        Model.__init__(self, data)
+        self._embedded_models = None
+
+    def _get_embedded_model(self, link_relation, model_class):
+        if self._embedded_models is None:
+            self._embedded_models = {}
+        model = self._embedded_models.get(link_relation, _UNSET)
+        if model is _UNSET:
+            embedded = self._get_embedded(link_relation)
+            model = model_class(embedded) if embedded is not None else None
+            self._embedded_models[link_relation] = model
+        return model
+
+    @property
+    def metadata(self):
+        """The embedded Metadata, or None."""
+        return self._get_embedded_model('clarify:metadata', Metadata)
+
+    @property
+    def tracks(self):
+        """The embedded Tracks, or None."""
+        return self._get_embedded_model('clarify:tracks', Tracks)
+
+    @property
+    def insights(self):
+        """The embedded Insights, or None."""
+        return self._get_embedded_model('clarify:insights', Insights)
+
+
+class Metadata(Model):
+    """The metadata of a bundle. 'user_data' is the user defined
+    dictionary."""
+
+    __slots__ = ()
+
+    bundle_id = _Field('bundle_id')
+    version = _Field('version', int)
+    user_data = _Field('data')
+
+
+class Tracks(Model):
+    """The track list of a bundle. Iterating over it yields its Track
+    models."""
+
+    __slots__ = ('_tracks',)
+
+    bundle_id = _Field('bundle_id')
+    version = _Field('version', int)
+    status = _Field('status')
+
+    def __init__(self, data):
+        Model.__init__(self, data)
+        self._tracks = None
+
+    @property
+    def tracks(self):
+        """The list of Track models."""
+        if self._tracks is None:
+            self._tracks = [Track(track)
+                            for track in self.data.get('tracks') or []]
+        return self._tracks
+
+    def __iter__(self):
+        return iter(self.tracks)
+
+    def __len__(self):
+        return len(self.tracks)
+
+
+class Track(Model):
+    """A track of a bundle."""
+
+    __slots__ = ()
+
+    id = _Field('id')
+    index = _Field('track', int)
+    label = _Field('label')
+    media_url = _Field('media_url')
+    audio_channel = _Field('audio_channel')
+    audio_language = _Field('audio_language')
+    status = _Field('status')
+    mime_type = _Field('mime_type')
+    media_size = _Field('media_size', int)
+    duration = _Field('duration', float)
+    fetch_response_code = _Field('fetch_response_code', int)
+    media_code = _Field('media_code', int)
+
+
+class Insights(Model):
+    """The insights of a bundle."""
+
+    __slots__ = ()
+
+    bundle_id = _Field('bundle_id')
+
+    def get_insight_hrefs(self):
+        """Returns a dictionary of insight names (such as
+        'spoken_words') to hrefs."""
+        result = {}
+        for rel, link in (self.data.get(KEY_LINKS) or {}).items():
+            if rel.startswith('insight:') and isinstance(link, Mapping):
+                result[rel[len('insight:'):]] = link.get('href')
+        return result
+
+
+class Insight(Model):
+    """An insight. Subclasses add accessors for the known insight
+    types."""
+
+    __slots__ = ()
+
+    id = _Field('id')
+    bundle_id = _Field('bundle_id')
+    name = _Field('name')
+    status = _Field('status')
+    track_data = _Field('track_data')
+
+    @property
+    def is_ready(self):
+        """True if the insight is ready."""
+        return self.status == 'ready'
+
+    def get_track_data(self, track=0):
+        """Returns the insight data for a track, or an empty dictionary
+        if there is none."""
+        track_data = self.data.get('track_data') or []
+        if track < len(track_data):
+            return track_data[track]
+        return {}
+
+
+class ClassificationInsight(Insight):
+    """The classification insight."""
+
+    __slots__ = ()
+
+    def get_spoken_languages(self, track=0):
+        """Returns the list of languages spoken in a track."""
+        return list(self.get_track_data(track).get('spoken_languages') or [])
+
+
+class SpokenWordsInsight(Insight):
+    """The spoken words insight."""
+
+    __slots__ = ()
+
+    def get_word_count(self, track=0):
+        """Returns the number of words spoken in a track, or None."""
+        count = self.get_track_data(track).get('word_count')
+        return int(count) if count is not None else None
+
+
+class SpokenKeywordsInsight(Insight):
+    """The spoken keywords insight."""
+
+    __slots__ = ()
+
+    def get_keywords(self, track=0):
+        """Returns the list of keywords of a track."""
+        return list(self.get_track_data(track).get('keywords') or [])
+
+
+class TranscriptInsight(Insight):
+    """The transcript insight."""
+
+    __slots__ = ()
+
+
+class CaptionsInsight(Insight):
+    """The captions insight."""
+
+    __slots__ = ()
+
+
+_INSIGHT_CLASSES = {
+    'classification': ClassificationInsight,
+    'spoken_words': SpokenWordsInsight,
+    'spoken_keywords': SpokenKeywordsInsight,
+    'transcript': TranscriptInsight,
+    'captions': CaptionsInsight,
+}
+
+_REVISION_SUFFIX = re.compile(r'_r\d+$')
+
+
+def make_insight(data):
+    """Returns the Insight subclass instance for 'data', an insight
+    returned by get_insight(), chosen by the insight name. Revisions
+    such as 'transcript_r9' use the class of their base insight."""
+
+    # Argument error checking.
+    assert data is not None
+
+    name = _REVISION_SUFFIX.sub('', data.get('name') or '')
+    return _INSIGHT_CLASSES.get(name, Insight)(data)
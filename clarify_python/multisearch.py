@@ -0,0 +1,232 @@
+"""
+Several searches run concurrently, their results merged and
+de-duplicated by bundle href as they arrive:
+
+    with client.multi_search(['wizard', {'query': 'musique',
+                                         'language': 'fr'}]) as results:
+        for bundle_href in results:
+            ...
+    results.get_queries(bundle_href)  # the queries matching it
+
+The results of all the queries take about as long as the slowest query
+instead of their sum.
+"""
+
+import sys
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from clarify_python import helper
+from clarify_python.bulk import DEFAULT_MAX_WORKERS
+from clarify_python.coalesce import _reraise
+from clarify_python.pager import _POLL_INTERVAL
+
+# The search() arguments a query may set.
+QUERY_KEYS = ('query', 'query_fields', 'query_filter', 'language')
+
+_DONE = object()
+
+
+def make_query(query):
+    """Returns the dictionary of search() arguments for 'query', a query
+    string or such a dictionary."""
+
+    if isinstance(query, dict):
+        # Argument error checking.
+        assert query.get('query') is not None
+        assert all(key in QUERY_KEYS for key in query)
+        return dict(query)
+    assert query is not None
+    return {'query': query}
+
+
+class MultiSearch(object):
+    """Iterates over the results of several searches, run concurrently
+    by a pool of threads, each page of a query being requested once the
+    previous one has arrived. Every bundle is yielded once, as soon as a
+    query returns it: its href, or the embedded bundle if 'embed_items'
+    is True.
+
+    'provenance' maps each bundle href to the indexes of the queries
+    that returned it, in the order their results arrived. The first one
+    is known when the bundle is yielded; the list is complete once the
+    iteration is.
+
+    If a query fails, its exception is raised by the iterator and the
+    other queries are stopped. Call close(), or use the MultiSearch as a
+    context manager, to stop early. The threads are daemon threads and
+    hold no reference to the MultiSearch, which closes itself when it is
+    garbage collected."""
+
+    def __init__(self, client, queries, max_workers=DEFAULT_MAX_WORKERS,
+                 limit=None, embed_items=None, embed_tracks=None,
+                 embed_metadata=None, embed_insights=None):
+        """Initializer.
+
+        'client' the clarify.Client, which must be thread-safe.
+        'queries' the queries: strings, or dictionaries of search()
+        arguments ('query', 'query_fields', 'query_filter',
+        'language').
+        'max_workers' the maximum number of queries run at once.
+        'limit' and 'embed_*' the search() arguments common to all
+        queries."""
+
+        # Argument error checking.
+        assert client is not None
+        assert queries is not None
+        assert max_workers > 0
+
+        self.queries = [make_query(query) for query in queries]
+        self.provenance = {}
+        self.max_workers = max_workers
+        self._embed_items = embed_items
+        search_args = {'limit': limit, 'embed_items': embed_items,
+                       'embed_tracks': embed_tracks,
+                       'embed_metadata': embed_metadata,
+                       'embed_insights': embed_insights}
+        self._workers = _Workers(client, self.queries, search_args,
+                                 max_workers)
+        self._started = False
+        self._running = len(self.queries)
+        self._ready = []
+        self._finished = False
+
+    def get_queries(self, href):
+        """Returns the queries (as dictionaries) that returned the bundle
+        with 'href'."""
+        return [self.queries[index]
+                for index in self.provenance.get(href, [])]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._started and not self._finished:
+            self._started = True
+            self._workers.start()
+
+        while not self._ready:
+            if self._finished or self._running == 0:
+                self.close()
+                raise StopIteration
+            index, page, exc_info = self._workers.queue.get()
+            if page is _DONE:
+                self._running -= 1
+                if exc_info is not None:
+                    self.close()
+                    _reraise(exc_info)
+                continue
+            self._merge(index, page)
+        return self._ready.pop(0)
+
+    next = __next__
+
+    def _merge(self, index, page):
+        """Queue the bundles of 'page', a page of query 'index', that no
+        query returned before, and record the provenance of all of
+        them."""
+
+        if self._embed_items:
+            items = helper.get_embedded_items(page)
+            hrefs = [helper.get_link_href(item, 'self') for item in items]
+        else:
+            items = hrefs = helper.get_item_hrefs(page)
+
+        for href, item in zip(hrefs, items):
+            indexes = self.provenance.get(href)
+            if indexes is None:
+                self.provenance[href] = [index]
+                self._ready.append(item)
+            elif index not in indexes:
+                indexes.append(index)
+
+    def close(self):
+        """Stop the queries. Pages being fetched are discarded."""
+        self._finished = True
+        self._workers.close()
+
+    def __del__(self):
+        workers = getattr(self, '_workers', None)
+        if workers is not None:
+            workers.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _Workers(object):
+    """The threads of a MultiSearch, each running queries until there
+    are none left or close(), and queueing their pages."""
+
+    def __init__(self, client, queries, search_args, max_workers):
+        self.queue = queue.Queue(maxsize=max_workers * 2)
+        self._client = client
+        self._queries = queries
+        self._search_args = search_args
+        self._count = max(1, min(max_workers, len(queries)))
+        self._next_index = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        for _ in range(self._count):
+            thread = threading.Thread(target=self._run,
+                                      name='clarify-multisearch')
+            thread.daemon = True
+            thread.start()
+
+    def _run(self):
+        """Run queries until there are none left or close()."""
+        while not self._stop.is_set():
+            with self._lock:
+                index = self._next_index
+                if index >= len(self._queries):
+                    return
+                self._next_index += 1
+            self._run_query(index)
+
+    def _run_query(self, index):
+        """Fetch the pages of query 'index' until the last one or
+        close()."""
+
+        exc_info = None
+        try:
+            args = dict(self._search_args)
+            args.update(self._queries[index])
+            pages = self._client.iter_search_pages(prefetch=0, **args)
+            try:
+                for page in pages:
+                    if not self._put((index, page, None)):
+                        return
+            finally:
+                pages.close()
+        except Exception:
+            exc_info = sys.exc_info()
+        self._put((index, _DONE, exc_info))
+
+    def _put(self, item):
+        """Queue item, waiting for room. Returns False if closed
+        meanwhile."""
+
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def close(self):
+        """Stop the threads. Pages being fetched are discarded."""
+
+        self._stop.set()
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
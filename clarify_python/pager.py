@@ -0,0 +1,266 @@
+"""
+Page prefetching: a background thread fetches the next pages of a
+collection while the caller works on the current one, so that crawling
+takes about max(network, processing) time instead of their sum.
+
+Adaptive page sizes: an AdaptivePageSizer picks the 'limit' of each page
+from the latency and size of the previous ones.
+"""
+
+import sys
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from clarify_python.coalesce import _reraise
+
+# Number of pages fetched ahead by default.
+DEFAULT_PREFETCH = 2
+
+# Seconds between checks for close() while the queue is full.
+_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+def get_next_href(page):
+    """Returns the href of the page after 'page', or None."""
+    link = page['_links'].get('next')
+    return link.get('href') if link else None
+
+
+class PagePrefetcher(object):
+    """Iterates over the pages of a collection, fetched by a background
+    thread at most 'depth' pages ahead of the caller.
+
+    Exceptions raised while fetching are raised by the iterator, in
+    place of the page that failed. Call close(), or use the prefetcher
+    as a context manager, to stop fetching early:
+
+        with PagePrefetcher(fetch_page) as pages:
+            for page in pages:
+                ...
+    """
+
+    def __init__(self, fetch_page, href=None, depth=DEFAULT_PREFETCH):
+        """Initializer.
+
+        'fetch_page' a function returning the page for an href, or the
+        first page for None.
+        'href' the href of the first page. May be None.
+        'depth' the maximum number of pages fetched ahead. If 0, pages
+        are fetched by the calling thread when needed."""
+
+        # Argument error checking.
+        assert fetch_page is not None
+        assert depth >= 0
+
+        self.depth = depth
+        self._fetch_page = fetch_page
+        self._next_href = href
+        self._started = False
+        self._finished = False
+        self._stop = threading.Event()
+        self._queue = None
+        self._thread = None
+        if depth > 0:
+            self._queue = queue.Queue(maxsize=depth)
+            self._thread = threading.Thread(target=self._run,
+                                            name='clarify-prefetch')
+            self._thread.daemon = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration
+
+        if self._thread is None:
+            if self._started and self._next_href is None:
+                self._finished = True
+                raise StopIteration
+            self._started = True
+            page = self._fetch_page(self._next_href)
+            self._next_href = get_next_href(page)
+            return page
+
+        if not self._started:
+            self._started = True
+            self._thread.start()
+
+        page, exc_info = self._queue.get()
+        if page is _DONE:
+            self._finished = True
+            if exc_info is not None:
+                _reraise(exc_info)
+            raise StopIteration
+        return page
+
+    next = __next__
+
+    def _run(self):
+        """Fetch pages until the last one or close()."""
+
+        href = self._next_href
+        first = True
+        exc_info = None
+        try:
+            while (first or href is not None) and not self._stop.is_set():
+                first = False
+                page = self._fetch_page(href)
+                href = get_next_href(page)
+                if not self._put((page, None)):
+                    return
+        except Exception:
+            exc_info = sys.exc_info()
+        self._put((_DONE, exc_info))
+
+    def _put(self, item):
+        """Queue item, waiting for room. Returns False if closed
+        meanwhile."""
+
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def close(self):
+        """Stop fetching pages. A fetch in progress is completed and
+        discarded."""
+
+        self._finished = True
+        self._stop.set()
+        if self._queue is not None:
+            try:
+                while True:
+                    self._queue.get_nowait()
+            except queue.Empty:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# The largest page size accepted by the API.
+MAX_PAGE_SIZE = 100
+
+# Default cap on the size of a page body.
+DEFAULT_MAX_PAGE_BYTES = 8 * 1024 * 1024
+
+
+class AdaptivePageSizer(object):
+    """Chooses the page size ('limit') of paginated requests to
+    maximize the items fetched per second, by hill climbing: the limit
+    keeps growing (or shrinking) by 'factor' while the throughput
+    improves, and turns around when it drops. Page bodies are kept under
+    'max_page_bytes', estimated from the bytes per item seen so far.
+
+    Pass a sizer to the iterators or bundle_list_map() as 'page_sizer'
+    and read get_stats() afterwards. A sizer is thread-safe, and may be
+    reused to start later crawls at the size it settled on."""
+
+    def __init__(self, initial_limit=10, min_limit=1,
+                 max_limit=MAX_PAGE_SIZE,
+                 max_page_bytes=DEFAULT_MAX_PAGE_BYTES, factor=1.5,
+                 tolerance=0.05):
+        """Initializer.
+
+        'initial_limit' the page size of the first page.
+        'min_limit' and 'max_limit' the bounds of the page size.
+        'max_page_bytes' the cap on the estimated size of a page body.
+        'factor' the ratio between successive page sizes.
+        'tolerance' the relative drop in throughput regarded as noise."""
+
+        # Argument error checking.
+        assert 1 <= min_limit <= initial_limit <= max_limit
+        assert max_page_bytes > 0
+        assert factor > 1
+        assert 0 <= tolerance < 1
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_page_bytes = max_page_bytes
+        self.factor = factor
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self._limit = initial_limit
+        self._direction = 1
+        self._last_rate = None
+        self._pages = 0
+        self._items = 0
+        self._bytes = 0
+        self._elapsed = 0.0
+        self._limits = {}
+
+    def get_limit(self):
+        """Returns the page size to request next."""
+        with self._lock:
+            return self._limit
+
+    def record(self, limit, items, elapsed, page_bytes):
+        """Record a page of 'items' items and 'page_bytes' bytes
+        requested with 'limit' and fetched in 'elapsed' seconds, and
+        choose the next page size."""
+
+        with self._lock:
+            self._pages += 1
+            self._items += items
+            self._bytes += page_bytes
+            self._elapsed += elapsed
+            self._limits[limit] = self._limits.get(limit, 0) + 1
+
+            # A short page is the end of the collection and says nothing
+            # about the throughput of its size.
+            if items < limit or elapsed <= 0:
+                return
+
+            rate = items / float(elapsed)
+            if self._last_rate is not None and \
+                    rate < self._last_rate * (1 - self.tolerance):
+                self._direction = -self._direction
+            self._last_rate = rate
+
+            if self._direction > 0:
+                next_limit = int(round(limit * self.factor))
+            else:
+                next_limit = int(limit / self.factor)
+            self._limit = max(self.min_limit,
+                              min(next_limit, self._get_max_limit()))
+
+    def _get_max_limit(self):
+        """The largest page size allowed by max_limit and
+        max_page_bytes."""
+
+        max_limit = self.max_limit
+        if self._items:
+            bytes_per_item = self._bytes / float(self._items)
+            if bytes_per_item > 0:
+                max_limit = min(max_limit,
+                                int(self.max_page_bytes / bytes_per_item))
+        return max(self.min_limit, max_limit)
+
+    def get_stats(self):
+        """Returns a dictionary with the current 'limit', the number of
+        'pages' and 'items' fetched, the 'items_per_second' and
+        'bytes_per_item' overall, and 'limits', the number of pages
+        fetched with each page size."""
+
+        with self._lock:
+            return {
+                'limit': self._limit,
+                'pages': self._pages,
+                'items': self._items,
+                'items_per_second': (self._items / self._elapsed
+                                     if self._elapsed else None),
+                'bytes_per_item': (self._bytes / float(self._items)
+                                   if self._items else None),
+                'limits': dict(self._limits)
+            }
@@ -0,0 +1,129 @@
+"""
+Purging bundles by predicate: Client.purge_bundles() scans the bundle
+list with the bundles embedded, evaluates a predicate on each one
+without further requests and deletes the matching bundles concurrently.
+
+    report = client.purge_bundles(
+        BundleFilter(name='test_*',
+                     created_before='2016-01-01T00:00:00Z'),
+        dry_run=True)
+    report.get_summary()  # {'scanned': ..., 'matched': ..., ...}
+"""
+
+import re
+import fnmatch
+from clarify_python.bulk import BulkReport
+from clarify_python.models import Bundle, parse_datetime
+
+
+class BundleFilter(object):
+    """A predicate over embedded bundles, true for the bundles matching
+    all of the criteria given.
+
+    'name' a shell style pattern such as 'test_*', or a compiled regular
+    expression, matched against the whole name.
+    'external_id' an external id, or a list of them.
+    'created_after', 'created_before', 'updated_after' and
+    'updated_before' timezone aware datetimes or ISO 8601 strings. The
+    ranges include 'after' and exclude 'before'.
+    'metadata' a dictionary of user metadata values the bundle metadata
+    must have. The bundles must then be listed with their metadata
+    embedded, which purge_bundles() does when 'needs_metadata' is
+    True."""
+
+    def __init__(self, name=None, external_id=None, created_after=None,
+                 created_before=None, updated_after=None,
+                 updated_before=None, metadata=None):
+        if name is not None and not hasattr(name, 'match'):
+            name = re.compile(fnmatch.translate(name))
+        if external_id is not None and \
+                not isinstance(external_id, (list, tuple, set)):
+            external_id = [external_id]
+
+        self.name = name
+        self.external_id = external_id
+        self.created_after = _to_datetime(created_after)
+        self.created_before = _to_datetime(created_before)
+        self.updated_after = _to_datetime(updated_after)
+        self.updated_before = _to_datetime(updated_before)
+        self.metadata = metadata
+
+    @property
+    def needs_metadata(self):
+        """True if the predicate needs the bundle metadata embedded."""
+        return self.metadata is not None
+
+    def __call__(self, bundle):
+        """Returns True if 'bundle', a bundle data structure or
+        models.Bundle, matches."""
+
+        if not isinstance(bundle, Bundle):
+            bundle = Bundle(bundle)
+
+        if self.name is not None:
+            match = self.name.match(bundle.name or '')
+            if match is None or match.end() != len(bundle.name or ''):
+                return False
+        if self.external_id is not None and \
+                bundle.external_id not in self.external_id:
+            return False
+        if not _in_range(bundle.created, self.created_after,
+                         self.created_before):
+            return False
+        if not _in_range(bundle.updated, self.updated_after,
+                         self.updated_before):
+            return False
+        if self.metadata is not None:
+            user_data = (bundle.metadata.user_data or {}) \
+                if bundle.metadata is not None else {}
+            for key, value in self.metadata.items():
+                if key not in user_data or user_data[key] != value:
+                    return False
+        return True
+
+
+class PurgeReport(BulkReport):
+    """The outcome of purge_bundles(): a BulkReport with a
+    BulkItemResult per matching bundle, whose 'item' is the bundle href.
+
+    'scanned' the number of bundles the predicate was evaluated on.
+    'dry_run' True if nothing was deleted."""
+
+    def __init__(self, results=None, stopped=False, scanned=0,
+                 dry_run=False):
+        BulkReport.__init__(self, results, stopped)
+        self.scanned = scanned
+        self.dry_run = dry_run
+
+    def get_summary(self):
+        """Returns the BulkReport summary, with the number of bundles
+        'scanned', 'matched' and 'deleted', and 'dry_run'."""
+        summary = BulkReport.get_summary(self)
+        summary.update({'scanned': self.scanned, 'matched': len(self.results),
+                        'deleted': 0 if self.dry_run else
+                        summary['succeeded'], 'dry_run': self.dry_run})
+        return summary
+
+    def __repr__(self):
+        return 'PurgeReport(%r)' % (self.get_summary(),)
+
+
+def _to_datetime(value):
+    """Returns 'value', a datetime or ISO 8601 string, as a datetime."""
+    if value is None or not hasattr(value, 'strip'):
+        return value
+    return parse_datetime(value)
+
+
+def _in_range(value, after, before):
+    """True if the datetime 'value' is within [after, before). A missing
+    value is only in the unbounded range."""
+    if after is None and before is None:
+        return True
+    if value is None:
+        return False
+    if after is not None and value < after:
+        return False
+    if before is not None and value >= before:
+        return False
+    return True
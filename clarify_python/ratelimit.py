@@ -0,0 +1,217 @@
+"""
+Client side rate limiting. A RateLimiter paces the requests made by a
+client with one token bucket per endpoint class (search, bundles and
+insights), so that a client stays under the API quota instead of
+running into 429 responses.
+"""
+
+import os
+import time
+import threading
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+ENDPOINT_SEARCH = 'search'
+ENDPOINT_BUNDLES = 'bundles'
+ENDPOINT_INSIGHTS = 'insights'
+ENDPOINT_CLASSES = (ENDPOINT_SEARCH, ENDPOINT_BUNDLES, ENDPOINT_INSIGHTS)
+
+
+def get_endpoint_class(path):
+    """Returns the endpoint class of a request path: ENDPOINT_SEARCH,
+    ENDPOINT_INSIGHTS or ENDPOINT_BUNDLES (everything else)."""
+
+    # Argument error checking.
+    assert path is not None
+
+    parts = path.split('?', 1)[0].strip('/').split('/')
+    if len(parts) > 1 and parts[1] == ENDPOINT_SEARCH:
+        return ENDPOINT_SEARCH
+    if ENDPOINT_INSIGHTS in parts:
+        return ENDPOINT_INSIGHTS
+    return ENDPOINT_BUNDLES
+
+
+class TokenBucket(object):
+    """A token bucket shared by the threads of one process.
+
+    The bucket holds up to 'burst' tokens and is refilled with 'rate'
+    tokens per second. Each request takes a token; when none is left the
+    request is scheduled for when one will be available. Requests are
+    spread evenly instead of bunching up when the bucket refills."""
+
+    def __init__(self, rate, burst=None):
+        """Initializer.
+
+        'rate' the sustained number of requests per second.
+        'burst' the number of requests that may be made back to back
+        after a quiet period. Defaults to max(1, rate)."""
+
+        # Argument error checking.
+        assert rate > 0
+        assert burst is None or burst >= 1
+
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.time()
+
+    def _take(self, tokens, available, updated, now):
+        """Refill a bucket holding 'available' tokens at 'updated', take
+        'tokens' from it at 'now' and return (wait, available) where
+        'wait' is the number of seconds before the tokens may be used.
+        'available' goes negative while requests are waiting."""
+
+        available = min(self.burst,
+                        available + (now - updated) * self.rate)
+        available -= tokens
+        wait = 0.0
+        if available < 0:
+            wait = -available / self.rate
+        return wait, available
+
+    def reserve(self, tokens=1):
+        """Take 'tokens' from the bucket and return the number of
+        seconds to wait before using them. Does not block."""
+
+        with self._lock:
+            now = time.time()
+            wait, self._tokens = self._take(tokens, self._tokens,
+                                            self._updated, now)
+            self._updated = now
+        return wait
+
+    def acquire(self, tokens=1):
+        """Take 'tokens' from the bucket, sleeping until they may be
+        used."""
+
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """A token bucket shared by every process on a host that uses the
+    same file. The bucket state is kept in the file and updated under an
+    exclusive lock (flock), so it is only available on POSIX systems."""
+
+    def __init__(self, path, rate, burst=None):
+        """Initializer.
+
+        'path' the file holding the bucket state. Created if needed.
+        'rate' and 'burst' see TokenBucket. Every process sharing the
+        file should use the same values."""
+
+        if fcntl is None:
+            from clarify_python.clarify import APIConfigurationException
+            raise APIConfigurationException(
+                'FileTokenBucket requires fcntl, which is not available '
+                'on this platform.')
+
+        TokenBucket.__init__(self, rate, burst)
+        self.path = path
+
+    def reserve(self, tokens=1):
+        """Take 'tokens' from the bucket and return the number of
+        seconds to wait before using them. Blocks only while another
+        process updates the bucket."""
+
+        # The thread lock keeps threads of this process from contending
+        # on the file lock.
+        with self._lock:
+            with open(self.path, 'a+') as state_file:
+                fcntl.flock(state_file, fcntl.LOCK_EX)
+                try:
+                    state_file.seek(0)
+                    available, updated = self._read_state(state_file.read())
+                    now = time.time()
+                    wait, available = self._take(tokens, available, updated,
+                                                 now)
+                    state_file.seek(0)
+                    state_file.truncate()
+                    state_file.write('%r %r' % (available, now))
+                    state_file.flush()
+                finally:
+                    fcntl.flock(state_file, fcntl.LOCK_UN)
+        return wait
+
+    def _read_state(self, content):
+        """Returns (available, updated) from the file content. A missing
+        or garbled state is treated as a full bucket."""
+
+        try:
+            available, updated = content.split()
+            return float(available), float(updated)
+        except ValueError:
+            return self.burst, time.time()
+
+
+class RateLimiter(object):
+    """Paces requests with a token bucket per endpoint class.
+
+    Pass it to a client to have every request go through it:
+
+        limiter = RateLimiter(5, burst=10, endpoint_rates={'search': (1, 2)})
+        client = Client(key, rate_limiter=limiter)
+
+    A RateLimiter may be shared by several clients. To share a quota
+    between processes on a host, give every process a RateLimiter with
+    the same 'lock_dir'."""
+
+    def __init__(self, rate, burst=None, endpoint_rates=None, lock_dir=None):
+        """Initializer.
+
+        'rate' the requests per second allowed for each endpoint class.
+        'burst' the burst size for each endpoint class, see TokenBucket.
+        'endpoint_rates' a dictionary overriding (rate, burst) for some
+        endpoint classes, for example {'search': (1, 2)}. A rate of None
+        leaves that class unlimited.
+        'lock_dir' a directory in which to keep the bucket state, shared
+        by every process using that directory. May be None, in which
+        case the buckets are only shared by the threads of this
+        process."""
+
+        endpoint_rates = endpoint_rates or {}
+
+        # Argument error checking.
+        for endpoint_class in endpoint_rates:
+            assert endpoint_class in ENDPOINT_CLASSES
+
+        self._buckets = {}
+        for endpoint_class in ENDPOINT_CLASSES:
+            class_rate, class_burst = endpoint_rates.get(endpoint_class,
+                                                         (rate, burst))
+            if class_rate is None:
+                continue
+            if lock_dir is None:
+                bucket = TokenBucket(class_rate, class_burst)
+            else:
+                path = os.path.join(lock_dir,
+                                    'clarify-' + endpoint_class + '.bucket')
+                bucket = FileTokenBucket(path, class_rate, class_burst)
+            self._buckets[endpoint_class] = bucket
+
+    def get_bucket(self, path):
+        """Returns the bucket for a request path, or None if its
+        endpoint class is unlimited."""
+        return self._buckets.get(get_endpoint_class(path))
+
+    def reserve(self, path):
+        """Take a token for a request to 'path' and return the number of
+        seconds to wait before making it. Does not block."""
+
+        bucket = self.get_bucket(path)
+        if bucket is None:
+            return 0.0
+        return bucket.reserve()
+
+    def acquire(self, path):
+        """Take a token for a request to 'path', sleeping until the
+        request may be made."""
+
+        wait = self.reserve(path)
+        if wait > 0:
+            time.sleep(wait)
@@ -0,0 +1,127 @@
+"""
+Retry policy used by the clients to ride out transient failures (429,
+5xx responses and dropped connections).
+"""
+
+import random
+import time
+from email.utils import parsedate_tz, mktime_tz
+
+
+class RetryPolicy(object):
+    """Decides whether and when a failed request is retried.
+
+    Retries wait for an exponentially growing, randomly jittered delay
+    ("full jitter"): attempt n waits between 0 and
+    min(max_backoff, backoff_factor * 2 ** n) seconds. If the server
+    sends a Retry-After header, that delay is used instead.
+
+    Retrying stops when 'max_retries' is reached or when the next delay
+    would take the request past 'budget' seconds since its first
+    attempt. The last response is then returned to the caller as usual,
+    so the REST cover functions still throw an APIException."""
+
+    RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+    IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE',
+                                    'OPTIONS'])
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30,
+                 budget=60, statuses=None, retry_post=False,
+                 respect_retry_after=True):
+        """Initializer.
+
+        'max_retries' the maximum number of retries of a single request.
+        0 disables retrying.
+        'backoff_factor' the base delay in seconds.
+        'max_backoff' the maximum delay in seconds between two attempts.
+        'budget' the maximum number of seconds, counted from the first
+        attempt, that may be spent on a request including its retries.
+        May be None for no limit.
+        'statuses' the HTTP statuses to retry. Defaults to
+        RETRY_STATUSES.
+        'retry_post' whether POST requests are retried. POST is not
+        idempotent (a retried create_bundle() may create two bundles),
+        so this is False by default.
+        'respect_retry_after' whether to wait as long as a Retry-After
+        header asks."""
+
+        # Argument error checking.
+        assert max_retries >= 0
+        assert backoff_factor >= 0
+        assert max_backoff >= 0
+        assert budget is None or budget >= 0
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.budget = budget
+        if statuses is None:
+            statuses = self.RETRY_STATUSES
+        self.statuses = frozenset(statuses)
+        self.retry_post = retry_post
+        self.respect_retry_after = respect_retry_after
+
+    def is_retryable_method(self, method):
+        """Returns True if requests using 'method' may be retried."""
+        return method in self.IDEMPOTENT_METHODS or \
+            (method == 'POST' and self.retry_post)
+
+    def is_retryable_status(self, status):
+        """Returns True if a response with 'status' should be retried."""
+        return status in self.statuses
+
+    def get_backoff(self, retry_number):
+        """Returns the jittered delay before retry 'retry_number'
+        (counted from 0)."""
+        ceiling = min(self.max_backoff,
+                      self.backoff_factor * (2 ** retry_number))
+        return random.uniform(0, ceiling)
+
+    def get_delay(self, retry_number, started, headers=None):
+        """Returns the number of seconds to wait before retry
+        'retry_number' (counted from 0) of a request first attempted at
+        'started' (a time.time() value), or None if the request should
+        not be retried any more.
+
+        'headers' the headers of the failed response, if any."""
+
+        if retry_number >= self.max_retries:
+            return None
+
+        delay = None
+        if headers is not None and self.respect_retry_after:
+            delay = parse_retry_after(headers.get('Retry-After'))
+        if delay is None:
+            delay = self.get_backoff(retry_number)
+
+        if self.budget is not None and \
+                time.time() - started + delay > self.budget:
+            return None
+
+        return delay
+
+
+# The policy used by clients unless told otherwise.
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+# A policy that never retries.
+NO_RETRY_POLICY = RetryPolicy(max_retries=0)
+
+
+def parse_retry_after(value):
+    """Converts a Retry-After header value, either a number of seconds
+    or an HTTP date, into a number of seconds to wait.
+
+    Returns None if value is None or can't be parsed."""
+
+    if value is None:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0, mktime_tz(parsed) - time.time())
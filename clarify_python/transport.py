@@ -0,0 +1,429 @@
+"""
+HTTP transports used by clarify.Client. A transport sends a request to
+the API and returns a Response holding the status, headers and body
+bytes; everything above it (retries, rate limiting, JSON and HAL
+processing) is done by the client.
+
+Two transports are provided: Urllib3Transport (the default) and
+HTTPClientTransport, which only needs the standard library.
+"""
+
+import ssl
+import time
+import socket
+import threading
+import certifi
+import urllib3
+try:
+    from urllib.parse import urlparse, urlencode
+except ImportError:
+    from urlparse import urlparse
+    from urllib import urlencode
+try:
+    import http.client as httplib
+except ImportError:
+    import httplib
+from clarify_python.encoding import ContentDecoder, is_compressed
+from clarify_python.retry import RetryPolicy
+from clarify_python.constants import __host__
+
+DEFAULT_BASE_URL = 'https://' + __host__
+
+# Connection pool defaults.
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class Response(object):
+    """A response returned by a transport.
+
+    'status' the HTTP status code.
+    'headers' a case-insensitive mapping of the response headers.
+    'data' the decompressed body as bytes, or None if the response was
+    requested with stream=True and the body has not been read yet.
+
+    A streamed body is read with read() or stream(), after which the
+    connection goes back to the pool. If the rest of the body isn't
+    wanted, call close() instead."""
+
+    def __init__(self, status, headers, data=None, wire_bytes=0):
+        self.status = status
+        self.headers = headers
+        self.data = data
+        self.wire_bytes = wire_bytes
+
+    @property
+    def compressed(self):
+        """True if the body was compressed on the wire."""
+        return is_compressed(self.headers)
+
+    def read(self):
+        """Returns the whole (decompressed) body."""
+        if self.data is None:
+            self.data = b''.join(self.stream())
+        return self.data
+
+    def stream(self, chunk_size=64 * 1024):
+        """Yields the (decompressed) body in chunks of at most
+        'chunk_size' bytes, then releases the connection."""
+        data = self.read()
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+    def close(self):
+        """Discard the rest of the body, and the connection with it."""
+        pass
+
+
+class Transport(object):
+    """Base class of the transports.
+
+    'connection_errors' is the tuple of exceptions the transport raises
+    when a request fails without a response. The client may retry
+    requests failing with them."""
+
+    connection_errors = (IOError,)
+
+    def __init__(self, base_url=DEFAULT_BASE_URL):
+        """Initializer.
+
+        'base_url' the scheme, host, optional port and optional path
+        prefix of the API, for example https://api.clarify.io or
+        http://localhost:8080/clarify."""
+
+        # Argument error checking.
+        assert base_url is not None
+
+        url_components = urlparse(base_url)
+        assert url_components.scheme in ('http', 'https')
+
+        self.base_url = base_url
+        self.scheme = url_components.scheme
+        self.host = url_components.hostname
+        self.port = url_components.port
+        self.path_prefix = url_components.path.rstrip('/')
+
+    def request(self, method, path, fields=None, headers=None,
+                encode_body=False, stream=False):
+        """Executes a request and returns a Response.
+
+        'path' the path of the resource, relative to the base URL.
+        'fields' may be None or a dictionary. They are form encoded into
+        the body if 'encode_body' is True, otherwise they are appended to
+        the path as a query.
+        'headers' may be None or a dictionary of request headers.
+        'stream' if True, the body is not read: the caller reads it with
+        the Response methods.
+
+        Throws one of 'connection_errors' if no response is received."""
+        raise NotImplementedError()
+
+    def close(self):
+        """Close all the connections."""
+        pass
+
+
+class Urllib3Transport(Transport):
+    """A transport using a urllib3 connection pool. Thread-safe.
+
+    urllib3's own retries are disabled: the client's RetryPolicy is the
+    only retry layer."""
+
+    connection_errors = (urllib3.exceptions.HTTPError,)
+
+    def __init__(self, base_url=DEFAULT_BASE_URL,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False,
+                 pool_idle_timeout=None):
+        """Initializer.
+
+        'base_url' see Transport.
+        'pool_maxsize', 'pool_block' and 'pool_idle_timeout' see
+        clarify.Client."""
+
+        # Argument error checking.
+        assert pool_maxsize > 0
+        assert pool_idle_timeout is None or pool_idle_timeout > 0
+
+        Transport.__init__(self, base_url)
+
+        if self.scheme == 'https':
+            self.pool = _HTTPSConnectionPool(self.host, self.port,
+                                             maxsize=pool_maxsize,
+                                             block=pool_block,
+                                             idle_timeout=pool_idle_timeout,
+                                             retries=False,
+                                             cert_reqs='CERT_REQUIRED',
+                                             ca_certs=certifi.where())
+        else:
+            self.pool = _HTTPConnectionPool(self.host, self.port,
+                                            maxsize=pool_maxsize,
+                                            block=pool_block,
+                                            idle_timeout=pool_idle_timeout,
+                                            retries=False)
+
+    def request(self, method, path, fields=None, headers=None,
+                encode_body=False, stream=False):
+        """Executes a request and returns a Response. See
+        Transport.request()."""
+
+        url = self.path_prefix + path
+        if encode_body:
+            raw = self.pool.request_encode_body(method, url, fields or {},
+                                                headers, False,
+                                                preload_content=not stream)
+        else:
+            raw = self.pool.request(method, url, fields, headers,
+                                    preload_content=not stream)
+
+        if stream:
+            return _Urllib3Response(raw)
+
+        return Response(raw.status, raw.headers, raw.data, raw.tell())
+
+    def close(self):
+        """Close all the connections."""
+        self.pool.close()
+
+
+class _Urllib3Response(Response):
+    """A streamed urllib3 response."""
+
+    def __init__(self, raw):
+        Response.__init__(self, raw.status, raw.headers)
+        self._raw = raw
+
+    def stream(self, chunk_size=64 * 1024):
+        """Yields the body in chunks, then releases the connection."""
+        if self.data is not None:
+            for chunk in Response.stream(self, chunk_size):
+                yield chunk
+            return
+        for chunk in self._raw.stream(chunk_size):
+            self.wire_bytes = self._raw.tell()
+            yield chunk
+        self.wire_bytes = self._raw.tell()
+        self._raw.release_conn()
+
+    def close(self):
+        """Discard the rest of the body, and the connection with it."""
+        self.wire_bytes = self._raw.tell()
+        self._raw.close()
+        self._raw.release_conn()
+
+
+class _IdleEvictionMixin(object):
+    """Closes connections which have been idle for longer than
+    'idle_timeout' seconds before reusing them. Servers and load
+    balancers silently drop idle keep-alive connections; reopening them
+    up front avoids a failed request."""
+
+    idle_timeout = None
+
+    def _get_conn(self, timeout=None):
+        conn = super(_IdleEvictionMixin, self)._get_conn(timeout)
+        last_used = getattr(conn, '_clarify_last_used', None)
+        if self.idle_timeout is not None and last_used is not None and \
+                time.time() - last_used > self.idle_timeout:
+            # The connection reopens itself on the next request.
+            conn.close()
+        return conn
+
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn._clarify_last_used = time.time()
+        super(_IdleEvictionMixin, self)._put_conn(conn)
+
+
+class _HTTPSConnectionPool(_IdleEvictionMixin, urllib3.HTTPSConnectionPool):
+    """An HTTPSConnectionPool evicting idle connections."""
+
+    def __init__(self, host, port=None, idle_timeout=None, **kwargs):
+        urllib3.HTTPSConnectionPool.__init__(self, host, port, **kwargs)
+        self.idle_timeout = idle_timeout
+
+
+class _HTTPConnectionPool(_IdleEvictionMixin, urllib3.HTTPConnectionPool):
+    """An HTTPConnectionPool evicting idle connections."""
+
+    def __init__(self, host, port=None, idle_timeout=None, **kwargs):
+        urllib3.HTTPConnectionPool.__init__(self, host, port, **kwargs)
+        self.idle_timeout = idle_timeout
+
+
+class HTTPClientTransport(Transport):
+    """A lightweight transport using the standard library's
+    http.client, keeping up to 'pool_maxsize' connections alive for
+    reuse. Thread-safe. Compressed bodies are decompressed with
+    encoding.ContentDecoder."""
+
+    connection_errors = (socket.error, httplib.HTTPException)
+
+    def __init__(self, base_url=DEFAULT_BASE_URL,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_idle_timeout=None,
+                 timeout=None):
+        """Initializer.
+
+        'base_url' see Transport.
+        'pool_maxsize' the number of idle connections kept alive.
+        'pool_idle_timeout' see clarify.Client.
+        'timeout' the socket timeout in seconds, or None."""
+
+        # Argument error checking.
+        assert pool_maxsize > 0
+        assert pool_idle_timeout is None or pool_idle_timeout > 0
+
+        Transport.__init__(self, base_url)
+
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self.timeout = timeout
+        self._ssl_context = None
+        if self.scheme == 'https':
+            self._ssl_context = ssl.create_default_context(
+                cafile=certifi.where())
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, last used) pairs, most recent last
+
+    def request(self, method, path, fields=None, headers=None,
+                encode_body=False, stream=False):
+        """Executes a request and returns a Response. See
+        Transport.request()."""
+
+        url = self.path_prefix + path
+        body = None
+        if fields:
+            encoded = urlencode(fields)
+            if encode_body:
+                body = encoded
+            else:
+                url += ('&' if '?' in url else '?') + encoded
+        elif encode_body:
+            body = ''
+
+        conn, reused = self._get_conn()
+        try:
+            conn.request(method, url, body, headers or {})
+            raw = conn.getresponse()
+        except self.connection_errors:
+            conn.close()
+            if not reused or \
+                    method not in RetryPolicy.IDEMPOTENT_METHODS:
+                raise
+            # The server may have closed the idle connection; try once
+            # more on a new one. Other methods are left to the client's
+            # RetryPolicy, as resending a POST may create a bundle twice.
+            conn, reused = self._new_conn(), False
+            try:
+                conn.request(method, url, body, headers or {})
+                raw = conn.getresponse()
+            except self.connection_errors:
+                conn.close()
+                raise
+
+        response = _HTTPClientResponse(self, conn, raw)
+        if not stream:
+            response.read()
+        return response
+
+    def _get_conn(self):
+        """Returns (connection, reused), reusing an idle connection if
+        there is one."""
+
+        now = time.time()
+        with self._lock:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if self.pool_idle_timeout is None or \
+                        now - last_used <= self.pool_idle_timeout:
+                    return conn, True
+                conn.close()
+        return self._new_conn(), False
+
+    def _new_conn(self):
+        """Returns a new connection."""
+        if self.scheme == 'https':
+            return httplib.HTTPSConnection(self.host, self.port,
+                                           timeout=self.timeout,
+                                           context=self._ssl_context)
+        return httplib.HTTPConnection(self.host, self.port,
+                                      timeout=self.timeout)
+
+    def _put_conn(self, conn):
+        """Keep a connection whose response was fully read for reuse."""
+        with self._lock:
+            if len(self._idle) < self.pool_maxsize:
+                self._idle.append((conn, time.time()))
+                return
+        conn.close()
+
+    def close(self):
+        """Close all the connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            conn.close()
+
+
+class _HTTPClientResponse(Response):
+    """An http.client response."""
+
+    def __init__(self, transport, conn, raw):
+        Response.__init__(self, raw.status, _HeaderDict(raw.getheaders()))
+        self._transport = transport
+        self._conn = conn
+        self._raw = raw
+
+    def stream(self, chunk_size=64 * 1024):
+        """Yields the body in chunks, then releases the connection."""
+
+        if self.data is not None:
+            for chunk in Response.stream(self, chunk_size):
+                yield chunk
+            return
+
+        decoder = ContentDecoder(self.headers.get('Content-Encoding'))
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                break
+            self.wire_bytes += len(chunk)
+            decoded = decoder.decode(chunk)
+            if decoded:
+                yield decoded
+        decoded = decoder.flush()
+        if decoded:
+            yield decoded
+        self._release()
+
+    def _release(self):
+        """Return the connection to the pool, unless the server is
+        closing it."""
+        if self._conn is None:
+            return
+        if self._raw.will_close:
+            self._conn.close()
+        else:
+            self._transport._put_conn(self._conn)
+        self._conn = None
+
+    def close(self):
+        """Discard the rest of the body, and the connection with it."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class _HeaderDict(dict):
+    """A dictionary of headers with case-insensitive get()."""
+
+    def __init__(self, items):
+        dict.__init__(self, items)
+        self._lower = dict((key.lower(), value) for key, value in items)
+
+    def get(self, key, default=None):
+        return self._lower.get(key.lower(), default)
+
+    def __getitem__(self, key):
+        return self._lower[key.lower()]
+
+    def __contains__(self, key):
+        return key.lower() in self._lower
@@ -0,0 +1,216 @@
+"""
+Waiting for the insights of many bundles: an InsightWaiter polls every
+(bundle, insight) target from one scheduler, backing off exponentially
+(with jitter) per target and capping the overall poll rate, and yields
+each target as soon as its insight is ready:
+
+    targets = [(bundle_href, 'spoken_keywords') for bundle_href in hrefs]
+    for result in client.wait_for_insights(targets, max_rate=20):
+        if result.status == STATUS_READY:
+            ...
+"""
+
+import heapq
+import random
+import collections
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from clarify_python import helper
+from clarify_python.bulk import DEFAULT_MAX_WORKERS
+from clarify_python.ratelimit import TokenBucket
+
+# Default cap on the number of requests per second, all targets together.
+DEFAULT_MAX_POLL_RATE = 10
+
+# Default delays between two polls of a target, in seconds.
+DEFAULT_INITIAL_DELAY = 2
+DEFAULT_MAX_DELAY = 120
+
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+STATUS_TIMEOUT = 'timeout'
+STATUS_ERROR = 'error'
+
+# Insight statuses after which an insight will never be ready.
+INSIGHT_FAILED_STATUSES = frozenset(['failed', 'error'])
+
+# The outcome for a target: 'status' is STATUS_READY (with the
+# 'insight'), STATUS_FAILED (with the failed 'insight'), STATUS_TIMEOUT
+# or STATUS_ERROR (with the 'exception').
+WaitResult = collections.namedtuple(
+    'WaitResult', ['bundle', 'insight_rel', 'status', 'insight',
+                   'exception'])
+
+
+class _Target(object):
+    """The polling state of a (bundle, insight_rel) target."""
+
+    def __init__(self, bundle, insight_rel, deadline):
+        self.bundle = bundle
+        self.insight_rel = insight_rel
+        self.deadline = deadline
+        self.polls = 0
+        self.polled_at = None
+        self.insights_href = None
+        self.insight_href = None
+
+
+class InsightWaiter(object):
+    """Iterates over the WaitResult of every target once it is settled:
+    when its insight is ready or failed, when it timed out, or when
+    polling it raised an exception other than a transient APIException
+    (429 or 5xx), in the order this happens.
+
+    Each poll of a target fetches what is still unknown of the bundle,
+    its insights and the insight, bypassing the client's caches. Every
+    request first takes a token from a TokenBucket of 'max_rate' tokens
+    per second, shared by all the targets (and by other waiters if
+    'bucket' is given). The n-th delay between two polls of a target
+    (counted from 0) is between d/2 and d seconds, d being
+    min(max_delay, initial_delay * 2 ** n)."""
+
+    def __init__(self, client, targets, max_workers=DEFAULT_MAX_WORKERS,
+                 max_rate=DEFAULT_MAX_POLL_RATE,
+                 initial_delay=DEFAULT_INITIAL_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, timeout=None, bucket=None):
+        """Initializer.
+
+        'client' the clarify.Client, which must be thread-safe.
+        'targets' an iterable of (bundle, insight_rel) pairs. 'bundle'
+        is a bundle href or a bundle data structure; 'insight_rel' an
+        insight name such as 'spoken_keywords' or its link relation
+        'insight:spoken_keywords'.
+        'max_workers' the maximum number of polls in flight.
+        'max_rate' the maximum number of requests per second.
+        'initial_delay' and 'max_delay' the bounds of the delay between
+        two polls of a target, in seconds.
+        'timeout' the number of seconds after which a target that isn't
+        ready is given up. Its last poll is made at the deadline, however
+        long the current delay. May be None to wait forever.
+        'bucket' a ratelimit.TokenBucket to use instead of one of
+        'max_rate'."""
+
+        # Argument error checking.
+        assert client is not None
+        assert targets is not None
+        assert max_workers > 0
+        assert max_rate > 0
+        assert 0 <= initial_delay <= max_delay
+        assert timeout is None or timeout >= 0
+
+        self.max_workers = max_workers
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.bucket = bucket if bucket is not None else TokenBucket(max_rate)
+        self._client = client
+        self._targets = list(targets)
+
+    def __iter__(self):
+        now = time.time()
+        deadline = now + self.timeout if self.timeout is not None else None
+        # (time of the next poll, sequence number, target)
+        schedule = []
+        for seq, (bundle, insight_rel) in enumerate(self._targets):
+            if not insight_rel.startswith('insight:'):
+                insight_rel = 'insight:' + insight_rel
+            schedule.append((now, seq, _Target(bundle, insight_rel,
+                                               deadline)))
+        heapq.heapify(schedule)
+        seq = len(schedule)
+
+        running = {}
+        executor = ThreadPoolExecutor(self.max_workers)
+        try:
+            while schedule or running:
+                now = time.time()
+                while schedule and schedule[0][0] <= now and \
+                        len(running) < self.max_workers:
+                    target = heapq.heappop(schedule)[2]
+                    target.polled_at = now
+                    running[executor.submit(self._poll, target)] = target
+
+                timeout = None
+                if schedule and len(running) < self.max_workers:
+                    timeout = max(0, schedule[0][0] - now)
+                if not running:
+                    time.sleep(timeout)
+                    continue
+
+                done, _ = wait(list(running), timeout=timeout,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    target = running.pop(future)
+                    result = future.result()
+                    if result is None:
+                        next_poll = time.time() + self._get_delay(target)
+                        if target.deadline is not None:
+                            if target.polled_at >= target.deadline:
+                                result = WaitResult(target.bundle,
+                                                    target.insight_rel,
+                                                    STATUS_TIMEOUT, None,
+                                                    None)
+                            # Poll one last time at the deadline.
+                            next_poll = min(next_poll, target.deadline)
+                    if result is not None:
+                        yield result
+                    else:
+                        heapq.heappush(schedule, (next_poll, seq, target))
+                        seq += 1
+        finally:
+            for future in running:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _get_delay(self, target):
+        """The jittered delay before the next poll of 'target'."""
+        delay = min(self.max_delay,
+                    self.initial_delay * (2 ** (target.polls - 1)))
+        return random.uniform(delay / 2.0, delay)
+
+    def _fetch(self, href):
+        """GET a model, bypassing the caches, once the rate allows."""
+        self.bucket.acquire()
+        return self._client._get_model(href, use_cache=False)
+
+    def _poll(self, target):
+        """Poll 'target' once. Returns its WaitResult if it is settled,
+        None otherwise."""
+
+        # Deferred, clarify imports this module.
+        from clarify_python.clarify import APIException
+
+        target.polls += 1
+        try:
+            if target.insights_href is None:
+                bundle = target.bundle
+                if not hasattr(bundle, 'keys'):
+                    self.bucket.acquire()
+                    bundle = self._client.get_bundle(bundle)
+                target.insights_href = helper.get_link_href(
+                    bundle, 'clarify:insights')
+            if target.insight_href is None:
+                insights = self._fetch(target.insights_href)
+                target.insight_href = helper.get_link_href(
+                    insights, target.insight_rel)
+                if target.insight_href is None:
+                    return None
+
+            insight = self._fetch(target.insight_href)
+            status = insight.get('status')
+            if status == STATUS_READY:
+                return WaitResult(target.bundle, target.insight_rel,
+                                  STATUS_READY, insight, None)
+            if status in INSIGHT_FAILED_STATUSES:
+                return WaitResult(target.bundle, target.insight_rel,
+                                  STATUS_FAILED, insight, None)
+            return None
+        except APIException as e:
+            status = e.get_http_response()
+            if status == 429 or status >= 500:
+                return None
+            return WaitResult(target.bundle, target.insight_rel,
+                              STATUS_ERROR, None, e)
+        except Exception as e:
+            return WaitResult(target.bundle, target.insight_rel,
+                              STATUS_ERROR, None, e)
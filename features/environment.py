@@ -52,13 +52,10 @@ def before_all(context):
 def after_all(context):
     context.customer.log_in_via_environment()
 
-    def _delete_test_bundle(client, bundle_href):
-        nonlocal context
-        bundle = client.get_bundle(bundle_href)
-        if context.names.matches(bundle['name']):
-            client.delete_bundle(bundle_href)
+    def _is_test_bundle(bundle):
+        return context.names.matches(bundle.get('name') or '')
 
-    context.customer.client().bundle_list_map(_delete_test_bundle)
+    context.customer.client().purge_bundles(_is_test_bundle)
     context.customer = None
 
 
@@ -33,8 +33,14 @@ setup(
     include_package_data=True,
     install_requires=[
         'urllib3',
-        'certifi'
+        'certifi',
+        'futures; python_version < "3"'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'orjson': ['orjson'],
+        'ujson': ['ujson'],
+    },
     entry_points={
         'console_scripts': [
             'clarify_export = clarify_python.clarify_export:main'
@@ -56,7 +62,8 @@ setup(
         # httpretty 0.8.12 breaks due to having invalid python3 lambda
         # syntax
         'httpretty<=0.8.10',
-        'behave>=1.2.5'
+        'behave>=1.2.5',
+        'aiohttp; python_version >= "3.7"'
     ],
     test_suite='tests',
 )
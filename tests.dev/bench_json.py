@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+"""
+Micro-benchmark of response parsing on the fixtures in tests/data:
+decoding the body to a string and parsing it with the standard library
+(what the client used to do) against parsing the bytes directly with
+each available JSON codec. Not a unit test.
+
+Run from the repository root:
+
+    python tests.dev/bench_json.py [repeat]
+"""
+
+import os
+import sys
+import json
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from clarify_python.jsoncodec import get_codec, get_available_codecs
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data')
+
+
+def load_fixtures():
+    """Returns a list of (name, body bytes) for the fixtures."""
+
+    fixtures = []
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith('.json'):
+            with open(os.path.join(DATA_DIR, name), 'rb') as body_file:
+                fixtures.append((name, body_file.read()))
+    return fixtures
+
+
+def best_time(func, number, repeat):
+    """Returns the best time of one call to func, in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / \
+        number * 1e6
+
+
+def run(repeat=5, number=2000):
+    """Time every codec on every fixture and print the results."""
+
+    codecs = [get_codec(name) for name in get_available_codecs()]
+    print('%-28s %8s %14s' % ('fixture', 'bytes', 'decode+json') +
+          ''.join(' %14s' % codec.name for codec in codecs))
+
+    for name, body in load_fixtures():
+        baseline = best_time(lambda: json.loads(body.decode('utf-8')),
+                             number, repeat)
+        line = '%-28s %8d %12.1fus' % (name, len(body), baseline)
+        for codec in codecs:
+            elapsed = best_time(lambda: codec.loads(body), number, repeat)
+            line += ' %8.1fus x%3.1f' % (elapsed, baseline / elapsed)
+        print(line)
+
+if __name__ == '__main__':
+
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
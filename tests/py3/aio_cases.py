@@ -0,0 +1,158 @@
+"""
+The AsyncClient tests, imported by test_aio on Python 3.7+ only: this
+module is a SyntaxError on Python 2. Its directory has no __init__.py so
+that setuptools' test loader, which imports every module of the tests
+package, skips it.
+"""
+
+import gzip
+import json
+import asyncio
+import unittest
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+    from clarify_python.aio import AsyncClient
+except (ImportError, SyntaxError):
+    web = None
+from clarify_python.clarify import APIException
+from clarify_python.helper import get_link_href, get_item_hrefs
+from .. import load_body
+
+
+BUNDLE_HREF = '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f'
+
+
+def _make_app(log):
+    """Build an aiohttp app serving the test data. Requests and posted
+    forms are appended to log['requests'] and log['forms']."""
+
+    log['requests'] = []
+    log['forms'] = []
+
+    def json_handler(filename, status=200):
+        async def handler(request):
+            log['requests'].append(request)
+            if request.method in ('POST', 'PUT'):
+                log['forms'].append(dict(await request.post()))
+            if filename is None:
+                return web.Response(status=status)
+            return web.Response(text=load_body(filename), status=status,
+                                content_type='application/json')
+        return handler
+
+    app = web.Application()
+    app.router.add_get('/v1/bundles', json_handler('bundles_1.json'))
+    app.router.add_post('/v1/bundles', json_handler('bundle_ref.json', 201))
+    app.router.add_get('/v1/bundles/{id}', json_handler('bundle.json'))
+    app.router.add_delete('/v1/bundles/{id}', json_handler(None, 204))
+    app.router.add_get('/v1/bundles/{id}/insights',
+                       json_handler('insights.json'))
+    app.router.add_get('/v1/bundles/{id}/insights/{insight}',
+                       json_handler('insight_classification.json'))
+    app.router.add_get('/v1/missing', json_handler('bundle.json', 404))
+
+    async def gzip_handler(request):
+        body = gzip.compress(load_body('metadata.json').encode('utf-8'))
+        return web.Response(body=body, content_type='application/json',
+                            headers={'Content-Encoding': 'gzip'})
+    app.router.add_get('/v1/bundles/{id}/metadata', gzip_handler)
+    return app
+
+
+@unittest.skipIf(web is None, 'aiohttp is not installed')
+class TestAsyncClient(unittest.TestCase):
+
+    def run_with_client(self, coro_func, **client_kwargs):
+        async def runner():
+            app = {}
+            async with TestServer(_make_app(app)) as server:
+                async with AsyncClient('my-api-key',
+                                       **client_kwargs) as client:
+                    client.base_url = str(server.make_url('')).rstrip('/')
+                    return await coro_func(client, app)
+        return asyncio.run(runner())
+
+    def test_get_bundle_embedded(self):
+        async def check(client, app):
+            result = await client.get_bundle(BUNDLE_HREF, embed_tracks=True,
+                                             embed_insights=True)
+            self.assertEqual(get_link_href(result, 'self'), BUNDLE_HREF)
+            request = app['requests'][-1]
+            self.assertEqual(request.query['embed'], 'tracks,insights')
+            self.assertEqual(request.headers['Authorization'],
+                             'Bearer my-api-key')
+            self.assertEqual(client.get_last_status(), 200)
+        self.run_with_client(check)
+
+    def test_create_bundle(self):
+        async def check(client, app):
+            result = await client.create_bundle(name='test', external_id='123',
+                                                metadata={'a': 1})
+            self.assertEqual(get_link_href(result, 'self'), BUNDLE_HREF)
+            form = dict(app['forms'][-1])
+            self.assertEqual(json.loads(form.pop('metadata')), {'a': 1})
+            self.assertEqual(form, {'name': 'test', 'external_id': '123'})
+        self.run_with_client(check)
+
+    def test_get_insight(self):
+        async def check(client, app):
+            bundle = await client.get_bundle(BUNDLE_HREF)
+            insights = await client.get_insights(
+                get_link_href(bundle, 'clarify:insights'))
+            insight_href = get_link_href(insights, 'insight:classification')
+            result = await client.get_insight(insight_href)
+            self.assertEqual(result['status'], 'ready')
+        self.run_with_client(check)
+
+    def test_delete_bundle(self):
+        async def check(client, app):
+            await client.delete_bundle(BUNDLE_HREF)
+            self.assertEqual(client.get_last_status(), 204)
+        self.run_with_client(check)
+
+    def test_error(self):
+        async def check(client, app):
+            with self.assertRaises(APIException):
+                await client.get_metadata('/v1/missing')
+            self.assertEqual(client.get_last_status(), 404)
+        self.run_with_client(check)
+
+    def test_gzip_response(self):
+        async def check(client, app):
+            result = await client.get_metadata(BUNDLE_HREF + '/metadata')
+            self.assertEqual(result['version'], 1)
+            self.assertEqual(app['requests'], [])
+            stats = client.get_transfer_stats()
+            self.assertEqual(stats['compressed_responses'], 1)
+            self.assertLess(stats['wire_bytes'], stats['content_bytes'])
+        self.run_with_client(check)
+
+    def test_concurrent_requests(self):
+        async def check(client, app):
+            results = await asyncio.gather(
+                *[client.get_bundle(BUNDLE_HREF) for _ in range(20)])
+            self.assertEqual(len(results), 20)
+            self.assertEqual(len(app['requests']), 20)
+        self.run_with_client(check)
+
+    def test_coalesce(self):
+        async def check(client, app):
+            results = await asyncio.gather(
+                *[client.get_bundle(BUNDLE_HREF) for _ in range(20)])
+            self.assertEqual(len(app['requests']), 1)
+            self.assertTrue(all(result is results[0] for result in results))
+        self.run_with_client(check, coalesce=True)
+
+    def test_bundle_list_map(self):
+        async def check(client, app):
+            page = await client.get_bundle_list()
+            seen = []
+
+            async def func(client, href):
+                seen.append(href)
+                return len(seen) < 3
+
+            await client.bundle_list_map(func, page)
+            self.assertEqual(seen, get_item_hrefs(page)[:3])
+        self.run_with_client(check)
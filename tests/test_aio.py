@@ -0,0 +1,5 @@
+import sys
+
+# The tests use async syntax, and the AsyncClient needs Python 3.7+.
+if sys.version_info >= (3, 7):
+    from .py3.aio_cases import TestAsyncClient
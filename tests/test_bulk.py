@@ -0,0 +1,188 @@
+import time
+import threading
+import unittest
+import httpretty
+from clarify_python.clarify import Client, APIException
+from clarify_python.bulk import run_concurrently, iter_concurrently, \
+    BulkItemResult
+from .test_pager import register_pages
+
+
+class InFlight(object):
+    """Counts the calls of wait() in flight. Each call blocks until
+    'count' calls are in flight at once (or 'timeout' seconds passed),
+    so that the calls only complete if they run concurrently."""
+
+    def __init__(self, count, timeout=5):
+        self.count = count
+        self.timeout = timeout
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.reached = threading.Event()
+
+    def wait(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.in_flight >= self.count:
+                self.reached.set()
+        self.reached.wait(self.timeout)
+        with self.lock:
+            self.in_flight -= 1
+
+
+class TestRunConcurrently(unittest.TestCase):
+
+    def test_concurrent(self):
+        overlap = InFlight(8)
+
+        def work(item):
+            overlap.wait()
+            return item * 2
+        report = run_concurrently(work, range(16), max_workers=8,
+                                  preserve_order=True)
+        self.assertEqual(overlap.max_in_flight, 8)
+        self.assertEqual([result.result for result in report],
+                         [item * 2 for item in range(16)])
+        self.assertFalse(report.stopped)
+        self.assertEqual(report.get_summary(),
+                         {'run': 16, 'succeeded': 16, 'failed': 0,
+                          'stopped': False})
+
+    def test_exceptions_are_collected(self):
+        def work(item):
+            if item % 3 == 0:
+                raise ValueError(item)
+            return item
+        report = run_concurrently(work, range(9), max_workers=3)
+        self.assertEqual(len(report), 9)
+        self.assertEqual(sorted(result.item for result in report.failed),
+                         [0, 3, 6])
+        self.assertIsInstance(report.failed[0].exception, ValueError)
+        self.assertEqual(len(report.succeeded), 6)
+
+    def test_stop(self):
+        consumed = []
+        lock = threading.Lock()
+
+        def items():
+            for item in range(1000):
+                consumed.append(item)
+                yield item
+
+        def work(item):
+            with lock:
+                time.sleep(0.001)
+            return item != 5
+
+        report = run_concurrently(work, items(), max_workers=2)
+        self.assertTrue(report.stopped)
+        self.assertIn(BulkItemResult(5, 5, False, None), report.results)
+        self.assertLess(len(consumed), 20)
+        self.assertLess(len(report), 20)
+
+
+    def test_iter_concurrently(self):
+        def func(item):
+            time.sleep(0.05 if item == 0 else 0)
+            return item
+        results = iter_concurrently(func, range(4), max_workers=4)
+        # The slow item completes last.
+        self.assertEqual([result.item for result in results][-1], 0)
+
+        consumed = []
+
+        def items():
+            for item in range(100):
+                consumed.append(item)
+                yield item
+        item_iter = items()
+        results = iter_concurrently(func, item_iter, max_workers=2)
+        next(results)
+        results.close()
+        self.assertLess(len(consumed), 10)
+        # The caller's iterator is left open.
+        self.assertEqual(next(item_iter), len(consumed) - 1)
+
+
+class CreateClient(Client):
+    """A Client whose create_bundle() is a thread-safe fake: it records
+    the names created, waits on an InFlight, and fails for the name
+    'bad'."""
+
+    def __init__(self, overlap):
+        Client.__init__(self, 'my-api-key')
+        self.overlap = overlap
+        self.created = []
+        self.lock = threading.Lock()
+
+    def create_bundle(self, name=None, media_url=None, **kwargs):
+        self.overlap.wait()
+        if name == 'bad':
+            raise APIException(400, b'{"code": 400}')
+        with self.lock:
+            self.created.append(name)
+        return {'name': name, '_links': {'self': {'href':
+                                                  '/v1/bundles/' + name}}}
+
+
+class TestCreateBundles(unittest.TestCase):
+
+    def test_create_bundles(self):
+        client = CreateClient(InFlight(4))
+        specs = [{'name': 'b%d' % i, 'media_url': 'http://x/%d.mp3' % i}
+                 for i in range(10)]
+        specs.insert(3, {'name': 'bad'})
+        report = client.create_bundles(iter(specs), max_workers=4,
+                                       preserve_order=True)
+        self.assertEqual(client.overlap.max_in_flight, 4)
+        self.assertEqual(report.get_summary(), {'run': 11, 'succeeded': 10,
+                                                'failed': 1,
+                                                'stopped': False})
+        self.assertEqual(sorted(client.created), ['b%d' % i
+                                                  for i in range(10)])
+        self.assertEqual(report.results[0].result['name'], 'b0')
+        failed = report.failed[0]
+        self.assertEqual(failed.index, 3)
+        self.assertIsInstance(failed.exception, APIException)
+        self.assertEqual(failed.exception.get_http_response(), 400)
+
+    def test_iter_create_bundles(self):
+        client = CreateClient(InFlight(3))
+        specs = [{'name': 'b%d' % i} for i in range(7)]
+        names = [result.result['name']
+                 for result in client.iter_create_bundles(specs,
+                                                          max_workers=3)]
+        self.assertEqual(client.overlap.max_in_flight, 3)
+        self.assertEqual(sorted(names), ['b%d' % i for i in range(7)])
+
+
+class TestBundleListMapConcurrent(unittest.TestCase):
+
+    @httpretty.activate
+    def test_bundle_list_map_concurrent(self):
+        register_pages(3)
+        client = Client('my-api-key')
+        seen = []
+
+        def func(client, href):
+            seen.append(href)
+            return href.upper()
+
+        report = client.bundle_list_map_concurrent(func, max_workers=4,
+                                                   preserve_order=True)
+        self.assertEqual(len(seen), 9)
+        self.assertEqual([result.item for result in report],
+                         ['/v1/bundles/b%d_%d' % (page, i)
+                          for page in range(3) for i in range(3)])
+        self.assertEqual(report.results[0].result, '/V1/BUNDLES/B0_0')
+
+        first_page = client.get_bundle_list()
+        report = client.bundle_list_map_concurrent(
+            lambda client, href: not href.endswith('b1_0'), first_page,
+            max_workers=1, preserve_order=True, prefetch=0)
+        self.assertTrue(report.stopped)
+        # The worker may start the next bundle before it is cancelled.
+        self.assertIn(len(report), (4, 5))
+        self.assertFalse(report.results[3].result)
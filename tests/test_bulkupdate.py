@@ -0,0 +1,178 @@
+import re
+import json
+import threading
+import unittest
+import httpretty
+from clarify_python.clarify import Client, APIException
+from .test_bulk import InFlight
+from . import host
+
+
+class MetadataStore(object):
+    """The bundles b0..b<count-1> and their versioned metadata,
+    thread-safe. The first update of a bundle in 'contended' conflicts,
+    as if another client had updated it meanwhile."""
+
+    def __init__(self, count, contended=()):
+        self.metadata = dict(('b%d' % i, {'version': 1, 'data': {'n': i}})
+                             for i in range(count))
+        self.contended = set(contended)
+        self.lock = threading.Lock()
+
+    def get_bundle(self, bid, embed_metadata=False):
+        bundle = {'_links': {
+            'self': {'href': '/v1/bundles/' + bid},
+            'clarify:metadata': {'href': '/v1/bundles/%s/metadata' % bid}}}
+        if embed_metadata:
+            bundle['_embedded'] = {'clarify:metadata':
+                                   self.get_metadata(bid)}
+        return bundle
+
+    def get_metadata(self, bid):
+        href = '/v1/bundles/%s/metadata' % bid
+        with self.lock:
+            metadata = self.metadata[bid]
+            return {'version': metadata['version'],
+                    'data': json.loads(json.dumps(metadata['data'])),
+                    '_links': {'self': {'href': href}}}
+
+    def update(self, bid, version, data):
+        """Returns the updated metadata, or None on a conflict."""
+        with self.lock:
+            metadata = self.metadata[bid]
+            if bid in self.contended:
+                self.contended.discard(bid)
+                metadata['version'] += 1
+                metadata['data']['other'] = True
+            if version != metadata['version']:
+                return None
+            metadata['version'] += 1
+            metadata['data'] = json.loads(json.dumps(data))
+        return self.get_metadata(bid)
+
+    def register(self):
+        """Serve the store with httpretty."""
+        def bundle_callback(request, uri, response_headers):
+            bid = uri.split('?')[0].rsplit('/', 1)[1]
+            embed = 'metadata' in request.querystring.get('embed', [''])[0]
+            return [200, response_headers,
+                    json.dumps(self.get_bundle(bid, embed))]
+
+        def metadata_callback(request, uri, response_headers):
+            bid = uri.split('?')[0].split('/')[-2]
+            if request.method == 'GET':
+                return [200, response_headers,
+                        json.dumps(self.get_metadata(bid))]
+            metadata = self.update(bid,
+                                   int(request.parsed_body['version'][0]),
+                                   json.loads(request.parsed_body['data'][0]))
+            if metadata is None:
+                return [409, response_headers, '{"code": 409}']
+            return [202, response_headers, json.dumps(metadata)]
+
+        for method in ('GET', 'PUT'):
+            httpretty.register_uri(
+                method, re.compile(host + r'/v1/bundles/(\w+)/metadata$'),
+                body=metadata_callback, content_type='application/json')
+        httpretty.register_uri('GET', re.compile(host + r'/v1/bundles/(\w+)$'),
+                               body=bundle_callback,
+                               content_type='application/json')
+
+
+class MetadataClient(Client):
+    """A Client reading and updating a MetadataStore directly, so that
+    it is thread-safe. Updates wait on an InFlight."""
+
+    def __init__(self, store, overlap):
+        Client.__init__(self, 'my-api-key')
+        self.store = store
+        self.overlap = overlap
+
+    def get_bundle(self, href=None, embed_tracks=False,
+                   embed_metadata=False, embed_insights=False):
+        return self.store.get_bundle(href.rsplit('/', 1)[1], embed_metadata)
+
+    def _get_model(self, href, use_cache=True):
+        return self.store.get_metadata(href.split('/')[-2])
+
+    def update_metadata(self, href=None, metadata=None, version=None):
+        self.overlap.wait()
+        result = self.store.update(href.split('/')[-2], version, metadata)
+        if result is None:
+            raise APIException(409, b'{"code": 409}')
+        return result
+
+
+def tag(user_data):
+    user_data['tag'] = 'x'
+    return user_data
+
+
+class TestUpdateMetadataBulk(unittest.TestCase):
+
+    def test_update(self):
+        store = MetadataStore(6, contended=['b1', 'b4'])
+        client = MetadataClient(store, InFlight(4))
+        hrefs = ['/v1/bundles/b%d' % i for i in range(6)]
+        report = client.update_metadata_bulk(tag, hrefs, max_workers=4,
+                                             preserve_order=True)
+        self.assertEqual(client.overlap.max_in_flight, 4)
+        summary = report.get_summary()
+        self.assertEqual(summary['succeeded'], 6)
+        self.assertEqual(summary['conflicts'], 2)
+        # The conflicting updates were re-applied to the new metadata.
+        self.assertEqual(store.metadata['b1']['data'],
+                         {'n': 1, 'other': True, 'tag': 'x'})
+        self.assertEqual(store.metadata['b1']['version'], 3)
+        self.assertEqual(store.metadata['b0']['data'], {'n': 0, 'tag': 'x'})
+        self.assertEqual(report.results[0].result['data'],
+                         {'n': 0, 'tag': 'x'})
+
+    def test_retry_budget(self):
+        store = MetadataStore(2, contended=['b0'])
+        client = MetadataClient(store, InFlight(2))
+        report = client.update_metadata_bulk(
+            tag, ['/v1/bundles/b0', '/v1/bundles/b1'], max_workers=2,
+            max_retries=0, preserve_order=True)
+        self.assertEqual(report.conflicts, 1)
+        self.assertIsInstance(report.results[0].exception, APIException)
+        self.assertEqual(report.results[0].exception.get_http_response(), 409)
+        self.assertIsNone(report.results[1].exception)
+
+    def test_skip(self):
+        store = MetadataStore(3)
+        client = MetadataClient(store, InFlight(2))
+        bundles = [client.get_bundle('/v1/bundles/b%d' % i,
+                                     embed_metadata=True)
+                   for i in range(3)]
+        report = client.update_metadata_bulk(
+            lambda user_data: tag(user_data) if user_data['n'] else None,
+            bundles, max_workers=3)
+        self.assertEqual(report.get_summary()['skipped'], 1)
+        self.assertEqual(store.metadata['b0']['version'], 1)
+        self.assertEqual(store.metadata['b2']['version'], 2)
+
+    def test_not_embedded(self):
+        store = MetadataStore(2)
+        client = MetadataClient(store, InFlight(2))
+        bundles = [client.get_bundle('/v1/bundles/b%d' % i) for i in range(2)]
+        self.assertNotIn('_embedded', bundles[0])
+        report = client.update_metadata_bulk(tag, bundles, max_workers=2)
+        self.assertEqual(report.get_summary()['succeeded'], 2)
+        self.assertEqual(store.metadata['b1'],
+                         {'version': 2, 'data': {'n': 1, 'tag': 'x'}})
+
+    @httpretty.activate
+    def test_http(self):
+        # One bundle, so that httpretty only sees one request at a time.
+        store = MetadataStore(1, contended=['b0'])
+        store.register()
+        client = Client('my-api-key')
+        report = client.update_metadata_bulk(tag, ['/v1/bundles/b0'])
+        self.assertEqual(report.get_summary()['succeeded'], 1)
+        self.assertEqual(report.conflicts, 1)
+        self.assertEqual(store.metadata['b0'],
+                         {'version': 3,
+                          'data': {'n': 0, 'other': True, 'tag': 'x'}})
+        self.assertEqual(httpretty.last_request().parsed_body['version'],
+                         ['2'])
@@ -0,0 +1,111 @@
+import time
+import unittest
+import httpretty
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+from clarify_python.clarify import Client
+from clarify_python.cache import ValidatorCache, ResponseCache, make_key
+from . import register_uris, host, load_body
+
+
+BUNDLE_HREF = '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f'
+METADATA_HREF = BUNDLE_HREF + '/metadata'
+
+
+class TestValidatorCache(unittest.TestCase):
+
+    def test_lru(self):
+        validator_cache = ValidatorCache(maxsize=2)
+        validator_cache.set(make_key('/a'), '"1"', None, {'a': 1})
+        validator_cache.set(make_key('/b'), '"2"', None, {'b': 2})
+        self.assertEqual(validator_cache.get(make_key('/a')).model, {'a': 1})
+        validator_cache.set(make_key('/c'), '"3"', None, {'c': 3})
+        self.assertIsNone(validator_cache.get(make_key('/b')))
+        self.assertIsNotNone(validator_cache.get(make_key('/a')))
+        self.assertEqual(len(validator_cache), 2)
+
+
+class TestConditionalGet(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+
+        def callback(request, uri, headers):
+            self.requests.append(request)
+            headers['ETag'] = '"v1"'
+            if request.headers.get('If-None-Match') == '"v1"':
+                return 304, headers, ''
+            return 200, headers, load_body('metadata.json')
+
+        httpretty.enable()
+        httpretty.register_uri('GET', host + METADATA_HREF, body=callback)
+        self.client = Client('my-api-key', validator_cache=ValidatorCache())
+
+    def tearDown(self):
+        httpretty.disable()
+        httpretty.reset()
+
+    def test_not_modified(self):
+        first = self.client.get_metadata(METADATA_HREF)
+        second = self.client.get_metadata(METADATA_HREF)
+        self.assertIs(first, second)
+        self.assertEqual(self.client.get_last_status(), 304)
+        self.assertNotIn('If-None-Match', self.requests[0].headers)
+        self.assertEqual(self.requests[1].headers['If-None-Match'], '"v1"')
+
+    def test_no_cache(self):
+        client = Client('my-api-key')
+        first = client.get_metadata(METADATA_HREF)
+        second = client.get_metadata(METADATA_HREF)
+        self.assertIsNot(first, second)
+        self.assertEqual(first, second)
+        self.assertNotIn('If-None-Match', self.requests[1].headers)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_ttl_and_lru(self):
+        response_cache = ResponseCache(maxsize=2, ttl=60)
+        response_cache.set(make_key('/a'), {'a': 1})
+        response_cache.set(make_key('/b'), {'b': 2})
+        self.assertEqual(response_cache.get(make_key('/a')), {'a': 1})
+        response_cache.set(make_key('/c'), {'c': 3})
+        self.assertIsNone(response_cache.get(make_key('/b')))
+
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(response_cache.get(make_key('/a')))
+        self.assertEqual(response_cache.get_stats()['hits'], 1)
+
+    def test_invalidate_related(self):
+        response_cache = ResponseCache()
+        for href in [BUNDLE_HREF, METADATA_HREF, BUNDLE_HREF + '/tracks',
+                     '/v1/bundles/other']:
+            response_cache.set(make_key(href), {})
+        response_cache.set(make_key(BUNDLE_HREF, 'metadata'), {})
+        response_cache.invalidate(METADATA_HREF)
+        self.assertIsNone(response_cache.get(make_key(BUNDLE_HREF)))
+        self.assertIsNone(response_cache.get(make_key(BUNDLE_HREF,
+                                                      'metadata')))
+        self.assertIsNone(response_cache.get(make_key(METADATA_HREF)))
+        self.assertIsNotNone(response_cache.get(
+            make_key(BUNDLE_HREF + '/tracks')))
+        self.assertIsNotNone(response_cache.get(
+            make_key('/v1/bundles/other')))
+
+    @httpretty.activate
+    def test_client(self):
+        httpretty.register_uri('PUT', host + METADATA_HREF,
+                               body=load_body('metadata.json'), status=200,
+                               content_type='application/json')
+        register_uris(httpretty)
+        client = Client('my-api-key', response_cache=ResponseCache())
+        first = client.get_bundle(BUNDLE_HREF, embed_metadata=True)
+        self.assertIs(client.get_bundle(BUNDLE_HREF, embed_metadata=True),
+                      first)
+        self.assertIsNot(client.get_bundle(BUNDLE_HREF), first)
+
+        client.update_metadata(METADATA_HREF, {'name': 'changed'})
+        self.assertIsNot(client.get_bundle(BUNDLE_HREF, embed_metadata=True),
+                         first)
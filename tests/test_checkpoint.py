@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+import httpretty
+from clarify_python.clarify import Client
+from clarify_python.checkpoint import FileCheckpointStore, \
+    SQLiteCheckpointStore
+from .test_pager import register_pages
+
+
+class TestCheckpointStores(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def check_store(self, store):
+        self.assertIsNone(store.load('crawl'))
+        store.save('crawl', {'href': '/v1/bundles?iterator=abc', 'limit': 5})
+        store.save('other', {'href': '/v1/search?iterator=def'})
+        self.assertEqual(store.load('crawl'),
+                         {'href': '/v1/bundles?iterator=abc', 'limit': 5})
+        store.save('crawl', {'href': '/v1/bundles?iterator=ghi'})
+        self.assertEqual(store.load('crawl')['href'],
+                         '/v1/bundles?iterator=ghi')
+        store.clear('crawl')
+        store.clear('missing')
+        self.assertIsNone(store.load('crawl'))
+        self.assertIsNotNone(store.load('other'))
+
+    def test_file_store(self):
+        path = os.path.join(self.tmpdir, 'checkpoints.json')
+        self.check_store(FileCheckpointStore(path))
+        # Saved durably, for a new store on the same file.
+        self.assertIsNotNone(FileCheckpointStore(path).load('other'))
+        self.assertEqual(os.listdir(self.tmpdir), ['checkpoints.json'])
+
+    def test_sqlite_store(self):
+        path = os.path.join(self.tmpdir, 'checkpoints.db')
+        store = SQLiteCheckpointStore(path)
+        self.check_store(store)
+        store.close()
+        store = SQLiteCheckpointStore(path)
+        self.assertIsNotNone(store.load('other'))
+        store.close()
+
+
+class TestResume(unittest.TestCase):
+
+    def setUp(self):
+        self.store = SQLiteCheckpointStore(':memory:')
+        self.client = Client('my-api-key')
+
+    def tearDown(self):
+        self.store.close()
+
+    @httpretty.activate
+    def test_iter_bundles(self):
+        register_pages(4)
+        hrefs = []
+        try:
+            for href in self.client.iter_bundles(checkpoint_store=self.store,
+                                                 checkpoint_key='crawl',
+                                                 limit=3, prefetch=0):
+                if href == '/v1/bundles/b2_1':
+                    raise RuntimeError('crash')
+                hrefs.append(href)
+        except RuntimeError:
+            pass
+        self.assertEqual(len(hrefs), 7)
+        state = self.store.load('crawl')
+        self.assertEqual(state['href'], '/v1/bundles?page=2')
+        self.assertEqual(state['limit'], 3)
+
+        # Only the page in progress is processed again.
+        hrefs = list(self.client.iter_bundles(checkpoint_store=self.store,
+                                              checkpoint_key='crawl'))
+        self.assertEqual(hrefs[0], '/v1/bundles/b2_0')
+        self.assertEqual(len(hrefs), 6)
+        self.assertEqual(httpretty.last_request().querystring['limit'], ['3'])
+        self.assertIsNone(self.store.load('crawl'))
+
+    @httpretty.activate
+    def test_bundle_list_map(self):
+        register_pages(3)
+        hrefs = []
+
+        def func(client, bundle):
+            if bundle['_links']['self']['href'] == '/v1/bundles/b1_2':
+                raise RuntimeError('crash')
+            hrefs.append(bundle)
+
+        self.assertRaises(RuntimeError, self.client.bundle_list_map, func,
+                          embed_items=True, checkpoint_store=self.store,
+                          checkpoint_key='crawl')
+        self.assertEqual(len(hrefs), 5)
+        self.assertEqual(self.store.load('crawl')['href'],
+                         '/v1/bundles?page=1')
+
+        # Resumed with the saved embed overrides.
+        hrefs = []
+        self.client.bundle_list_map(lambda client, bundle: hrefs.append(bundle),
+                                    checkpoint_store=self.store,
+                                    checkpoint_key='crawl')
+        self.assertEqual(len(hrefs), 6)
+        self.assertEqual(hrefs[0]['_links']['self']['href'],
+                         '/v1/bundles/b1_0')
+        self.assertIsNone(self.store.load('crawl'))
+
+    @httpretty.activate
+    def test_iter_search(self):
+        register_pages(3)
+        pages = self.client.iter_search_pages(query='wizard',
+                                              checkpoint_store=self.store,
+                                              checkpoint_key='search',
+                                              prefetch=0)
+        next(pages)
+        next(pages)
+        pages.close()
+        self.assertEqual(self.store.load('search')['href'],
+                         '/v1/bundles?page=1')
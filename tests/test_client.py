@@ -1,12 +1,14 @@
+import io
 import unittest
+import threading
 import httpretty
 try:
     from urllib.parse import parse_qs
 except ImportError:
      from urlparse import parse_qs
-from clarify_python.clarify import Client
+from clarify_python.clarify import Client, APIException
 from clarify_python.helper import get_embedded, get_link_href
-from . import register_uris
+from . import register_uris, load_body, host
 
 
 class TestClient(unittest.TestCase):
@@ -115,3 +117,79 @@ class TestClient(unittest.TestCase):
         self.assertEqual(parse_qs(httpretty.last_request().body.decode('utf-8')),
                          {'insight': ['transcript_r9']})
         self.assertEqual(get_link_href(result, 'clarify:bundle'), href)
+
+    def test_pool_options(self):
+        client = Client('my-api-key', pool_maxsize=32, pool_block=True,
+                        pool_idle_timeout=30)
+        self.assertEqual(client.conn.pool.maxsize, 32)
+        self.assertTrue(client.conn.block)
+        self.assertEqual(client.conn.idle_timeout, 30)
+
+    @httpretty.activate
+    def test_last_status_per_thread(self):
+        register_uris(httpretty)
+        httpretty.register_uri('GET', host + '/v1/missing',
+                               body='{}', status=404,
+                               content_type='application/json')
+        self.client.get('/v1/missing')
+
+        statuses = []
+
+        def worker():
+            statuses.append(self.client.get_last_status())
+            self.client.get('/v1/bundles')
+            statuses.append(self.client.get_last_status())
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertEqual(statuses, [None, 200])
+        self.assertEqual(self.client.get_last_status(), 404)
+
+    @httpretty.activate
+    def test_get_data_stream(self):
+        body = 'WEBVTT\n\n' + '00:00.000 --> 00:01.000\nhello\n\n' * 1000
+        httpretty.register_uri('GET', host + '/v1/data/captions.vtt',
+                               body=body, status=200,
+                               content_type='text/vtt')
+        chunks = list(self.client.get_data('/v1/data/captions.vtt',
+                                           stream=True, chunk_size=1024))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks).decode(), body)
+
+        out = io.BytesIO()
+        size = self.client.get_data_to_file('/v1/data/captions.vtt', out)
+        self.assertEqual(size, len(body))
+        self.assertEqual(out.getvalue().decode(), body)
+        self.assertEqual(self.client.get_data('/v1/data/captions.vtt'), body)
+
+    @httpretty.activate
+    def test_get_data_stream_error(self):
+        httpretty.register_uri('GET', host + '/v1/data/missing',
+                               body='{"status": 404}', status=404,
+                               content_type='application/json')
+        with self.assertRaises(APIException):
+            self.client.get_data('/v1/data/missing', stream=True)
+
+    @httpretty.activate
+    def test_result_decodes_lazily(self):
+        register_uris(httpretty)
+        result = self.client.get('/v1/bundles')
+        self.assertIsNone(result._json)
+        self.assertEqual(result.content, load_body('bundles_1.json').encode())
+        self.assertIs(result.data, result.data)
+        self.assertIsNone(result._json)
+        status, text = result
+        self.assertEqual(status, 200)
+        self.assertEqual(text, load_body('bundles_1.json'))
+        self.assertEqual(result[0], 200)
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result.headers['content-type'], 'application/json')
+
+    def test_exception_parses_lazily(self):
+        exception = APIException(404, b'{"status": "not found", "code": 404}')
+        self.assertIsNone(exception._json_response)
+        self.assertEqual(exception.get_code(), 404)
+        self.assertEqual(exception.json_response,
+                         '{"status": "not found", "code": 404}')
+        self.assertEqual(APIException(500, b'oops').get_status(), '')
@@ -0,0 +1,137 @@
+import threading
+import unittest
+import httpretty
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+from clarify_python import coalesce
+from clarify_python.clarify import Client
+from clarify_python.coalesce import SingleFlight, make_flight_key
+from . import host, load_body
+
+
+METADATA_HREF = '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f/metadata'
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class Followers(object):
+    """Counts the threads waiting for a call in flight, by patching
+    coalesce._Call. The leader calls wait() to block until 'count'
+    followers wait for its call (or 'timeout' seconds passed), so that
+    they share it whatever the scheduling."""
+
+    def __init__(self, count, timeout=5):
+        self.count = count
+        self.timeout = timeout
+        self.waiting = 0
+        self.lock = threading.Lock()
+        self.reached = threading.Event()
+        followers = self
+
+        # type(): threading.Event is a factory function on Python 2.
+        class Done(type(threading.Event())):
+            def wait(self, timeout=None):
+                with followers.lock:
+                    followers.waiting += 1
+                    if followers.waiting >= followers.count:
+                        followers.reached.set()
+                return super(Done, self).wait(timeout)
+
+        base = coalesce._Call
+
+        class Call(base):
+            def __init__(self):
+                base.__init__(self)
+                self.done = Done()
+
+        self.patch = mock.patch('clarify_python.coalesce._Call', Call)
+
+    def wait(self):
+        self.reached.wait(self.timeout)
+
+    def __enter__(self):
+        self.patch.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.patch.stop()
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_shares_call(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        with Followers(7) as followers:
+            def slow():
+                calls.append(1)
+                followers.wait()
+                return {'value': 1}
+
+            run_threads(8, lambda: results.append(flight.do('key', slow)))
+        self.assertEqual(followers.waiting, 7)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(len(flight), 0)
+
+    def test_shares_exception(self):
+        flight = SingleFlight()
+        errors = []
+
+        calls = []
+
+        with Followers(3) as followers:
+            def failing():
+                calls.append(1)
+                followers.wait()
+                raise ValueError('boom')
+
+            def target():
+                try:
+                    flight.do('key', failing)
+                except ValueError as exception:
+                    errors.append(exception)
+
+            run_threads(4, target)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(errors), 4)
+
+    def test_flight_key(self):
+        self.assertEqual(make_flight_key('GET', '/a', {'b': 1, 'a': 'x'}),
+                         make_flight_key('GET', '/a', {'a': 'x', 'b': '1'}))
+        self.assertNotEqual(make_flight_key('GET', '/a'),
+                            make_flight_key('GET', '/a', {'embed': 'tracks'}))
+
+
+class TestClientCoalesce(unittest.TestCase):
+
+    @httpretty.activate
+    def test_concurrent_gets(self):
+        calls = []
+        followers = Followers(7)
+
+        def callback(request, uri, headers):
+            calls.append(uri)
+            followers.wait()
+            return 200, headers, load_body('metadata.json')
+
+        httpretty.register_uri('GET', host + METADATA_HREF, body=callback)
+        client = Client('my-api-key', coalesce=True)
+        results = []
+        with followers:
+            run_threads(8, lambda: results.append(
+                client.get_metadata(METADATA_HREF)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+        self.assertEqual(results[0]['version'], 1)
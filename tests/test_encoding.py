@@ -0,0 +1,76 @@
+import gzip
+import io
+import zlib
+import unittest
+import httpretty
+from clarify_python.clarify import Client
+from clarify_python.encoding import ContentDecoder, decode_content
+from . import host, load_body
+
+
+BUNDLE_HREF = '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f'
+
+
+def gzip_bytes(data):
+    out = io.BytesIO()
+    with gzip.GzipFile(fileobj=out, mode='wb') as f:
+        f.write(data)
+    return out.getvalue()
+
+
+class TestContentDecoder(unittest.TestCase):
+
+    def setUp(self):
+        self.data = load_body('bundle_embedded.json').encode('utf-8')
+
+    def decode_in_chunks(self, encoded, encoding, size=100):
+        decoder = ContentDecoder(encoding)
+        parts = [decoder.decode(encoded[i:i + size])
+                 for i in range(0, len(encoded), size)]
+        return b''.join(parts) + decoder.flush()
+
+    def test_gzip(self):
+        self.assertEqual(self.decode_in_chunks(gzip_bytes(self.data), 'gzip'),
+                         self.data)
+
+    def test_deflate(self):
+        self.assertEqual(decode_content(zlib.compress(self.data), 'deflate'),
+                         self.data)
+        raw = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        encoded = raw.compress(self.data) + raw.flush()
+        self.assertEqual(self.decode_in_chunks(encoded, 'deflate'), self.data)
+
+    def test_identity(self):
+        self.assertEqual(decode_content(self.data, None), self.data)
+
+
+class TestClientCompression(unittest.TestCase):
+
+    @httpretty.activate
+    def test_gzip_response(self):
+        data = load_body('bundle_embedded.json').encode('utf-8')
+        encoded = gzip_bytes(data)
+        httpretty.register_uri('GET', host + BUNDLE_HREF, body=encoded,
+                               status=200,
+                               adding_headers={'Content-Encoding': 'gzip'},
+                               content_type='application/json')
+        client = Client('my-api-key')
+        result = client.get_bundle(BUNDLE_HREF)
+        self.assertEqual(result['id'], 'bd9f12f93d3a4f63a89b4d249427d55f')
+        self.assertEqual(httpretty.last_request().headers['Accept-Encoding'],
+                         'gzip, deflate')
+        stats = client.get_transfer_stats()
+        self.assertEqual(stats['responses'], 1)
+        self.assertEqual(stats['compressed_responses'], 1)
+        self.assertEqual(stats['wire_bytes'], len(encoded))
+        self.assertEqual(stats['content_bytes'], len(data))
+        self.assertEqual(stats['saved_bytes'], len(data) - len(encoded))
+
+        chunks = list(client.get_data(BUNDLE_HREF, stream=True,
+                                      chunk_size=256))
+        self.assertEqual(b''.join(chunks), data)
+        self.assertEqual(client.get_transfer_stats()['wire_bytes'],
+                         2 * len(encoded))
+
+        client.reset_transfer_stats()
+        self.assertEqual(client.get_transfer_stats()['responses'], 0)
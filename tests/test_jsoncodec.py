@@ -0,0 +1,69 @@
+import json
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+import httpretty
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+from clarify_python.clarify import Client, APIConfigurationException
+from clarify_python.jsoncodec import get_codec, get_available_codecs
+from . import load_body, host
+
+
+class TestJSONCodec(unittest.TestCase):
+
+    def test_codecs_parse_bytes(self):
+        text = load_body('bundle_embedded.json')
+        expected = json.loads(text)
+        for name in get_available_codecs():
+            codec = get_codec(name)
+            self.assertEqual(codec.name, name)
+            self.assertEqual(codec.loads(text.encode('utf-8')), expected)
+            self.assertEqual(codec.loads(text), expected)
+            self.assertEqual(json.loads(codec.dumps(expected)), expected)
+            self.assertRaises(ValueError, codec.loads, b'{"a": ')
+
+    def test_codecs_dump_like_json(self):
+        # Whatever json.dumps() accepts, every codec serializes.
+        for obj in ({1: 'a', 'b': {2: None}}, {'big': 2 ** 70}):
+            expected = json.loads(json.dumps(obj))
+            for name in get_available_codecs():
+                self.assertEqual(json.loads(get_codec(name).dumps(obj)),
+                                 expected)
+
+    def test_stdlib_codec_passes_text(self):
+        # Python 3.5's json.loads() raises TypeError on bytes.
+        json_loads = json.loads
+
+        def loads(data):
+            if not isinstance(data, type(u'')):
+                raise TypeError('the JSON object must be str')
+            return json_loads(data)
+        codec = get_codec('json')
+        with mock.patch('clarify_python.jsoncodec.json.loads', loads):
+            self.assertEqual(codec.loads(b'{"a": "\xc3\xa9"}'),
+                             {'a': u'\xe9'})
+            self.assertEqual(codec.loads(bytearray(b'[1]')), [1])
+            self.assertRaises(ValueError, codec.loads, b'"\xff"')
+
+    def test_default_codec(self):
+        self.assertEqual(get_codec().name, get_available_codecs()[0])
+        self.assertIn('json', get_available_codecs())
+        self.assertRaises(APIConfigurationException, get_codec, 'nope')
+
+    @httpretty.activate
+    def test_client_codec(self):
+        httpretty.register_uri('PUT', host + '/v1/bundles/abc/metadata',
+                               body=load_body('metadata.json'), status=202,
+                               content_type='application/json')
+        client = Client('my-api-key', json_codec=get_codec('json'))
+        self.assertEqual(client.json_codec.name, 'json')
+        result = client.update_metadata('/v1/bundles/abc/metadata',
+                                        metadata={'b': [1, 2]})
+        self.assertEqual(result, json.loads(load_body('metadata.json')))
+        body = parse_qs(httpretty.last_request().body.decode('utf-8'))
+        self.assertEqual(body['data'], ['{"b": [1, 2]}'])
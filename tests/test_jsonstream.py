@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+import httpretty
+from clarify_python.clarify import Client, APIDataException
+from clarify_python.jsonstream import iter_items
+from . import load_body, host
+
+INSIGHT_HREF = '/v1/bundles/abc/insights/def'
+
+
+def make_spoken_words(count):
+    """Returns a spoken_words insight with 'count' words per track."""
+    words = [{'term': u'wörd "%d"' % i, 'start': i * 0.25,
+              'end': i * 0.25 + 0.2, 'score': 0.5 + i % 5}
+             for i in range(count)]
+    return {
+        'name': 'spoken_words',
+        'status': 'ready',
+        'track_data': [
+            {'word_count': count, 'keywords': [{'term': 'x'}],
+             'words': words},
+            {'word_count': 0, 'words': []},
+            {'word_count': 2, 'words': [1e-5, 123456789]}
+        ],
+        '_links': {'self': {'href': INSIGHT_HREF}}
+    }
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJSONStream(unittest.TestCase):
+
+    def test_iter_items(self):
+        insight = make_spoken_words(50)
+        expected = insight['track_data'][0]['words'] + [1e-5,
+                                                                123456789]
+        data = json.dumps(insight, ensure_ascii=False,
+                          indent=1).encode('utf-8')
+        for size in (1, 2, 3, 7, 64, len(data)):
+            items = list(iter_items(chunked(data, size),
+                                    'track_data.item.words'))
+            self.assertEqual(items, expected)
+
+    def test_paths(self):
+        data = load_body('bundle_embedded.json').encode('utf-8')
+        document = json.loads(data.decode('utf-8'))
+        self.assertEqual(list(iter_items(chunked(data, 5), '')), [document])
+        self.assertEqual(list(iter_items(chunked(data, 5), 'version')), [1])
+        self.assertEqual(
+            list(iter_items(chunked(data, 5),
+                            '_embedded.clarify:tracks.tracks.item.id')),
+            [track['id'] for track in
+             document['_embedded']['clarify:tracks']['tracks']])
+        self.assertEqual(list(iter_items(chunked(data, 5), 'missing')), [])
+
+    def test_invalid(self):
+        for data, path in ((b'{"a": [1, 2', 'a'), (b'{"a" 1}', 'a'),
+                           (b'[1}', 'item')):
+            with self.assertRaises(ValueError):
+                list(iter_items(chunked(data, 2), path))
+
+    @httpretty.activate
+    def test_client_iter_insight_items(self):
+        insight = make_spoken_words(1000)
+        httpretty.register_uri('GET', host + INSIGHT_HREF,
+                               body=json.dumps(insight), status=200,
+                               content_type='application/json')
+        client = Client('my-api-key')
+        items = client.iter_insight_items(INSIGHT_HREF, chunk_size=512)
+        first = next(items)
+        self.assertEqual(first['term'], u'wörd "0"')
+        self.assertEqual(len(list(items)), 1001)
+
+        words = list(client.iter_insight_items(INSIGHT_HREF,
+                                               'track_data.item.word_count'))
+        self.assertEqual(words, [1000, 0, 2])
+
+    @httpretty.activate
+    def test_client_iter_insight_items_invalid(self):
+        httpretty.register_uri('GET', host + INSIGHT_HREF,
+                               body='{"track_data": [', status=200,
+                               content_type='application/json')
+        client = Client('my-api-key')
+        with self.assertRaises(APIDataException):
+            list(client.iter_insight_items(INSIGHT_HREF))
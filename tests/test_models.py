@@ -0,0 +1,92 @@
+import json
+import datetime
+import unittest
+import httpretty
+from clarify_python import models
+from clarify_python.clarify import Client
+from clarify_python.models import Bundle, Tracks, Metadata, \
+    make_insight, parse_datetime, UTC
+from . import load_body, register_uris
+
+
+class TestModels(unittest.TestCase):
+
+    def test_parse_datetime(self):
+        self.assertEqual(parse_datetime('2015-09-04T21:27:29.738Z'),
+                         datetime.datetime(2015, 9, 4, 21, 27, 29, 738000,
+                                           UTC))
+        self.assertEqual(parse_datetime('2015-09-04T21:27:29Z'),
+                         datetime.datetime(2015, 9, 4, 21, 27, 29, 0, UTC))
+        self.assertEqual(parse_datetime('2015-09-04T23:27:29+02:00'),
+                         datetime.datetime(2015, 9, 4, 21, 27, 29, 0, UTC))
+        self.assertIsNone(parse_datetime(None))
+        self.assertRaises(ValueError, parse_datetime, 'yesterday')
+
+    def test_bundle(self):
+        bundle = Bundle(json.loads(load_body('bundle_embedded.json')))
+        self.assertFalse(hasattr(bundle, '__dict__'))
+        self.assertEqual(bundle.version, 1)
+        self.assertEqual(bundle.name, 'Dorothy and Wizard of Oz Chapter 1')
+        self.assertEqual(bundle.href,
+                         '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f')
+        self.assertIs(bundle.created, bundle.created)
+        self.assertEqual(bundle.created.microsecond, 738000)
+        self.assertEqual(bundle.metadata.user_data['name'], bundle.name)
+        self.assertIs(bundle.tracks, bundle.tracks)
+        self.assertEqual(bundle.tracks.tracks[0].duration, 536.92)
+        self.assertIn('spoken_words',
+                      bundle.insights.get_insight_hrefs())
+        self.assertIsNone(Bundle(json.loads(load_body('bundle.json'))).tracks)
+
+    @httpretty.activate
+    def test_resources(self):
+        register_uris(httpretty)
+        client = Client('my-api-key', resources=True)
+        href = '/v1/bundles/33c5dbb7c01e4d0fb2e6fb5e1d6dbbd0/insights'
+        insights = models.Insights(client.get_insights(href))
+        expected = models.Insights(json.loads(load_body('insights.json')))
+        self.assertEqual(insights.get_insight_hrefs(),
+                         expected.get_insight_hrefs())
+        self.assertEqual(len(insights.get_insight_hrefs()), 3)
+        self.assertEqual(insights.href, expected.href)
+
+    def test_tracks(self):
+        tracks = Tracks(json.loads(load_body('tracks.json')))
+        self.assertEqual(len(tracks), 1)
+        track = list(tracks)[0]
+        self.assertEqual(track.index, 0)
+        self.assertEqual(track.media_size, 4296443)
+        self.assertIsInstance(track.duration, float)
+        self.assertEqual(track.updated.year, 2015)
+
+    def test_insights(self):
+        insight = make_insight(json.loads(
+            load_body('insight_classification.json')))
+        self.assertIsInstance(insight, models.ClassificationInsight)
+        self.assertTrue(insight.is_ready)
+        self.assertEqual(insight.get_spoken_languages(), ['en'])
+        pending = make_insight(json.loads(load_body('insight_pending.json')))
+        self.assertIsInstance(pending, models.TranscriptInsight)
+        self.assertFalse(pending.is_ready)
+        words = make_insight({'name': 'spoken_words',
+                              'track_data': [{'word_count': 12}]})
+        self.assertEqual(words.get_word_count(), 12)
+        self.assertIsNone(words.get_word_count(3))
+
+    def test_sort_parses_once(self):
+        metadata = [Metadata({'created': '2015-09-0%dT00:00:00Z' % day})
+                    for day in (3, 1, 2)]
+        calls = []
+        parse = models.parse_datetime
+
+        def counting_parse(value):
+            calls.append(value)
+            return parse(value)
+        models.parse_datetime = counting_parse
+        try:
+            for _ in range(3):
+                ordered = sorted(metadata, key=lambda m: m.created)
+        finally:
+            models.parse_datetime = parse
+        self.assertEqual([m.created.day for m in ordered], [1, 2, 3])
+        self.assertEqual(len(calls), 3)
@@ -0,0 +1,125 @@
+import gc
+import json
+import time
+import threading
+import unittest
+import httpretty
+from clarify_python.clarify import Client, APIException
+from clarify_python.retry import NO_RETRY_POLICY
+from clarify_python.multisearch import MultiSearch
+from .test_bulk import InFlight
+from . import host
+
+
+def register_search(pages=2, overlap=None):
+    """Serve search results: bundles named after the query and the page,
+    plus one bundle 'common' that every query returns. Each request waits
+    on 'overlap', a test_bulk.InFlight, if given."""
+    def callback(request, uri, response_headers):
+        if overlap is not None:
+            overlap.wait()
+        query = request.querystring.get('query', ['next'])[0]
+        if query == 'fail':
+            return [500, response_headers, '{}']
+        if 'page' in request.querystring:
+            query, number = request.querystring['page'][0].split('-')
+            number = int(number)
+        else:
+            query += request.querystring.get('language', [''])[0]
+            number = 0
+        hrefs = ['/v1/bundles/%s%d' % (query, number), '/v1/bundles/common']
+        body = {'_links': {'items': [{'href': href} for href in hrefs]}}
+        if 'items' in request.querystring.get('embed', [''])[0]:
+            body['_embedded'] = {'items': [{'_links': {'self': {'href': href}}}
+                                           for href in hrefs]}
+        if number + 1 < pages:
+            body['_links']['next'] = {
+                'href': '/v1/search?page=%s-%d' % (query, number + 1)}
+        return [200, response_headers, json.dumps(body)]
+    httpretty.register_uri('GET', host + '/v1/search', body=callback,
+                           content_type='application/json')
+
+
+class TestMultiSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client('my-api-key')
+
+    @httpretty.activate
+    def test_merge(self):
+        register_search()
+        with self.client.multi_search(
+                ['wizard', {'query': 'musique', 'language': 'fr'}]) as results:
+            hrefs = list(results)
+        self.assertEqual(sorted(hrefs), [
+            '/v1/bundles/common', '/v1/bundles/musiquefr0',
+            '/v1/bundles/musiquefr1', '/v1/bundles/wizard0',
+            '/v1/bundles/wizard1'])
+        self.assertEqual(sorted(results.provenance['/v1/bundles/common']),
+                         [0, 1])
+        self.assertEqual(results.get_queries('/v1/bundles/musiquefr1'),
+                         [{'query': 'musique', 'language': 'fr'}])
+
+    @httpretty.activate
+    def test_embedded(self):
+        register_search(pages=1)
+        bundles = list(self.client.multi_search(['a', 'b', 'c'],
+                                                embed_items=True))
+        self.assertEqual(len(bundles), 4)
+        self.assertTrue(all('_links' in bundle for bundle in bundles))
+
+    @httpretty.activate
+    def test_concurrent(self):
+        overlap = InFlight(4)
+        register_search(pages=1, overlap=overlap)
+        hrefs = list(self.client.multi_search(['a', 'b', 'c', 'd'],
+                                              max_workers=4))
+        self.assertEqual(len(hrefs), 5)
+        # The four queries were in flight at once.
+        self.assertEqual(overlap.max_in_flight, 4)
+
+    @httpretty.activate
+    def test_failure(self):
+        register_search()
+        client = Client('my-api-key', retry_policy=NO_RETRY_POLICY)
+        results = client.multi_search(['wizard', 'fail'], max_workers=1)
+        self.assertRaises(APIException, list, results)
+
+
+class EndlessClient(object):
+    """A client whose searches have endless pages."""
+
+    def iter_search_pages(self, prefetch=0, query=None, **kwargs):
+        number = 0
+        while True:
+            number += 1
+            yield {'_links': {'items': [
+                {'href': '/v1/bundles/%s%d' % (query, number)}]}}
+
+
+def search_threads():
+    return [thread for thread in threading.enumerate()
+            if thread.name == 'clarify-multisearch']
+
+
+class TestMultiSearchThreads(unittest.TestCase):
+
+    def wait_for_no_threads(self):
+        deadline = time.time() + 5
+        while search_threads() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(search_threads(), [])
+
+    def test_dropped(self):
+        results = MultiSearch(EndlessClient(), ['a', 'b'], max_workers=2)
+        next(results)
+        self.assertTrue(all(thread.daemon for thread in search_threads()))
+        del results
+        gc.collect()
+        self.wait_for_no_threads()
+
+    def test_break(self):
+        for href in MultiSearch(EndlessClient(), ['a', 'b']):
+            break
+        gc.collect()
+        self.wait_for_no_threads()
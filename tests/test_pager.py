@@ -0,0 +1,228 @@
+import json
+import time
+import threading
+import unittest
+import httpretty
+from clarify_python.clarify import Client, APIException
+from clarify_python.pager import PagePrefetcher, AdaptivePageSizer
+from . import host
+
+
+def make_page(number, pages, size=3, embed=False):
+    """Returns page 'number' of a bundle collection of 'pages' pages."""
+    hrefs = ['/v1/bundles/b%d_%d' % (number, i) for i in range(size)]
+    page = {
+        '_links': {
+            'self': {'href': '/v1/bundles?page=%d' % number},
+            'items': [{'href': href} for href in hrefs]
+        }
+    }
+    if number + 1 < pages:
+        page['_links']['next'] = {'href': '/v1/bundles?page=%d' % (number + 1)}
+    if embed:
+        page['_embedded'] = {'items': [{'_links': {'self': {'href': href}}}
+                                       for href in hrefs]}
+    return page
+
+
+def register_pages(pages):
+    """Serve a bundle collection of 'pages' pages, and the same as search
+    results."""
+    def callback(request, uri, response_headers):
+        number = int(request.querystring.get('page', ['0'])[0])
+        embed = 'items' in request.querystring.get('embed', [''])[0]
+        body = make_page(number, pages, embed=embed)
+        return [200, response_headers, json.dumps(body)]
+    for path in ('/v1/bundles', '/v1/search'):
+        httpretty.register_uri('GET', host + path, body=callback,
+                               content_type='application/json')
+
+
+class FakeCollection(object):
+    """fetch_page() for PagePrefetcher over 'pages' pages."""
+
+    def __init__(self, pages, fail_at=None):
+        self.pages = pages
+        self.fail_at = fail_at
+        self.fetched = []
+        # Set when the fetch of each page starts.
+        self.started = [threading.Event() for _ in range(pages)]
+        self.lock = threading.Lock()
+
+    def fetch_page(self, href):
+        number = 0 if href is None else int(href.split('=')[1])
+        self.started[number].set()
+        if number == self.fail_at:
+            raise APIException(500, b'{}')
+        with self.lock:
+            self.fetched.append(number)
+        return make_page(number, self.pages)
+
+
+class TestPagePrefetcher(unittest.TestCase):
+
+    def test_pages_in_order(self):
+        for depth in (0, 1, 3):
+            collection = FakeCollection(5)
+            pages = list(PagePrefetcher(collection.fetch_page, depth=depth))
+            self.assertEqual([page['_links']['self']['href'] for page in pages],
+                             ['/v1/bundles?page=%d' % i for i in range(5)])
+
+    def test_depth_is_bounded(self):
+        collection = FakeCollection(20)
+        with PagePrefetcher(collection.fetch_page, depth=2) as pages:
+            next(pages)
+            time.sleep(0.2)
+            # One page consumed, two queued and one waiting to be queued.
+            self.assertLessEqual(len(collection.fetched), 4)
+        time.sleep(0.2)
+        self.assertLessEqual(len(collection.fetched), 4)
+
+    def test_exception(self):
+        collection = FakeCollection(5, fail_at=2)
+        pages = PagePrefetcher(collection.fetch_page, depth=2)
+        self.assertEqual(len([next(pages), next(pages)]), 2)
+        self.assertRaises(APIException, next, pages)
+        self.assertRaises(StopIteration, next, pages)
+
+    def test_overlap(self):
+        collection = FakeCollection(6)
+        pages = PagePrefetcher(collection.fetch_page, depth=2)
+        for number, page in enumerate(pages):
+            if number + 1 < 6:
+                # The next page is fetched while this one is processed.
+                self.assertTrue(collection.started[number + 1].wait(5))
+
+        # Without prefetching, the next page is only fetched on next().
+        collection = FakeCollection(2)
+        pages = PagePrefetcher(collection.fetch_page, depth=0)
+        next(pages)
+        self.assertFalse(collection.started[1].is_set())
+        next(pages)
+        self.assertTrue(collection.started[1].is_set())
+
+
+class TestClientIterators(unittest.TestCase):
+
+    @httpretty.activate
+    def test_iter_bundles(self):
+        register_pages(4)
+        client = Client('my-api-key')
+        hrefs = list(client.iter_bundles())
+        self.assertEqual(len(hrefs), 12)
+        self.assertEqual(hrefs[0], '/v1/bundles/b0_0')
+        self.assertEqual(hrefs[-1], '/v1/bundles/b3_2')
+
+        bundles = list(client.iter_bundles(embed_items=True, prefetch=0))
+        self.assertEqual(bundles[4]['_links']['self']['href'],
+                         '/v1/bundles/b1_1')
+
+    @httpretty.activate
+    def test_iter_search(self):
+        register_pages(2)
+        client = Client('my-api-key')
+        hrefs = list(client.iter_search(query='wizard'))
+        self.assertEqual(len(hrefs), 6)
+        self.assertEqual(httpretty.latest_requests()[0].querystring['query'],
+                         ['wizard'])
+
+    @httpretty.activate
+    def test_bundle_list_map_embedded(self):
+        register_pages(3)
+        client = Client('my-api-key')
+        bundles = []
+        client.bundle_list_map(lambda client, bundle: bundles.append(bundle),
+                               embed_items=True, embed_tracks=True)
+        self.assertEqual(len(bundles), 9)
+        self.assertEqual(bundles[0]['_links']['self']['href'],
+                         '/v1/bundles/b0_0')
+        paths = set(request.path for request in httpretty.latest_requests())
+        self.assertEqual(len(paths), 3)
+        self.assertTrue(all(path.startswith('/v1/bundles?')
+                            for path in paths))
+        self.assertEqual(httpretty.last_request().querystring['embed'],
+                         ['items,tracks'])
+
+        report = client.bundle_list_map_concurrent(
+            lambda client, bundle: bundle['_links']['self']['href'],
+            embed_items=True, preserve_order=True)
+        self.assertEqual(report.results[-1].result, '/v1/bundles/b2_2')
+
+
+class TestAdaptivePageSizer(unittest.TestCase):
+
+    def test_grows_while_faster(self):
+        sizer = AdaptivePageSizer(initial_limit=10, factor=2)
+        sizer.record(10, 10, 1.0, 1000)
+        self.assertEqual(sizer.get_limit(), 20)
+        sizer.record(20, 20, 1.0, 2000)
+        self.assertEqual(sizer.get_limit(), 40)
+        # Slower: turn around.
+        sizer.record(40, 40, 4.0, 4000)
+        self.assertEqual(sizer.get_limit(), 20)
+
+    def test_bounds(self):
+        sizer = AdaptivePageSizer(initial_limit=80, max_limit=100, factor=2)
+        sizer.record(80, 80, 1.0, 80)
+        self.assertEqual(sizer.get_limit(), 100)
+
+        # 1000 bytes per item, at most 5000 bytes per page.
+        sizer = AdaptivePageSizer(initial_limit=4, max_page_bytes=5000,
+                                  factor=2)
+        sizer.record(4, 4, 1.0, 4000)
+        self.assertEqual(sizer.get_limit(), 5)
+
+    def test_short_page_is_ignored(self):
+        sizer = AdaptivePageSizer(initial_limit=10)
+        sizer.record(10, 3, 1.0, 300)
+        self.assertEqual(sizer.get_limit(), 10)
+
+    def test_stats(self):
+        sizer = AdaptivePageSizer(initial_limit=10, factor=2)
+        self.assertEqual(sizer.get_stats()['pages'], 0)
+        sizer.record(10, 10, 0.5, 1000)
+        sizer.record(20, 20, 0.5, 2000)
+        stats = sizer.get_stats()
+        self.assertEqual(stats['pages'], 2)
+        self.assertEqual(stats['items'], 30)
+        self.assertEqual(stats['items_per_second'], 30)
+        self.assertEqual(stats['bytes_per_item'], 100)
+        self.assertEqual(stats['limits'], {10: 1, 20: 1})
+        self.assertEqual(stats['limit'], 40)
+
+    @httpretty.activate
+    def test_client_iterators(self):
+        def callback(request, uri, response_headers):
+            limit = int(request.querystring['limit'][0])
+            offset = int(request.querystring.get('offset', ['0'])[0])
+            hrefs = ['/v1/bundles/b%d' % i
+                     for i in range(offset, min(offset + limit, 50))]
+            body = {'_links': {'items': [{'href': href} for href in hrefs]}}
+            if offset + limit < 50:
+                body['_links']['next'] = {
+                    'href': '/v1/bundles?offset=%d' % (offset + limit)}
+            return [200, response_headers, json.dumps(body)]
+        for path in ('/v1/bundles', '/v1/search'):
+            httpretty.register_uri('GET', host + path, body=callback,
+                                   content_type='application/json')
+
+        client = Client('my-api-key')
+        sizer = AdaptivePageSizer(initial_limit=5, max_limit=20)
+        hrefs = list(client.iter_bundles(page_sizer=sizer))
+        self.assertEqual(hrefs, ['/v1/bundles/b%d' % i for i in range(50)])
+        stats = sizer.get_stats()
+        self.assertEqual(stats['items'], 50)
+        self.assertEqual(sum(stats['limits'].values()), stats['pages'])
+        self.assertTrue(all(5 <= limit <= 20 for limit in stats['limits']))
+
+        sizer = AdaptivePageSizer(initial_limit=5, max_limit=20)
+        self.assertEqual(len(list(client.iter_search(query='wizard',
+                                                     page_sizer=sizer))), 50)
+        self.assertEqual(sizer.get_stats()['items'], 50)
+
+        sizer = AdaptivePageSizer(initial_limit=5, max_limit=20)
+        hrefs = []
+        client.bundle_list_map(lambda client, href: hrefs.append(href),
+                               page_sizer=sizer)
+        self.assertEqual(len(hrefs), 50)
+        self.assertEqual(sizer.get_stats()['items'], 50)
@@ -0,0 +1,119 @@
+import re
+import json
+import datetime
+import unittest
+import httpretty
+from clarify_python.clarify import Client
+from clarify_python.models import UTC
+from clarify_python.purge import BundleFilter
+from . import host
+
+
+def make_bundle(number, name, created='2015-09-04T21:27:29.738Z',
+                external_id=None, user_data=None):
+    href = '/v1/bundles/b%d' % number
+    bundle = {'name': name, 'created': created, 'updated': created,
+              'external_id': external_id, '_links': {'self': {'href': href}}}
+    if user_data is not None:
+        bundle['_embedded'] = {'clarify:metadata': {'data': user_data}}
+    return bundle
+
+
+BUNDLES = [
+    make_bundle(0, 'test_one', external_id='x0', user_data={'env': 'test'}),
+    make_bundle(1, 'prod_one', created='2016-02-01T00:00:00Z',
+                user_data={'env': 'prod'}),
+    make_bundle(2, 'test_two', created='2016-03-01T00:00:00Z',
+                external_id='x2', user_data={}),
+    make_bundle(3, 'test_three', created='2016-04-01T00:00:00+02:00',
+                user_data={'env': 'test', 'tag': 'a'}),
+]
+
+
+class TestBundleFilter(unittest.TestCase):
+
+    def matching(self, bundle_filter):
+        return [bundle['name'] for bundle in BUNDLES if bundle_filter(bundle)]
+
+    def test_name(self):
+        self.assertEqual(self.matching(BundleFilter(name='test_*')),
+                         ['test_one', 'test_two', 'test_three'])
+        self.assertEqual(self.matching(BundleFilter(name=re.compile('.*one'))),
+                         ['test_one', 'prod_one'])
+        self.assertEqual(self.matching(BundleFilter(name='test')), [])
+
+    def test_external_id(self):
+        self.assertEqual(self.matching(BundleFilter(external_id='x2')),
+                         ['test_two'])
+        self.assertEqual(self.matching(BundleFilter(external_id=['x0', 'x2'])),
+                         ['test_one', 'test_two'])
+
+    def test_dates(self):
+        bundle_filter = BundleFilter(created_after='2016-02-01T00:00:00Z',
+                                     created_before='2016-03-31T23:00:00Z')
+        self.assertEqual(self.matching(bundle_filter),
+                         ['prod_one', 'test_two', 'test_three'])
+        bundle_filter = BundleFilter(
+            updated_before=datetime.datetime(2016, 1, 1, tzinfo=UTC))
+        self.assertEqual(self.matching(bundle_filter), ['test_one'])
+
+    def test_metadata(self):
+        bundle_filter = BundleFilter(name='test_*', metadata={'env': 'test'})
+        self.assertTrue(bundle_filter.needs_metadata)
+        self.assertFalse(BundleFilter(name='test_*').needs_metadata)
+        self.assertEqual(self.matching(bundle_filter),
+                         ['test_one', 'test_three'])
+
+
+class TestPurgeBundles(unittest.TestCase):
+
+    def register(self):
+        """Serve BUNDLES as one embedded page, recording the deletes."""
+        self.deleted = []
+
+        def list_callback(request, uri, response_headers):
+            page = {'_links': {'items': [bundle['_links']['self']
+                                         for bundle in BUNDLES]},
+                    '_embedded': {'items': BUNDLES}}
+            return [200, response_headers, json.dumps(page)]
+
+        def delete_callback(request, uri, response_headers):
+            self.deleted.append(request.path)
+            return [204, response_headers, '']
+
+        httpretty.register_uri('GET', host + '/v1/bundles',
+                               body=list_callback,
+                               content_type='application/json')
+        httpretty.register_uri('DELETE',
+                               re.compile(host + r'/v1/bundles/(\w+)$'),
+                               body=delete_callback)
+
+    @httpretty.activate
+    def test_purge(self):
+        self.register()
+        client = Client('my-api-key')
+        report = client.purge_bundles(BundleFilter(metadata={'env': 'test'}),
+                                      max_workers=2)
+        self.assertEqual(sorted(self.deleted),
+                         ['/v1/bundles/b0', '/v1/bundles/b3'])
+        summary = report.get_summary()
+        self.assertEqual(summary['scanned'], 4)
+        self.assertEqual(summary['matched'], 2)
+        self.assertEqual(summary['deleted'], 2)
+        self.assertEqual(summary['failed'], 0)
+        self.assertEqual(httpretty.latest_requests()[0].querystring['embed'],
+                         ['items,metadata'])
+
+    @httpretty.activate
+    def test_dry_run(self):
+        self.register()
+        client = Client('my-api-key')
+        report = client.purge_bundles(BundleFilter(name='test_*'),
+                                      dry_run=True)
+        self.assertEqual(self.deleted, [])
+        self.assertEqual(sorted(result.item for result in report),
+                         ['/v1/bundles/b0', '/v1/bundles/b2',
+                          '/v1/bundles/b3'])
+        summary = report.get_summary()
+        self.assertEqual((summary['matched'], summary['deleted']), (3, 0))
+        self.assertTrue(summary['dry_run'])
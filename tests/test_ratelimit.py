@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+import httpretty
+from clarify_python.clarify import Client
+from clarify_python.ratelimit import TokenBucket, FileTokenBucket, \
+    RateLimiter, get_endpoint_class, fcntl
+from . import register_uris
+
+
+class TestRateLimit(unittest.TestCase):
+
+    def test_endpoint_class(self):
+        self.assertEqual(get_endpoint_class('/v1/search?query=x'), 'search')
+        self.assertEqual(get_endpoint_class('/v1/bundles'), 'bundles')
+        self.assertEqual(get_endpoint_class('/v1/bundles/abc/tracks'),
+                         'bundles')
+        self.assertEqual(get_endpoint_class('/v1/bundles/abc/insights/def'),
+                         'insights')
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(10, burst=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, places=2)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, places=2)
+
+    @unittest.skipIf(fcntl is None, 'fcntl is not available')
+    def test_file_token_bucket_is_shared(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'bucket')
+            first = FileTokenBucket(path, 10, burst=1)
+            second = FileTokenBucket(path, 10, burst=1)
+            self.assertEqual(first.reserve(), 0)
+            self.assertAlmostEqual(second.reserve(), 0.1, places=2)
+            self.assertAlmostEqual(first.reserve(), 0.2, places=2)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_endpoint_rates(self):
+        limiter = RateLimiter(None, endpoint_rates={'search': (1, 1)})
+        self.assertIsNone(limiter.get_bucket('/v1/bundles'))
+        self.assertEqual(limiter.reserve('/v1/bundles'), 0)
+        self.assertEqual(limiter.reserve('/v1/search'), 0)
+        self.assertGreater(limiter.reserve('/v1/search'), 0.9)
+
+    @httpretty.activate
+    def test_client_uses_limiter(self):
+        register_uris(httpretty)
+        paths = []
+
+        class RecordingLimiter(object):
+            def acquire(self, path):
+                paths.append(path)
+
+        client = Client('my-api-key', rate_limiter=RecordingLimiter())
+        client.get_bundle_list()
+        client.get_bundle('/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f')
+        self.assertEqual(paths, ['/v1/bundles',
+                                 '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f'])
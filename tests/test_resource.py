@@ -0,0 +1,72 @@
+import json
+import unittest
+import httpretty
+from clarify_python.clarify import Client
+from clarify_python.helper import get_link_href, get_embedded, \
+    get_item_hrefs
+from clarify_python.resource import Resource, ResourceList, wrap
+from . import register_uris, load_body
+
+BUNDLE_HREF = '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f'
+
+
+class TestResource(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client('my-api-key', resources=True)
+
+    def test_wrap(self):
+        data = json.loads(load_body('bundle_embedded.json'))
+        bundle = wrap(data)
+        self.assertIsInstance(bundle, Resource)
+        self.assertFalse(hasattr(bundle, '__dict__'))
+        self.assertEqual(bundle.name, data['name'])
+        self.assertEqual(bundle['version'], 1)
+        self.assertIsNone(bundle._children)
+        self.assertEqual(bundle, data)
+        self.assertIs(bundle.to_dict(), data)
+        tracks = bundle.embedded['clarify:tracks']
+        self.assertIs(tracks, bundle.embedded['clarify:tracks'])
+        self.assertIsInstance(tracks.tracks, ResourceList)
+        self.assertEqual(tracks.tracks[0].track, 0)
+        self.assertEqual(bundle.links.href('clarify:metadata'),
+                         BUNDLE_HREF + '/metadata')
+        self.assertEqual(bundle.links.hrefs('nope'), [])
+        self.assertRaises(AttributeError, getattr, bundle, 'nope')
+
+    def test_helpers(self):
+        data = json.loads(load_body('bundle_embedded.json'))
+        bundle = wrap(data)
+        self.assertEqual(get_link_href(bundle, 'self'), BUNDLE_HREF)
+        self.assertEqual(get_embedded(bundle, 'clarify:metadata'),
+                         data['_embedded']['clarify:metadata'])
+        bundles = wrap(json.loads(load_body('bundles_1.json')))
+        self.assertEqual(get_item_hrefs(bundles),
+                         bundles.links.hrefs('items'))
+
+    @httpretty.activate
+    def test_follow(self):
+        register_uris(httpretty)
+        bundle = self.client.get_bundle(BUNDLE_HREF, embed_tracks=True)
+        self.assertIsInstance(bundle, Resource)
+        requests = len(httpretty.latest_requests())
+        tracks = bundle.follow('clarify:tracks')
+        self.assertEqual(len(httpretty.latest_requests()), requests)
+        self.assertEqual(tracks.bundle_id, bundle.id)
+
+        bundle = self.client.get_bundle(BUNDLE_HREF)
+        metadata = bundle.follow('clarify:metadata')
+        self.assertEqual(httpretty.last_request().path,
+                         BUNDLE_HREF + '/metadata')
+        self.assertEqual(metadata.links.href('parent'), BUNDLE_HREF)
+        self.assertRaises(KeyError, bundle.follow, 'nope')
+
+    @httpretty.activate
+    def test_follow_items(self):
+        register_uris(httpretty)
+        bundles = self.client.get_bundle_list()
+        items = bundles.follow('items')
+        self.assertEqual(len(items), len(get_item_hrefs(bundles)))
+        self.assertTrue(all(isinstance(item, Resource) for item in items))
+        self.assertEqual(httpretty.last_request().path,
+                         get_item_hrefs(bundles)[-1])
@@ -0,0 +1,96 @@
+import time
+import unittest
+import httpretty
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+from clarify_python.clarify import Client, APIException
+from clarify_python.retry import RetryPolicy, parse_retry_after
+from . import host, load_body
+
+
+BUNDLE_HREF = '/v1/bundles/bd9f12f93d3a4f63a89b4d249427d55f'
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_methods(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable_method('GET'))
+        self.assertTrue(policy.is_retryable_method('DELETE'))
+        self.assertFalse(policy.is_retryable_method('POST'))
+        self.assertTrue(RetryPolicy(retry_post=True).is_retryable_method('POST'))
+
+    def test_backoff_is_bounded(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5)
+        for retry_number in range(10):
+            delay = policy.get_backoff(retry_number)
+            self.assertTrue(0 <= delay <= min(5, 2 ** retry_number))
+
+    def test_max_retries(self):
+        policy = RetryPolicy(max_retries=2, backoff_factor=0)
+        started = time.time()
+        self.assertEqual(policy.get_delay(1, started), 0)
+        self.assertIsNone(policy.get_delay(2, started))
+
+    def test_budget(self):
+        policy = RetryPolicy(budget=10)
+        headers = {'Retry-After': '5'}
+        self.assertEqual(policy.get_delay(0, time.time(), headers), 5)
+        self.assertIsNone(policy.get_delay(0, time.time() - 6, headers))
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('120'), 120)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+
+
+class TestClientRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client('my-api-key')
+
+    @httpretty.activate
+    @mock.patch('time.sleep')
+    def test_retries_get(self, sleep):
+        httpretty.register_uri(
+            'GET', host + BUNDLE_HREF,
+            responses=[
+                httpretty.Response(body='{}', status=503),
+                httpretty.Response(body='{}', status=429,
+                                   adding_headers={'Retry-After': '7'}),
+                httpretty.Response(body=load_body('bundle.json'), status=200)
+            ])
+        result = self.client.get_bundle(BUNDLE_HREF)
+        self.assertEqual(result['id'], 'bd9f12f93d3a4f63a89b4d249427d55f')
+        self.assertEqual(self.client.get_last_status(), 200)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(sleep.call_args_list[1], mock.call(7))
+
+    @httpretty.activate
+    @mock.patch('time.sleep')
+    def test_gives_up(self, sleep):
+        httpretty.register_uri('GET', host + BUNDLE_HREF, body='{}',
+                               status=503)
+        self.client.retry_policy = RetryPolicy(max_retries=2)
+        with self.assertRaises(APIException):
+            self.client.get_bundle(BUNDLE_HREF)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(self.client.get_last_status(), 503)
+
+    @httpretty.activate
+    @mock.patch('time.sleep')
+    def test_post_not_retried(self, sleep):
+        calls = []
+
+        def callback(request, uri, headers):
+            calls.append(uri)
+            return 503, headers, '{}'
+
+        httpretty.register_uri('POST', host + '/v1/bundles', body=callback)
+        with self.assertRaises(APIException):
+            self.client.create_bundle(name='test')
+        self.assertEqual(sleep.call_count, 0)
+        self.assertEqual(len(calls), 1)
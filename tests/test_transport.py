@@ -0,0 +1,161 @@
+import gzip
+import json
+import unittest
+import threading
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+from clarify_python.clarify import Client, APIException
+from clarify_python.retry import RetryPolicy
+from clarify_python.transport import HTTPClientTransport, Urllib3Transport
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Answers with the request it got, as JSON."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path.endswith('/drop'):
+            # Close the connection without answering.
+            self.server.requests.append(self.path)
+            self.close_connection = True
+            return
+        if self.path.endswith('/missing'):
+            self._reply(404, b'{"message": "missing"}')
+            return
+        body = json.dumps({'method': 'GET', 'path': self.path,
+                           'port': self.client_address[1]}).encode()
+        if self.path.endswith('/gzip'):
+            self._reply(200, gzip.compress(body), {'Content-Encoding': 'gzip'})
+        else:
+            self._reply(200, body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if self.path.endswith('/drop'):
+            self.rfile.read(length)
+            self.server.requests.append(self.path)
+            self.close_connection = True
+            return
+        body = json.dumps({'method': 'POST', 'path': self.path,
+                           'body': self.rfile.read(length).decode()})
+        self._reply(201, body.encode())
+
+    def _reply(self, status, body, headers=None):
+        self.server.requests.append(self.path)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.server = _Server(('127.0.0.1', 0), _Handler)
+        self.server.requests = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:%d/api' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_http_client_request(self):
+        transport = HTTPClientTransport(self.base_url)
+        response = transport.request('GET', '/v1/bundles', {'limit': 2})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.headers.get('content-type'),
+                         'application/json')
+        self.assertEqual(json.loads(response.data.decode())['path'],
+                         '/api/v1/bundles?limit=2')
+        transport.close()
+
+    def test_http_client_keep_alive(self):
+        transport = HTTPClientTransport(self.base_url)
+        first = json.loads(transport.request('GET', '/a').data.decode())
+        second = json.loads(transport.request('GET', '/b').data.decode())
+        self.assertEqual(first['port'], second['port'])
+        transport.close()
+
+    def test_http_client_gzip(self):
+        transport = HTTPClientTransport(self.base_url)
+        response = transport.request('GET', '/gzip')
+        self.assertTrue(response.compressed)
+        self.assertEqual(json.loads(response.data.decode())['path'],
+                         '/api/gzip')
+        self.assertLess(response.wire_bytes, len(response.data) + 20)
+        transport.close()
+
+    def test_http_client_stream(self):
+        transport = HTTPClientTransport(self.base_url)
+        response = transport.request('GET', '/data', stream=True)
+        self.assertIsNone(response.data)
+        content = b''.join(response.stream(4))
+        self.assertEqual(json.loads(content.decode())['path'], '/api/data')
+        self.assertEqual(response.wire_bytes, len(content))
+        transport.close()
+
+    def test_http_client_resends_idempotent_only(self):
+        transport = HTTPClientTransport(self.base_url)
+        # The connection kept alive by the first request is dropped by
+        # the second, which is only resent on a new one if idempotent.
+        transport.request('GET', '/a')
+        self.assertRaises(HTTPClientTransport.connection_errors,
+                          transport.request, 'GET', '/drop')
+        self.assertEqual(self.server.requests[1:], ['/api/drop'] * 2)
+        transport.request('GET', '/b')
+        del self.server.requests[:]
+        self.assertRaises(HTTPClientTransport.connection_errors,
+                          transport.request, 'POST', '/drop',
+                          {'name': 'test'}, encode_body=True)
+        self.assertEqual(self.server.requests, ['/api/drop'])
+        transport.close()
+
+    def test_client_with_transports(self):
+        for transport in (HTTPClientTransport(self.base_url),
+                          Urllib3Transport(self.base_url)):
+            client = Client('my-api-key', transport=transport)
+            result = client.post('/v1/bundles', {'name': 'test'})
+            self.assertEqual(result.status, 201)
+            self.assertEqual(json.loads(result.json)['body'], 'name=test')
+            data = b''.join(client.get_data('/v1/data', stream=True))
+            self.assertEqual(json.loads(data.decode())['path'],
+                             '/api/v1/data')
+            with self.assertRaises(APIException) as context:
+                client.get_data('/v1/missing')
+            self.assertEqual(context.exception.get_http_response(), 404)
+            transport.close()
+
+    def test_urllib3_no_retries(self):
+        # Only the client's RetryPolicy retries, not urllib3.
+        transport = Urllib3Transport(self.base_url)
+        client = Client('my-api-key', transport=transport,
+                        retry_policy=RetryPolicy(max_retries=1,
+                                                 backoff_factor=0))
+        with self.assertRaises(Urllib3Transport.connection_errors):
+            client.get('/v1/drop')
+        self.assertEqual(self.server.requests, ['/api/v1/drop'] * 2)
+        transport.close()
+
+    def test_client_base_url(self):
+        client = Client('my-api-key', base_url=self.base_url)
+        self.assertEqual(client.transport.base_url, self.base_url)
+        result = client.get('/v1/bundles')
+        self.assertEqual(json.loads(result.json)['path'], '/api/v1/bundles')
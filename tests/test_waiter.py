@@ -0,0 +1,142 @@
+import time
+import threading
+import unittest
+from clarify_python.clarify import APIException
+from clarify_python.ratelimit import TokenBucket
+from clarify_python.waiter import InsightWaiter, STATUS_READY, \
+    STATUS_FAILED, STATUS_TIMEOUT, STATUS_ERROR
+
+
+class FakeClient(object):
+    """Bundles b<i> whose keywords insight shows up after 'linked_after'
+    polls of the insights and is ready after 'ready_after' polls of the
+    insight, or from the time 'ready_at'."""
+
+    def __init__(self, ready_after, linked_after=None, statuses=None,
+                 ready_at=None):
+        self.ready_after = ready_after
+        self.ready_at = ready_at or {}
+        self.linked_after = linked_after or {}
+        self.statuses = statuses or {}
+        self.polls = {}
+        self.times = []
+        self.lock = threading.Lock()
+
+    def _count(self, href):
+        with self.lock:
+            self.times.append(time.time())
+            self.polls[href] = self.polls.get(href, 0) + 1
+            return self.polls[href]
+
+    def get_bundle(self, href):
+        self._count(href)
+        return {'_links': {'clarify:insights': {'href': href + '/insights'}}}
+
+    def _get_model(self, href, use_cache=True):
+        assert not use_cache
+        count = self._count(href)
+        bid = href.split('/')[3]
+        if href.endswith('/insights'):
+            links = {}
+            if count > self.linked_after.get(bid, 0):
+                links['insight:spoken_keywords'] = {
+                    'href': href + '/keywords'}
+            return {'_links': links}
+        if bid in self.statuses:
+            status = self.statuses[bid]
+            if isinstance(status, Exception):
+                raise status
+        elif bid in self.ready_at:
+            status = 'ready' if time.time() >= self.ready_at[bid] else \
+                'processing'
+        elif count > self.ready_after[bid]:
+            status = 'ready'
+        else:
+            status = 'processing'
+        return {'status': status, 'name': 'spoken_keywords'}
+
+
+def waiter(client, hrefs, **kwargs):
+    kwargs.setdefault('initial_delay', 0.01)
+    kwargs.setdefault('max_delay', 0.04)
+    return InsightWaiter(client, [(href, 'spoken_keywords')
+                                  for href in hrefs], **kwargs)
+
+
+class TestInsightWaiter(unittest.TestCase):
+
+    def test_completion_order(self):
+        client = FakeClient({'b0': 6, 'b1': 0, 'b2': 2},
+                            linked_after={'b2': 1})
+        hrefs = ['/v1/bundles/b0', '/v1/bundles/b1', '/v1/bundles/b2']
+        results = list(waiter(client, hrefs, max_rate=1000))
+        self.assertEqual([result.bundle for result in results],
+                         ['/v1/bundles/b1', '/v1/bundles/b2',
+                          '/v1/bundles/b0'])
+        self.assertTrue(all(result.status == STATUS_READY
+                            for result in results))
+        self.assertEqual(results[0].insight['status'], 'ready')
+        self.assertEqual(results[0].insight_rel, 'insight:spoken_keywords')
+        # The bundle and insights are fetched once per target.
+        self.assertEqual(client.polls['/v1/bundles/b0'], 1)
+        self.assertEqual(client.polls['/v1/bundles/b0/insights'], 1)
+        self.assertEqual(client.polls['/v1/bundles/b0/insights/keywords'], 7)
+
+    def test_backoff(self):
+        client = FakeClient({'b0': 5})
+        started = time.time()
+        list(waiter(client, ['/v1/bundles/b0'], max_rate=1000,
+                    initial_delay=0.02, max_delay=0.08))
+        # Delays of at least 0.01, 0.02, 0.04, 0.04 and 0.04 seconds.
+        self.assertGreaterEqual(time.time() - started, 0.15)
+
+    def test_rate_cap(self):
+        client = FakeClient(dict(('b%d' % i, 1) for i in range(10)))
+        hrefs = ['/v1/bundles/b%d' % i for i in range(10)]
+        results = list(waiter(client, hrefs, max_workers=10,
+                              initial_delay=0, max_delay=0,
+                              bucket=TokenBucket(200, burst=1)))
+        self.assertEqual(len(results), 10)
+        # 40 requests at 200 per second.
+        self.assertEqual(len(client.times), 40)
+        self.assertGreaterEqual(client.times[-1] - client.times[0], 0.15)
+
+    def test_failed_timeout_error(self):
+        client = FakeClient({'b0': 100},
+                            statuses={'b1': 'failed',
+                                      'b2': APIException(404, b'{}'),
+                                      'b3': APIException(503, b'{}')})
+        hrefs = ['/v1/bundles/b%d' % i for i in range(4)]
+        results = dict((result.bundle, result)
+                       for result in waiter(client, hrefs, timeout=0.2,
+                                            max_rate=1000))
+        self.assertEqual(results['/v1/bundles/b0'].status, STATUS_TIMEOUT)
+        self.assertEqual(results['/v1/bundles/b1'].status, STATUS_FAILED)
+        self.assertEqual(results['/v1/bundles/b2'].status, STATUS_ERROR)
+        self.assertEqual(
+            results['/v1/bundles/b2'].exception.get_http_response(), 404)
+        # 5xx is transient: polled until the timeout.
+        self.assertEqual(results['/v1/bundles/b3'].status, STATUS_TIMEOUT)
+        self.assertGreater(client.polls['/v1/bundles/b3/insights/keywords'],
+                           1)
+
+    def test_ready_before_deadline(self):
+        # The delay after the first poll runs past the deadline: the
+        # insight is polled again at the deadline rather than given up.
+        client = FakeClient({}, ready_at={'b0': time.time() + 0.1})
+        results = list(waiter(client, ['/v1/bundles/b0'], timeout=0.3,
+                              initial_delay=1, max_delay=1,
+                              max_rate=1000))
+        self.assertEqual(results[0].status, STATUS_READY)
+        self.assertEqual(client.polls['/v1/bundles/b0/insights/keywords'], 2)
+
+    def test_timeout_after_last_poll(self):
+        client = FakeClient({'b0': 100})
+        started = time.time()
+        results = list(waiter(client, ['/v1/bundles/b0'], timeout=0.2,
+                              initial_delay=1, max_delay=1,
+                              max_rate=1000))
+        self.assertEqual(results[0].status, STATUS_TIMEOUT)
+        # Polled at the start and at the deadline.
+        self.assertEqual(client.polls['/v1/bundles/b0/insights/keywords'], 2)
+        self.assertGreaterEqual(client.times[-1] - started, 0.2)